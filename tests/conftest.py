@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+# The package creates its data directory and databases on import; keep them
+# out of the working tree.
+os.environ.setdefault("APP_DATA_DIR", tempfile.mkdtemp(prefix="unifi-backup-tests-"))
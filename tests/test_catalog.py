@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import errno
+import hashlib
+import os
+
+import pytest
+
+from unifi_backup_app import catalog
+from unifi_backup_app.consoles import ConsoleRecord
+from unifi_backup_app.retention import select_kept
+
+
+@pytest.mark.parametrize("cross_device", [False, True])
+def test_move_and_hash(tmp_path, monkeypatch, cross_device):
+    payload = os.urandom(3 * 1024 * 1024 + 17)
+    src = tmp_path / "downloads" / "autobackup.unf"
+    dest = tmp_path / "backups" / "Office_autobackup.unf"
+    src.parent.mkdir()
+    dest.parent.mkdir()
+    src.write_bytes(payload)
+    if cross_device:
+        def rename(a, b):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(catalog.os, "rename", rename)
+
+    assert catalog.move_and_hash(src, dest) == hashlib.sha256(payload).hexdigest()
+    assert dest.read_bytes() == payload
+    assert not src.exists()
+    assert list(dest.parent.iterdir()) == [dest]
+
+
+def test_reconcile_dates_deduplicated_backups_by_their_folder(tmp_path, monkeypatch):
+    # Twenty identical daily backups hardlinked to one object whose mtime is
+    # that of the first day.
+    root = tmp_path / "backups"
+    obj = tmp_path / "object.unf"
+    obj.write_bytes(b"same backup")
+    first = datetime(2026, 3, 1, 3, 15, tzinfo=timezone.utc)
+    os.utime(obj, (first.timestamp(), first.timestamp()))
+    for day in range(20):
+        folder = root / (first + timedelta(days=day)).strftime("%Y-%m-%d")
+        folder.mkdir(parents=True)
+        os.link(obj, folder / "Office_autobackup.unf")
+    monkeypatch.setattr(catalog, "BACKUP_ROOT", root)
+    store = catalog.BackupCatalog(tmp_path / "backups.db")
+    office = ConsoleRecord(id=1, name="Office")
+
+    assert store.reconcile([office])["added"] == 20
+
+    entries = store.entries_for_console(1)
+    dates = [datetime.fromtimestamp(entry["mtime"], timezone.utc).strftime("%Y-%m-%d") for entry in entries]
+    assert dates == [entry["date_folder"] for entry in entries]
+    assert entries[-1]["mtime"] == first.timestamp()
+    kept = select_kept(entries, {"daily": 14, "weekly": 0, "monthly": 0}, timezone.utc)
+    assert len(kept) == 14
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import stat
+
+import pytest
+
+from unifi_backup_app import catalog, maintenance
+from unifi_backup_app.dedup import DedupStore
+
+
+def _backup(root, folder: str, content: bytes):
+    path = root / folder / "Office_autobackup.unf"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DedupStore(tmp_path / "backups" / ".objects")
+
+
+def test_first_absorb_links_the_object(tmp_path, store):
+    path, digest = _backup(tmp_path / "backups", "2026-03-01", b"backup one")
+
+    assert store.absorb(path, digest) == 0
+
+    obj = store.object_path(digest)
+    assert os.path.samefile(obj, path)
+    assert path.stat().st_nlink == 2
+    assert not obj.stat().st_mode & stat.S_IWUSR
+
+
+def test_identical_backup_becomes_a_hardlink(tmp_path, store):
+    first, digest = _backup(tmp_path / "backups", "2026-03-01", b"same content")
+    second, _ = _backup(tmp_path / "backups", "2026-03-02", b"same content")
+    store.absorb(first, digest)
+
+    assert store.absorb(second, digest) == len(b"same content")
+    assert store.absorb(second, digest) == 0
+
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == b"same content"
+    assert second.stat().st_nlink == 3
+    assert not list(second.parent.glob(".*"))
+
+
+def test_digest_mismatch_leaves_the_file_alone(tmp_path, store):
+    first, digest = _backup(tmp_path / "backups", "2026-03-01", b"original")
+    store.absorb(first, digest)
+    other, _ = _backup(tmp_path / "backups", "2026-03-02", b"changed!")
+
+    # Same size, so only re-hashing tells them apart.
+    with pytest.raises(ValueError):
+        store.absorb(other, digest, verify=True)
+    longer, _ = _backup(tmp_path / "backups", "2026-03-03", b"a longer change")
+    with pytest.raises(ValueError):
+        store.absorb(longer, digest)
+
+    assert other.read_bytes() == b"changed!"
+    assert other.stat().st_nlink == 1
+    assert longer.stat().st_nlink == 1
+    assert not store.object_path(hashlib.sha256(b"changed!").hexdigest()).exists()
+
+
+def test_collect_garbage_removes_unreferenced_objects(tmp_path, store):
+    kept, kept_digest = _backup(tmp_path / "backups", "2026-03-01", b"still referenced")
+    gone, gone_digest = _backup(tmp_path / "backups", "2026-03-02", b"deleted by retention")
+    store.absorb(kept, kept_digest)
+    store.absorb(gone, gone_digest)
+    gone.unlink()
+
+    assert store.collect_garbage() == (1, len(b"deleted by retention"))
+    assert store.object_path(kept_digest).exists()
+    assert not store.object_path(gone_digest).exists()
+    assert store.usage() == {"objects": 1, "object_bytes": len(b"still referenced")}
+
+
+def test_maintenance_dedup_skips_stale_entries(tmp_path, monkeypatch, store, capsys):
+    root = tmp_path / "backups"
+    monkeypatch.setattr(catalog, "BACKUP_ROOT", root)
+    backups = catalog.BackupCatalog(tmp_path / "backups.db")
+    monkeypatch.setattr(maintenance, "backup_catalog", backups)
+    monkeypatch.setattr(maintenance, "dedup_store", store)
+    stale, _ = _backup(root, "2026-03-01", b"recorded content")
+    backups.record(stale, console_id=1)
+    stale.write_bytes(b"rewritten since")
+    copies = [_backup(root, folder, b"good content")[0] for folder in ("2026-03-02", "2026-03-03")]
+    for path in copies:
+        backups.record(path, console_id=1)
+
+    maintenance._dedup(None)
+
+    output = capsys.readouterr().out
+    assert "Skipped 2026-03-01/Office_autobackup.unf" in output
+    assert "Deduplicated 2 backups" in output
+    assert os.path.samefile(*copies)
+    assert stale.stat().st_nlink == 1
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+
+import pytest
+
+from unifi_backup_app import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(handler) -> str:
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def cookies(tmp_path, monkeypatch):
+    path = tmp_path / "cookies.json"
+    path.write_text(json.dumps([{"name": "TOKEN", "value": "abc", "domain": ".ui.com"}]))
+    monkeypatch.setattr(http_client, "COOKIES_JSON", path)
+    http_client.invalidate_session_check()
+    yield path
+    http_client.invalidate_session_check()
+
+
+def _session_check_server(serve, monkeypatch, status: int, headers: dict, requests_seen: list) -> None:
+    class Handler(_Handler):
+        def do_GET(self) -> None:
+            requests_seen.append(self.headers.get("Cookie"))
+            body = b"{}" if "json" in headers.get("Content-Type", "") else b"<html></html>"
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    monkeypatch.setattr(http_client, "SESSION_CHECK_URL", serve(Handler) + "/api/sso/v1/user/self")
+
+
+@pytest.mark.parametrize(
+    ("status", "headers", "expected"),
+    [
+        (401, {}, False),
+        (302, {"Location": "https://account.ui.com/login?redirect=x"}, False),
+        (200, {"Content-Type": "application/json"}, True),
+        # A login page served with 200 is not proof either way.
+        (200, {"Content-Type": "text/html; charset=utf-8"}, None),
+    ],
+)
+def test_validate_session_http(serve, cookies, monkeypatch, status, headers, expected):
+    seen: list = []
+    _session_check_server(serve, monkeypatch, status, headers, seen)
+    assert http_client.validate_session_http() is expected
+    assert seen == ["TOKEN=abc"]
+
+
+def test_validate_session_http_cache_is_dropped_on_invalidate(serve, cookies, monkeypatch):
+    seen: list = []
+    _session_check_server(serve, monkeypatch, 200, {"Content-Type": "application/json"}, seen)
+    assert http_client.validate_session_http() is True
+    assert http_client.validate_session_http() is True
+    assert len(seen) == 1
+    http_client.invalidate_session_check()
+    assert http_client.validate_session_http() is True
+    assert len(seen) == 2
+
+
+def test_validate_session_http_without_cookies(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "COOKIES_JSON", tmp_path / "missing.json")
+    assert http_client.validate_session_http() is False
+
+
+def test_stream_download_resumes_with_range(serve, tmp_path, monkeypatch):
+    payload = bytes(range(256)) * 4096
+    chunk_size = 64 * 1024
+    cut = 300_000
+    ranges: list = []
+
+    class Handler(_Handler):
+        def do_GET(self) -> None:
+            ranges.append(self.headers.get("Range"))
+            if len(ranges) == 1:
+                # Announce the whole file, then drop the connection part way.
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload[:cut])
+                return
+            start = int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+            self.send_header("Content-Length", str(len(payload) - start))
+            self.end_headers()
+            self.wfile.write(payload[start:])
+
+    monkeypatch.setattr(http_client, "_CHUNK_SIZE", chunk_size)
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    dest = tmp_path / "backup.unf"
+    size, sha256 = http_client.stream_download(serve(Handler) + "/backup.unf", dest)
+
+    # Only whole chunks reach the partial file before the connection drops.
+    assert ranges == [None, f"bytes={cut // chunk_size * chunk_size}-"]
+    assert size == len(payload)
+    assert sha256 == hashlib.sha256(payload).hexdigest()
+    assert dest.read_bytes() == payload
+    assert not (tmp_path / "backup.unf.part").exists()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import socket
+import threading
+
+import pytest
+
+from unifi_backup_app import notifications
+from unifi_backup_app.data import appdata
+from unifi_backup_app.outbox import NotificationOutbox
+
+
+class _SmtpStub:
+    # Just enough of an SMTP server for smtplib; MAIL FROM is refused while
+    # `refuse` is above zero.
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.refuse = 0
+        self.refused = 0
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        def reply(text: str) -> None:
+            conn.sendall(text.encode() + b"\r\n")
+
+        with conn, conn.makefile("rb") as lines:
+            reply("220 stub")
+            for line in lines:
+                command = line.decode().strip().upper()
+                if command.startswith("MAIL") and self.refuse:
+                    self.refuse -= 1
+                    self.refused += 1
+                    reply("451 try again later")
+                elif command == "DATA":
+                    reply("354 go ahead")
+                    data = []
+                    for data_line in lines:
+                        if data_line == b".\r\n":
+                            break
+                        data.append(data_line.decode())
+                    self.messages.append("".join(data))
+                    reply("250 queued")
+                elif command == "QUIT":
+                    reply("221 bye")
+                    return
+                else:
+                    reply("250 ok")
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    box = NotificationOutbox(tmp_path / "outbox.db")
+    monkeypatch.setattr(notifications, "notification_outbox", box)
+    return box
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    stub = _SmtpStub()
+    monkeypatch.setitem(
+        appdata,
+        "smtp",
+        {
+            "enabled": True,
+            "host": "127.0.0.1",
+            "port": stub.port,
+            "sender": "backups@example.com",
+            "recipients": "ops@example.com",
+            "use_ssl": False,
+            "notify_backup_failed": True,
+        },
+    )
+    yield stub
+    notifications.close_smtp_connection()
+    stub.close()
+
+
+def _rows(outbox: NotificationOutbox) -> list[dict]:
+    return [dict(row) for row in outbox._conn.execute("SELECT * FROM outbox ORDER BY id")]
+
+
+def test_failed_send_is_retried(outbox, smtp, monkeypatch):
+    monkeypatch.setattr(notifications, "_retry_delay", lambda attempt: 0)
+    smtp.refuse = 2
+    outbox.add("UniFi Backup: hello", "body")
+
+    assert notifications.deliver_due_notifications() == 1
+    assert smtp.refused == 2
+    assert len(smtp.messages) == 1
+    assert "Subject: UniFi Backup: hello" in smtp.messages[0]
+    assert _rows(outbox) == []
+
+
+def test_retry_backs_off(outbox, smtp):
+    smtp.refuse = 1
+    outbox.add("UniFi Backup: hello", "body")
+
+    assert notifications.deliver_due_notifications() == 0
+    [row] = _rows(outbox)
+    assert row["status"] == "pending"
+    assert row["attempts"] == 1
+    assert "451" in row["last_error"]
+    assert outbox.due() == []
+
+
+def test_send_is_marked_failed_after_last_attempt(outbox, smtp, monkeypatch):
+    monkeypatch.setattr(notifications, "_retry_delay", lambda attempt: 0)
+    monkeypatch.setattr(notifications, "NOTIFY_RETRY_ATTEMPTS", 3)
+    smtp.refuse = 10
+    outbox.add("UniFi Backup: hello", "body")
+
+    assert notifications.deliver_due_notifications() == 0
+    assert smtp.refused == 3
+    [row] = _rows(outbox)
+    assert row["status"] == "failed"
+    assert row["attempts"] == 3
+    assert smtp.messages == []
+
+
+def test_dedup_key_suppresses_pending_repeats(outbox, smtp):
+    notifications.notify_backup_failed("Office", "https://unifi.ui.com/x", "timeout")
+    notifications.notify_backup_failed("Office", "https://unifi.ui.com/x", "timeout")
+    notifications.notify_backup_failed("Office", "https://unifi.ui.com/x", "no file")
+    assert len(_rows(outbox)) == 2
+
+    assert notifications.deliver_due_notifications() == 2
+    # Once delivered, the same failure is reported again.
+    notifications.notify_backup_failed("Office", "https://unifi.ui.com/x", "timeout")
+    assert len(_rows(outbox)) == 1
+
+
+def test_digest_left_by_earlier_run_is_sent_as_interrupted(outbox, smtp):
+    outbox.add_digest_entry("1-1/job-1", 3, "UniFi Backup: Failed for Office", "Error: timeout\n", "failed")
+    outbox.add_digest_entry("1-1/job-1", 3, "UniFi Backup: Failed for Office", "Error: no file\n", "failed")
+
+    notifications.flush_open_digests(current_run=True)
+    assert _rows(outbox) == []
+    notifications.flush_open_digests(current_run=False)
+
+    [row] = _rows(outbox)
+    assert row["subject"] == "UniFi Backup: Scheduled backup interrupted"
+    assert "== Failed for Office (unfinished)\nError: no file" in row["body"]
+    assert "timeout" not in row["body"]
+    assert outbox.digest_keys() == []
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from unifi_backup_app import catalog, retention, tasks
+from unifi_backup_app.consoles import ConsoleRecord, console_registry
+from unifi_backup_app.data import appdata
+from unifi_backup_app.dedup import DedupStore
+from unifi_backup_app.retention import apply_retention, plan_retention, select_kept
+
+_NONE = {"daily": 0, "weekly": 0, "monthly": 0}
+
+
+def _entries(times: list[datetime]) -> list[dict]:
+    # Newest first, as the catalog returns them.
+    ordered = sorted(times, reverse=True)
+    return [{"id": index, "mtime": when.timestamp()} for index, when in enumerate(ordered)]
+
+
+def _kept_days(entries: list[dict], policy: dict) -> list[str]:
+    kept = select_kept(entries, {**_NONE, **policy}, timezone.utc)
+    return sorted(
+        datetime.fromtimestamp(entry["mtime"], timezone.utc).strftime("%Y-%m-%d %H:%M")
+        for entry in entries
+        if entry["id"] in kept
+    )
+
+
+def test_daily_keeps_the_newest_backup_of_each_recent_day():
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    times = [start + timedelta(days=day, hours=hour) for day in range(10) for hour in (2, 14)]
+
+    assert _kept_days(_entries(times), {"daily": 3}) == [
+        "2026-03-08 14:00",
+        "2026-03-09 14:00",
+        "2026-03-10 14:00",
+    ]
+
+
+def test_weekly_keeps_the_newest_backup_of_each_recent_iso_week():
+    # 2026-03-01 is a Sunday; the last backup is on Saturday 2026-03-21.
+    start = datetime(2026, 3, 1, 3, tzinfo=timezone.utc)
+    times = [start + timedelta(days=day) for day in range(21)]
+
+    assert _kept_days(_entries(times), {"weekly": 2}) == ["2026-03-15 03:00", "2026-03-21 03:00"]
+
+
+def test_monthly_keeps_the_newest_backup_of_each_recent_month():
+    times = [datetime(2026, month, day, 3, tzinfo=timezone.utc) for month in range(1, 7) for day in (5, 20)]
+
+    assert _kept_days(_entries(times), {"monthly": 3}) == [
+        "2026-04-20 03:00",
+        "2026-05-20 03:00",
+        "2026-06-20 03:00",
+    ]
+
+
+def test_tiers_combine_and_newest_is_always_kept():
+    start = datetime(2026, 1, 1, 3, tzinfo=timezone.utc)
+    times = [start + timedelta(days=day) for day in range(90)]
+    entries = _entries(times)
+
+    assert select_kept(entries, _NONE, timezone.utc) == {0}
+    kept = _kept_days(entries, {"daily": 2, "weekly": 2, "monthly": 2})
+    # Weekly adds Sunday 2026-03-29; monthly adds the end of February.
+    assert kept == ["2026-02-28 03:00", "2026-03-29 03:00", "2026-03-30 03:00", "2026-03-31 03:00"]
+
+
+def test_buckets_follow_the_user_timezone():
+    # 02:00 UTC is still the previous evening in New York.
+    times = [datetime(2026, 3, 2, 2, tzinfo=timezone.utc), datetime(2026, 3, 1, 14, tzinfo=timezone.utc)]
+    entries = _entries(times)
+
+    assert select_kept(entries, {**_NONE, "daily": 2}, timezone.utc) == {0, 1}
+    assert select_kept(entries, {**_NONE, "daily": 2}, ZoneInfo("America/New_York")) == {0}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # A backup root with its own catalog and dedup store.
+    root = tmp_path / "backups"
+    root.mkdir()
+    backups = catalog.BackupCatalog(tmp_path / "backups.db")
+    objects = DedupStore(root / ".objects")
+    monkeypatch.setattr(catalog, "BACKUP_ROOT", root)
+    monkeypatch.setattr(retention, "BACKUP_ROOT", root)
+    monkeypatch.setattr(retention, "backup_catalog", backups)
+    monkeypatch.setattr(retention, "dedup_store", objects)
+    return root, backups, objects
+
+
+def _add_backup(store, console: ConsoleRecord, day: str, content: bytes, *, dedup: bool = False):
+    root, backups, objects = store
+    path = root / day / f"{console.name}_autobackup.unf"
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(content)
+    when = datetime.strptime(day, "%Y-%m-%d").replace(hour=3, tzinfo=timezone.utc).timestamp()
+    os.utime(path, (when, when))
+    digest = hashlib.sha256(content).hexdigest()
+    if dedup:
+        objects.absorb(path, digest)
+    backups.record(path, console_id=console.id, console_name=console.name, sha256=digest, mtime=when)
+    return path
+
+
+def _days(count: int) -> list[str]:
+    start = datetime(2026, 3, 1)
+    return [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(count)]
+
+
+def test_plan_protects_newest_and_last_backup(store):
+    office = ConsoleRecord(id=1, name="Office")
+    paths = [_add_backup(store, office, day, day.encode()) for day in _days(5)]
+    # The last successful backup points at an old file, e.g. after a restore.
+    office.last_backup = {"path": f"{paths[0].parent.name}/{paths[0].name}"}
+
+    plan = plan_retention([office], _NONE, timezone.utc)
+
+    doomed = sorted(entry["date_folder"] for entry in plan["delete"])
+    assert doomed == ["2026-03-02", "2026-03-03", "2026-03-04"]
+    assert plan["consoles"][0]["keep"] == 2
+    assert plan["consoles"][0]["delete_bytes"] == 30
+
+
+def test_dry_run_changes_nothing(store, monkeypatch):
+    root, backups, _ = store
+    office = console_registry.add(ConsoleRecord(id=0, name="DryRunOffice"))
+    try:
+        paths = [_add_backup(store, office, day, day.encode()) for day in _days(4)]
+        monkeypatch.setitem(appdata, "retention", {**_NONE, "daily": 1})
+
+        tasks.retention_logic(dry_run=True)
+
+        assert all(path.exists() for path in paths)
+        assert backups.count_for_console(office.id) == 4
+    finally:
+        console_registry.remove(office.id)
+
+
+def test_apply_removes_files_empty_folders_and_history(store):
+    root, backups, _ = store
+    office = ConsoleRecord(id=1, name="Office")
+    branch = ConsoleRecord(id=2, name="Branch")
+    days = _days(3)
+    for day in days:
+        _add_backup(store, office, day, f"office {day}".encode())
+    # Another console's file keeps the first date folder in use.
+    _add_backup(store, branch, days[0], b"branch")
+    office.recent_backups = [{"path": f"{day}/Office_autobackup.unf"} for day in reversed(days)]
+
+    plan = plan_retention([office, branch], _NONE, timezone.utc)
+    result = apply_retention(plan, [office, branch])
+
+    assert result["deleted"] == 2
+    assert result["folders_removed"] == 1
+    assert result["freed_bytes"] == 2 * len(b"office 2026-03-01")
+    assert sorted(path.name for path in root.iterdir()) == [days[0], days[2]]
+    assert (root / days[0] / "Branch_autobackup.unf").exists()
+    assert backups.count_for_console(office.id) == 1
+    assert office.recent_backups == [{"path": f"{days[2]}/Office_autobackup.unf"}]
+
+
+def test_apply_frees_dedup_objects_once_unreferenced(store):
+    root, _, objects = store
+    office = ConsoleRecord(id=1, name="Office")
+    days = _days(4)
+    for day in days[:3]:
+        _add_backup(store, office, day, b"unchanged config", dedup=True)
+    _add_backup(store, office, days[3], b"new config", dedup=True)
+    unchanged = objects.object_path(hashlib.sha256(b"unchanged config").hexdigest())
+
+    result = apply_retention(plan_retention([office], _NONE, timezone.utc), [office])
+
+    assert result["deleted"] == 3
+    assert result["objects_removed"] == 1
+    assert result["freed_bytes"] == len(b"unchanged config")
+    assert not unchanged.exists()
+    assert objects.object_path(hashlib.sha256(b"new config").hexdigest()).exists()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from unifi_backup_app import state, tasks
+from unifi_backup_app.consoles import ConsoleRecord, ConsoleStatus, console_registry
+from unifi_backup_app.data import appdata
+
+
+@pytest.fixture
+def console():
+    record = console_registry.add(ConsoleRecord(id=0, name="Office", backup_url="https://unifi.ui.com/x"))
+    yield record
+    console_registry.remove(record.id)
+
+
+@pytest.fixture
+def broken_chrome(monkeypatch):
+    def open_driver(**kwargs):
+        raise RuntimeError("chrome failed to start")
+
+    monkeypatch.setattr(tasks.driver_pool, "_open_driver", open_driver)
+    monkeypatch.setitem(appdata, "master_logged_in", True)
+
+
+def test_driver_start_failure_on_last_attempt_finishes_the_job(console, broken_chrome):
+    job_id = state.start_job("ScheduledBackup", 1)
+
+    tasks.scheduled_console_backup_logic(job_id, console.id, tasks.BACKUP_RETRY_ATTEMPTS)
+
+    assert job_id not in state.jobs
+    assert console.status is ConsoleStatus.FAILED_RETRIES
+    assert console.failed_attempts == tasks.BACKUP_RETRY_ATTEMPTS
+
+
+def test_driver_start_failure_is_retried(console, broken_chrome, monkeypatch):
+    if tasks.BACKUP_RETRY_ATTEMPTS < 2:
+        pytest.skip("retries are disabled")
+    retried: list = []
+    monkeypatch.setattr(tasks, "_retry_delay", lambda attempt: 0)
+    monkeypatch.setattr(
+        tasks, "_enqueue_console_backup", lambda job_id, record, attempt: retried.append((job_id, attempt))
+    )
+    job_id = state.start_job("ScheduledBackup", 1)
+    try:
+        tasks.scheduled_console_backup_logic(job_id, console.id, 1)
+        deadline = time.monotonic() + 5
+        while not retried and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert retried == [(job_id, 2)]
+        assert job_id in state.jobs
+    finally:
+        state.jobs.pop(job_id, None)
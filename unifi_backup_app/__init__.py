@@ -2,11 +2,16 @@ from __future__ import annotations
 
 from flask import Flask
 
+from .catalog import backup_catalog
 from .data import load_appdata
+from .notifications import start_notification_sender
 from .routes import register_routes
 from .scheduler import init_scheduler
 from .scheduling import init_schedule_jobs
-from .settings import SECRET_KEY
+from .settings import SECRET_KEY, USE_X_SENDFILE
+from .state import enqueue_task, task_key
+from .status import start_status_publisher
+from .tasks import reconcile_backup_catalog_logic
 from .worker import start_worker
 
 
@@ -18,11 +23,21 @@ def create_app() -> Flask:
     app = Flask(__name__)
     app.config.from_object(Config)
     app.config["SECRET_KEY"] = SECRET_KEY
+    app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
 
     init_scheduler(app)
     load_appdata()
     init_schedule_jobs()
     start_worker()
+    if backup_catalog.is_empty():
+        # First start with the catalog: index backups already on disk.
+        enqueue_task(
+            "ReconcileBackupCatalog",
+            reconcile_backup_catalog_logic,
+            key=task_key("ReconcileBackupCatalog"),
+        )
+    start_status_publisher()
+    start_notification_sender()
     register_routes(app)
 
     return app
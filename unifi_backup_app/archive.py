@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from pathlib import Path
+import zipfile
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink:
+    # Write-only file object for ZipFile; the generator drains it after every
+    # write so at most one chunk plus headers is held in memory.
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    # entries: iterable of (path, arcname). Backups are already compressed, so
+    # entries are STORED and the archive is produced while the files are read.
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for path, arcname in entries:
+            path = Path(path)
+            if not path.is_file():
+                continue
+            zinfo = zipfile.ZipInfo.from_file(path, arcname=arcname)
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with path.open("rb") as source, zf.open(zinfo, mode="w") as target:
+                while True:
+                    chunk = source.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    yield sink.drain()
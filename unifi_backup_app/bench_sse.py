@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import threading
+import time
+
+import psutil
+import requests
+
+
+class _ClientStats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.connected = 0
+        self.rejected = 0
+        self.errors = 0
+        self.events = 0
+        self.bytes = 0
+        self.first_frame_seconds: list[float] = []
+
+
+def _client(url: str, stop: threading.Event, stats: _ClientStats) -> None:
+    started = time.monotonic()
+    try:
+        with requests.get(url, stream=True, timeout=(10, 30)) as resp:
+            if resp.status_code == 503:
+                with stats.lock:
+                    stats.rejected += 1
+                return
+            resp.raise_for_status()
+            first = True
+            for chunk in resp.iter_content(chunk_size=None):
+                with stats.lock:
+                    if first:
+                        stats.connected += 1
+                        stats.first_frame_seconds.append(time.monotonic() - started)
+                        first = False
+                    stats.bytes += len(chunk)
+                    stats.events += chunk.count(b"\nevent: ")
+                if stop.is_set():
+                    return
+    except requests.RequestException:
+        with stats.lock:
+            stats.errors += 1
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Open many dashboard status streams against a running server."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:5000/status_stream")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--ramp-seconds", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--pid", type=int, help="Server process id, to sample its CPU and memory.")
+    args = parser.parse_args()
+
+    stats = _ClientStats()
+    stop = threading.Event()
+    server = psutil.Process(args.pid) if args.pid else None
+    if server:
+        server.cpu_percent(None)
+
+    threads = []
+    for _ in range(args.clients):
+        thread = threading.Thread(target=_client, args=(args.url, stop, stats), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.ramp_seconds:
+            time.sleep(args.ramp_seconds / args.clients)
+
+    cpu_samples = []
+    rss_samples = []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        time.sleep(1)
+        if server:
+            cpu_samples.append(server.cpu_percent(None))
+            rss_samples.append(server.memory_info().rss / (1024 * 1024))
+    stop.set()
+
+    with stats.lock:
+        print(f"clients requested : {args.clients}")
+        print(f"streams connected : {stats.connected}")
+        print(f"rejected (503)    : {stats.rejected}")
+        print(f"errors            : {stats.errors}")
+        print(
+            "first frame       : "
+            f"p50 {_percentile(stats.first_frame_seconds, 0.5) * 1000:.0f} ms, "
+            f"p95 {_percentile(stats.first_frame_seconds, 0.95) * 1000:.0f} ms"
+        )
+        print(f"events received   : {stats.events} ({stats.bytes / 1024:.1f} KiB)")
+    if cpu_samples:
+        print(
+            f"server cpu        : mean {statistics.mean(cpu_samples):.1f}%, "
+            f"max {max(cpu_samples):.1f}%"
+        )
+        print(f"server rss        : max {max(rss_samples):.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
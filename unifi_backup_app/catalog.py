@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import errno
+import hashlib
+import os
+from pathlib import Path
+import threading
+
+from .consoles import ConsoleRecord
+from .db import connect
+from .downloads import is_finished_backup
+from .settings import BACKUP_CATALOG_DB, BACKUP_ROOT
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    console_id INTEGER,
+    console_name TEXT NOT NULL DEFAULT '',
+    date_folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT,
+    UNIQUE (date_folder, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_backups_console ON backups (console_id, mtime);
+CREATE INDEX IF NOT EXISTS idx_backups_date ON backups (date_folder);
+CREATE INDEX IF NOT EXISTS idx_backups_mtime ON backups (mtime);
+"""
+
+_COLUMNS = "id, console_id, console_name, date_folder, filename, size, mtime, sha256"
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while True:
+            chunk = handle.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def move_and_hash(src: Path, dest: Path) -> str:
+    # Moves a finished download into place and returns its SHA-256, reading
+    # the file once. Across filesystems (e.g. backups/ on its own volume) the
+    # hash is taken while copying instead of after the rename.
+    try:
+        os.rename(src, dest)
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+    else:
+        return file_sha256(dest)
+    digest = hashlib.sha256()
+    part = dest.with_name(dest.name + ".part")
+    try:
+        with src.open("rb") as source, part.open("wb") as target:
+            while True:
+                chunk = source.read(_HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                digest.update(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(part, dest)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    src.unlink()
+    return digest.hexdigest()
+
+
+def _backup_time(path: Path, stat: os.stat_result) -> float:
+    # A deduplicated backup shares its inode, and so its mtime, with the first
+    # identical backup. Its UTC date folder still says when it was taken; the
+    # inode's time is only trusted when it falls on that date.
+    if stat.st_nlink <= 1:
+        return stat.st_mtime
+    try:
+        day = datetime.strptime(path.parent.name, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return stat.st_mtime
+    if day <= stat.st_mtime < day + 86400:
+        return stat.st_mtime
+    # Midday UTC is the folder's date in nearly every timezone.
+    return day + 12 * 3600
+
+
+def _row_to_entry(row) -> dict:
+    entry = dict(row)
+    entry["path"] = BACKUP_ROOT / entry["date_folder"] / entry["filename"]
+    return entry
+
+
+def entry_matches_file(entry, stat: os.stat_result) -> bool:
+    # Deduplicated backups are hardlinks to a read-only object whose mtime is
+    # that of the first identical backup, so only the size is comparable.
+    if entry["size"] != stat.st_size:
+        return False
+    return entry["mtime"] == stat.st_mtime or (stat.st_nlink > 1 and bool(entry["sha256"]))
+
+
+def match_console(filename: str, consoles: list[ConsoleRecord]) -> ConsoleRecord | None:
+    # Backups are named "<console name>_<file>"; prefer the longest name so
+    # "Site_B_x.unf" belongs to "Site_B" rather than "Site".
+    best = None
+    for console in consoles:
+        prefix = f"{console.name}_"
+        if filename.startswith(prefix) and (best is None or len(console.name) > len(best.name)):
+            best = console
+    return best
+
+
+class BackupCatalog:
+    def __init__(self, path) -> None:
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def record(
+        self,
+        path: Path,
+        *,
+        console_id: int | None,
+        console_name: str = "",
+        sha256: str | None = None,
+        mtime: float | None = None,
+    ) -> dict:
+        stat = path.stat()
+        if sha256 is None:
+            sha256 = file_sha256(path)
+        if mtime is None:
+            mtime = _backup_time(path, stat)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO backups (console_id, console_name, date_folder, filename, size, mtime, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (date_folder, filename) DO UPDATE SET "
+                "console_id = excluded.console_id, console_name = excluded.console_name, "
+                "size = excluded.size, mtime = excluded.mtime, sha256 = excluded.sha256",
+                (console_id, console_name, path.parent.name, path.name, stat.st_size, mtime, sha256),
+            )
+        return self.get(path.parent.name, path.name)
+
+    def get(self, date_folder: str, filename: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM backups WHERE date_folder = ? AND filename = ?",
+                (date_folder, filename),
+            ).fetchone()
+        return _row_to_entry(row) if row else None
+
+    def remove(self, date_folder: str, filename: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM backups WHERE date_folder = ? AND filename = ?",
+                (date_folder, filename),
+            )
+
+    def history(self, console_id: int, *, limit: int = 100, offset: int = 0) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM backups WHERE console_id = ? "
+                "ORDER BY mtime DESC LIMIT ? OFFSET ?",
+                (console_id, max(1, int(limit)), max(0, int(offset))),
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def entries_for_console(self, console_id: int) -> list[dict]:
+        # Newest first, like history(), but unpaged.
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM backups WHERE console_id = ? ORDER BY mtime DESC",
+                (console_id,),
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def console_ids(self) -> list[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT console_id FROM backups WHERE console_id IS NOT NULL"
+            ).fetchall()
+        return [row["console_id"] for row in rows]
+
+    def count_for_console(self, console_id: int) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS n FROM backups WHERE console_id = ?", (console_id,)
+            ).fetchone()
+        return int(row["n"])
+
+    def latest_for_console(self, console_id: int) -> dict | None:
+        entries = self.history(console_id, limit=1)
+        return entries[0] if entries else None
+
+    def for_dates(
+        self,
+        start_date: str,
+        end_date: str,
+        console_ids: list[int] | None = None,
+    ) -> list[dict]:
+        # Date folders are ISO dates, so string comparison is a range query.
+        sql = f"SELECT {_COLUMNS} FROM backups WHERE date_folder BETWEEN ? AND ?"
+        params: list = [start_date, end_date]
+        if console_ids:
+            sql += f" AND console_id IN ({', '.join('?' for _ in console_ids)})"
+            params.extend(console_ids)
+        sql += " ORDER BY date_folder, filename"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def storage_stats(self) -> dict:
+        # Logical bytes are what the date folders add up to; unique bytes are
+        # what a content-addressed store needs to keep them.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS files, COALESCE(SUM(size), 0) AS logical, "
+                "(SELECT COUNT(*) FROM (SELECT DISTINCT sha256 FROM backups WHERE sha256 IS NOT NULL)) AS unique_files, "
+                "(SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM backups "
+                "WHERE sha256 IS NOT NULL GROUP BY sha256)) + "
+                "(SELECT COALESCE(SUM(size), 0) FROM backups WHERE sha256 IS NULL) AS unique_bytes "
+                "FROM backups"
+            ).fetchone()
+        return {
+            "files": int(row["files"]),
+            "unique_files": int(row["unique_files"]),
+            "logical_bytes": int(row["logical"]),
+            "unique_bytes": int(row["unique_bytes"]),
+        }
+
+    def iter_entries(self, batch_size: int = 1000):
+        after_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM backups WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _row_to_entry(row)
+            after_id = rows[-1]["id"]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM backups LIMIT 1").fetchone() is None
+
+    def reconcile(self, consoles) -> dict:
+        # Rebuilds the index from disk: new files are added (and hashed), rows
+        # for missing files dropped, and changed files re-hashed.
+        consoles = list(consoles)
+        with self._lock:
+            known = {
+                (row["date_folder"], row["filename"]): row
+                for row in self._conn.execute(
+                    "SELECT date_folder, filename, size, mtime, sha256, console_id FROM backups"
+                ).fetchall()
+            }
+        added = updated = 0
+        seen = set()
+        for folder in sorted(os.scandir(BACKUP_ROOT), key=lambda entry: entry.name):
+            if not folder.is_dir() or folder.name.startswith("."):
+                continue
+            for entry in os.scandir(folder.path):
+                if not entry.is_file() or not is_finished_backup(entry.name):
+                    continue
+                key = (folder.name, entry.name)
+                seen.add(key)
+                stat = entry.stat()
+                row = known.get(key)
+                console = match_console(entry.name, consoles)
+                if (
+                    row is not None
+                    and entry_matches_file(row, stat)
+                    and (console is None or row["console_id"] is not None)
+                ):
+                    continue
+                console_id = console.id if console else (row["console_id"] if row else None)
+                self.record(
+                    Path(entry.path),
+                    console_id=console_id,
+                    console_name=console.name if console else "",
+                )
+                if row is None:
+                    added += 1
+                else:
+                    updated += 1
+        missing = [key for key in known if key not in seen]
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM backups WHERE date_folder = ? AND filename = ?", missing
+            )
+        return {"added": added, "updated": updated, "removed": len(missing)}
+
+
+backup_catalog = BackupCatalog(BACKUP_CATALOG_DB)
+
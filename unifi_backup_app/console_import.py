@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import codecs
+from dataclasses import dataclass, field
+import json
+import re
+
+from .consoles import ConsoleRecord, ConsoleStatus, console_registry
+from .retention import normalize_policy
+from .timestamps import to_epoch
+
+_READ_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\r\n"
+_NUMBER_END = re.compile(r"[^0-9+\-.eE]")
+
+# Fields an import may change on a console that already exists; its backup
+# state (status, times, recent files) is kept.
+_CONFIG_FIELDS = ("backup_url", "exclude_from_schedule", "retention")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class _JsonStreamReader:
+    # Walks a JSON document from a binary stream without loading all of it:
+    # the consoles list is yielded one element at a time, so only one console
+    # (plus one read chunk) is decoded at once.
+    def __init__(self, stream, chunk_size: int = _READ_CHUNK_SIZE) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf += self._decoder.decode(b"", final=True)
+            return False
+        if self._pos > self._chunk_size:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += self._decoder.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ImportFormatError(f"expected '{char}' at offset {self._pos}")
+        self._pos += 1
+
+    def value(self):
+        if self.peek() in "-0123456789":
+            # Numbers have no closing delimiter; buffer all of it first.
+            while not _NUMBER_END.search(self._buf, self._pos) and self._fill():
+                pass
+        while True:
+            try:
+                result, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._fill():
+                    continue
+                raise ImportFormatError(str(exc)) from exc
+            self._pos = end
+            return result
+
+    def items(self):
+        # Iterates the array that starts at the current position.
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ImportFormatError(f"expected ',' or ']' at offset {self._pos - 1}")
+
+    def members(self):
+        # Iterates the keys of the object that starts at the current position;
+        # the caller must consume each key's value before asking for the next.
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ImportFormatError("object keys must be strings")
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ImportFormatError(f"expected ',' or '}}' at offset {self._pos - 1}")
+
+
+def iter_import_file(stream, meta: dict):
+    # Yields raw console entries from either a list or an object with a
+    # `consoles` list; the object's other keys are collected into meta.
+    reader = _JsonStreamReader(stream)
+    first = reader.peek()
+    if first == "[":
+        yield from reader.items()
+    elif first == "{":
+        found = False
+        for key in reader.members():
+            if key == "consoles" and reader.peek() == "[":
+                found = True
+                yield from reader.items()
+            else:
+                meta[key] = reader.value()
+        if not found:
+            raise ImportFormatError("no consoles list in the file")
+    else:
+        raise ImportFormatError("JSON must be a list of consoles or an object with a consoles key")
+    if reader.peek():
+        raise ImportFormatError("unexpected data after the JSON document")
+
+
+def sanitize_console(item, default_policy: dict) -> dict | None:
+    if not isinstance(item, dict):
+        return None
+    name = str(item.get("name", "")).strip()
+    backup_url = str(item.get("backup_url", "")).strip()
+    if not name or not backup_url:
+        return None
+    try:
+        console_id = int(item.get("id", 0) or 0)
+    except (TypeError, ValueError):
+        console_id = 0
+    console = {
+        "id": console_id,
+        "name": name,
+        "backup_url": backup_url,
+        "last_backup_status": item.get("last_backup_status", ConsoleStatus.UNKNOWN.value),
+        "last_backup_time": to_epoch(item.get("last_backup_time")),
+        "exclude_from_schedule": bool(item.get("exclude_from_schedule", False)),
+    }
+    if isinstance(item.get("retention"), dict):
+        console["retention"] = normalize_policy(item["retention"], default_policy)
+    return console
+
+
+@dataclass(slots=True)
+class ImportPlan:
+    add: list[dict] = field(default_factory=list)
+    update: list[tuple[ConsoleRecord, dict]] = field(default_factory=list)
+    remove: list[ConsoleRecord] = field(default_factory=list)
+    unchanged: int = 0
+    skipped: int = 0
+    master_logged_in: bool | None = None
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.add)} new, {len(self.update)} updated, "
+            f"{len(self.remove)} removed, {self.unchanged} unchanged, "
+            f"{self.skipped} invalid"
+        )
+
+
+def plan_import(stream, default_policy: dict, *, replace_existing: bool = False) -> ImportPlan:
+    # Consoles are matched by name. The last entry wins when a name repeats,
+    # as it did when imports replaced consoles through a name -> console dict.
+    meta: dict = {}
+    incoming: dict[str, dict] = {}
+    skipped = 0
+    for item in iter_import_file(stream, meta):
+        console = sanitize_console(item, default_policy)
+        if console is None:
+            skipped += 1
+            continue
+        incoming.pop(console["name"], None)
+        incoming[console["name"]] = console
+
+    plan = ImportPlan(skipped=skipped)
+    if meta.get("master_logged_in") is not None:
+        plan.master_logged_in = bool(meta["master_logged_in"])
+    for name, console in incoming.items():
+        existing = console_registry.by_name(name)
+        if existing is None:
+            plan.add.append(console)
+            continue
+        changes = {
+            attr: console.get(attr)
+            for attr in _CONFIG_FIELDS
+            if console.get(attr) != getattr(existing, attr)
+        }
+        if changes:
+            plan.update.append((existing, changes))
+        else:
+            plan.unchanged += 1
+    if replace_existing:
+        plan.remove = [record for record in console_registry if record.name not in incoming]
+    return plan
+
+
+def apply_import(plan: ImportPlan) -> None:
+    # Removals go first so ids the file asks for are free; the caller saves
+    # appdata once afterwards.
+    for record in plan.remove:
+        console_registry.remove(record.id)
+    for record, changes in plan.update:
+        for attr, value in changes.items():
+            setattr(record, attr, value)
+    for console in plan.add:
+        console_registry.add(ConsoleRecord.from_dict(console))
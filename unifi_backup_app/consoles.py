@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import Enum
+import re
+import threading
+
+from .timestamps import to_epoch
+
+_FAILED_AFTER_RE = re.compile(r"^Failed after (\d+) (?:re)?tries")
+
+# Fields every console had in appdata.json; anything else a console carries is
+# kept in `extra` and written back untouched.
+_KNOWN_FIELDS = (
+    "id",
+    "name",
+    "backup_url",
+    "last_backup_status",
+    "last_backup_time",
+    "last_backup",
+    "recent_backups",
+    "exclude_from_schedule",
+    "retention",
+)
+
+# Changes to these show up in the dashboard's console rows.
+_ROW_FIELDS = frozenset(
+    ("name", "backup_url", "status", "failed_attempts", "last_backup_time", "exclude_from_schedule")
+)
+
+
+class ConsoleStatus(Enum):
+    UNKNOWN = "Unknown"
+    SUCCESS = "Success"
+    FAILED = "Failed"
+    FAILED_RETRIES = "Failed after retries"
+
+    @classmethod
+    def parse(cls, text) -> tuple[ConsoleStatus, int]:
+        # Older versions stored free text: "Success", "Failed", "Failed after
+        # 3 retries" and later "Failed after N tries". Map it once at load time.
+        text = str(text or "")
+        match = _FAILED_AFTER_RE.match(text)
+        if match:
+            return cls.FAILED_RETRIES, int(match.group(1))
+        if text.startswith("Success") or "Succeeded after retry" in text:
+            return cls.SUCCESS, 0
+        if text.startswith("Failed"):
+            return cls.FAILED, 0
+        return cls.UNKNOWN, 0
+
+
+@dataclass(slots=True)
+class ConsoleRecord:
+    id: int
+    name: str
+    backup_url: str = ""
+    status: ConsoleStatus = ConsoleStatus.UNKNOWN
+    failed_attempts: int = 0
+    last_backup_time: int | None = None
+    last_backup: dict | None = None
+    recent_backups: list = field(default_factory=list)
+    exclude_from_schedule: bool = False
+    retention: dict | None = None
+    extra: dict = field(default_factory=dict)
+    _registry: ConsoleRegistry | None = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, attr: str, value) -> None:
+        registry = getattr(self, "_registry", None)
+        if registry is None:
+            object.__setattr__(self, attr, value)
+            return
+        registry._update(self, attr, value)
+
+    @property
+    def status_text(self) -> str:
+        if self.status is ConsoleStatus.FAILED_RETRIES:
+            return f"Failed after {self.failed_attempts} tries"
+        return self.status.value
+
+    def mark_success(self, when: int) -> None:
+        self.status = ConsoleStatus.SUCCESS
+        self.failed_attempts = 0
+        self.last_backup_time = when
+
+    def mark_failed(self, attempts: int = 0) -> None:
+        # attempts is set once a scheduled pass gives up on the console.
+        if attempts:
+            self.status = ConsoleStatus.FAILED_RETRIES
+        else:
+            self.status = ConsoleStatus.FAILED
+        self.failed_attempts = attempts
+
+    def to_dict(self) -> dict:
+        return {
+            **self.extra,
+            "id": self.id,
+            "name": self.name,
+            "backup_url": self.backup_url,
+            "last_backup_status": self.status_text,
+            "last_backup_time": self.last_backup_time,
+            "last_backup": self.last_backup,
+            "recent_backups": list(self.recent_backups),
+            "exclude_from_schedule": self.exclude_from_schedule,
+            **({"retention": self.retention} if self.retention is not None else {}),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ConsoleRecord:
+        status, attempts = ConsoleStatus.parse(data.get("last_backup_status"))
+        last_backup = data.get("last_backup")
+        recent = [r for r in data.get("recent_backups") or [] if isinstance(r, dict)]
+        for entry in [last_backup, *recent]:
+            if isinstance(entry, dict):
+                entry["time"] = to_epoch(entry.get("time"))
+        return cls(
+            id=int(data["id"]),
+            name=str(data.get("name", "")),
+            backup_url=str(data.get("backup_url", "")),
+            status=status,
+            failed_attempts=attempts,
+            last_backup_time=to_epoch(data.get("last_backup_time")),
+            last_backup=last_backup if isinstance(last_backup, dict) else None,
+            recent_backups=recent,
+            exclude_from_schedule=bool(data.get("exclude_from_schedule", False)),
+            retention=data.get("retention") if isinstance(data.get("retention"), dict) else None,
+            extra={k: v for k, v in data.items() if k not in _KNOWN_FIELDS},
+        )
+
+
+class ConsoleRegistry:
+    # Consoles indexed by id (in insertion order, which is the dashboard order)
+    # and by name. Records report their own changes, so the status stream only
+    # re-renders the rows that actually changed.
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._by_id: dict[int, ConsoleRecord] = {}
+        self._by_name: dict[str, ConsoleRecord] = {}
+        self._next_id = 1
+        self._changed: set[int] = set()
+        self._removed: set[int] = set()
+
+    def load(self, items: list) -> None:
+        with self._lock:
+            for record in self._by_id.values():
+                object.__setattr__(record, "_registry", None)
+                self._removed.add(record.id)
+            self._by_id.clear()
+            self._by_name.clear()
+            self._next_id = 1
+            for item in items:
+                if isinstance(item, ConsoleRecord):
+                    record = item
+                elif isinstance(item, dict) and "id" in item:
+                    record = ConsoleRecord.from_dict(item)
+                else:
+                    continue
+                self._insert(record)
+
+    def _insert(self, record: ConsoleRecord) -> None:
+        object.__setattr__(record, "_registry", self)
+        self._by_id[record.id] = record
+        self._by_name.setdefault(record.name, record)
+        self._next_id = max(self._next_id, record.id + 1)
+        self._removed.discard(record.id)
+        self._changed.add(record.id)
+
+    def _update(self, record: ConsoleRecord, attr: str, value) -> None:
+        with self._lock:
+            if attr == "id":
+                raise AttributeError("console ids are immutable")
+            old = getattr(record, attr)
+            object.__setattr__(record, attr, value)
+            if attr == "name" and old != value:
+                if self._by_name.get(old) is record:
+                    del self._by_name[old]
+                    # Another console may share the old name.
+                    for other in self._by_id.values():
+                        if other.name == old:
+                            self._by_name[old] = other
+                            break
+                self._by_name.setdefault(value, record)
+            if attr in _ROW_FIELDS:
+                self._changed.add(record.id)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, console_id) -> bool:
+        return console_id in self._by_id
+
+    def get(self, console_id) -> ConsoleRecord | None:
+        return self._by_id.get(console_id)
+
+    def by_name(self, name: str) -> ConsoleRecord | None:
+        return self._by_name.get(name)
+
+    def add(self, record: ConsoleRecord) -> ConsoleRecord:
+        # Keeps the record's id when it is free (imports), otherwise assigns
+        # the next one.
+        with self._lock:
+            if not record.id or record.id in self._by_id:
+                object.__setattr__(record, "id", self._next_id)
+            self._insert(record)
+            return record
+
+    def remove(self, console_id) -> ConsoleRecord | None:
+        with self._lock:
+            record = self._by_id.pop(console_id, None)
+            if record is None:
+                return None
+            if self._by_name.get(record.name) is record:
+                del self._by_name[record.name]
+                for other in self._by_id.values():
+                    if other.name == record.name:
+                        self._by_name[record.name] = other
+                        break
+            object.__setattr__(record, "_registry", None)
+            self._changed.discard(console_id)
+            self._removed.add(console_id)
+            return record
+
+    def eligible(self) -> list[ConsoleRecord]:
+        with self._lock:
+            return [record for record in self._by_id.values() if not record.exclude_from_schedule]
+
+    def to_list(self) -> list[dict]:
+        with self._lock:
+            return [record.to_dict() for record in self._by_id.values()]
+
+    def drain_changes(self) -> tuple[list[ConsoleRecord], list[int]]:
+        with self._lock:
+            changed = [self._by_id[cid] for cid in self._changed if cid in self._by_id]
+            removed = list(self._removed)
+            self._changed.clear()
+            self._removed.clear()
+            return changed, removed
+
+
+console_registry = ConsoleRegistry()
@@ -1,13 +1,103 @@
 from __future__ import annotations
 
+import atexit
 import json
+import os
+from pathlib import Path
 import re
+import tempfile
+import threading
 from datetime import datetime, timezone, timedelta, tzinfo
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
-from .settings import APPDATA_JSON, DEFAULT_TZ, AVAILABLE_TIMEZONES
+from .consoles import console_registry
+from .events import notify
+from .log_store import log_store
+from .settings import (
+    APPDATA_JSON,
+    APPLOGS_JSON,
+    AVAILABLE_TIMEZONES,
+    DEFAULT_TZ,
+    SAVE_DEBOUNCE_SECONDS,
+)
+from .timestamps import now_epoch, to_epoch
+
+MAX_APP_LOGS = 300
 
 appdata: dict = {}
+_appdata_lock = threading.RLock()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    # Write to a sibling temp file, fsync, then rename over the target so a crash
+    # never leaves a half-written file behind.
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        try:
+            os.chmod(tmp_name, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        except OSError:
+            pass
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class _DebouncedWriter:
+    # Coalesces bursts of save requests into a single atomic write per window.
+    def __init__(self, path: Path, render, delay: float) -> None:
+        self._path = path
+        self._render = render
+        self._delay = delay
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def request(self) -> None:
+        if self._delay <= 0:
+            self._mark_dirty()
+            self.flush()
+            return
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self._delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _mark_dirty(self) -> None:
+        with self._lock:
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+            atomic_write_text(self._path, self._render())
 
 
 def _parse_fixed_offset(tz_name: str) -> tzinfo | None:
@@ -22,7 +112,12 @@ def _parse_fixed_offset(tz_name: str) -> tzinfo | None:
 
 
 def get_user_timezone() -> tzinfo:
-    tz_name = appdata.get("tz_choice", DEFAULT_TZ)
+    return timezone_for(appdata.get("tz_choice", DEFAULT_TZ))
+
+
+# Keyed by name, so changing tz_choice simply misses the cache.
+@lru_cache(maxsize=64)
+def timezone_for(tz_name: str) -> tzinfo:
     fixed_offset = _parse_fixed_offset(tz_name)
     if fixed_offset:
         return fixed_offset
@@ -36,31 +131,60 @@ def get_user_timezone_label() -> str:
     return appdata.get("tz_choice", DEFAULT_TZ)
 
 
-def localize_utc_str_to_user_tz(utc_str: str) -> str:
-    try:
-        dt_utc = datetime.strptime(utc_str, "%Y-%m-%d %H:%M:%S")
-        dt_utc = dt_utc.replace(tzinfo=timezone.utc)
-        dt_local = dt_utc.astimezone(get_user_timezone())
-        return dt_local.strftime("%Y-%m-%d %H:%M:%S")
-    except Exception:
-        return utc_str
+@lru_cache(maxsize=4096)
+def _format_epoch(epoch: int, tz_name: str) -> str:
+    return datetime.fromtimestamp(epoch, timezone_for(tz_name)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_local(epoch: int | None) -> str:
+    # Memoized per (epoch, time zone): the same log lines and console times
+    # are rendered for every snapshot and client.
+    if epoch is None:
+        return ""
+    return _format_epoch(int(epoch), appdata.get("tz_choice", DEFAULT_TZ))
 
 
 def load_appdata() -> None:
     if not APPDATA_JSON.exists():
         data = _default_appdata()
+    else:
+        with APPDATA_JSON.open("r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        data = _normalize_appdata(data)
+
+    legacy_logs = data.pop("logs", None) or []
+    consoles = data.pop("consoles", None) or []
+    with _appdata_lock:
         appdata.clear()
         appdata.update(data)
-        save_appdata()
-        return
-
-    with APPDATA_JSON.open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
+        console_registry.load(consoles)
+    _load_app_logs(legacy_logs)
 
-    data = _normalize_appdata(data)
-    appdata.clear()
-    appdata.update(data)
     save_appdata()
+    flush_appdata()
+
+
+def _load_app_logs(legacy_logs: list) -> None:
+    # One-time import of logs kept in appdata.json or logs.json by older versions.
+    entries = []
+    if APPLOGS_JSON.exists():
+        try:
+            with APPLOGS_JSON.open("r", encoding="utf-8") as handle:
+                entries = json.load(handle)
+        except (OSError, ValueError):
+            entries = []
+    entries = [entry for entry in entries + legacy_logs if isinstance(entry, dict)]
+    rows = []
+    for entry in entries:
+        ts = to_epoch(entry.get("timestamp"))
+        if ts is None:
+            continue
+        rows.append((ts, "info", None, str(entry.get("message", ""))))
+    if rows:
+        log_store.append_many(rows)
+    if APPLOGS_JSON.exists():
+        APPLOGS_JSON.replace(APPLOGS_JSON.with_name(APPLOGS_JSON.name + ".migrated"))
+    log_store.prune()
 
 
 def _default_appdata() -> dict:
@@ -68,7 +192,6 @@ def _default_appdata() -> dict:
         "master_logged_in": False,
         "last_cookie_check": None,
         "consoles": [],
-        "logs": [],
         "smtp": {
             "enabled": False,
             "host": "",
@@ -82,6 +205,7 @@ def _default_appdata() -> dict:
             "notify_connectivity_failed": True,
             "notify_backup_failed": True,
             "notify_backup_success": False,
+            "digest": True,
         },
         "schedule": {
             "backup_enabled": True,
@@ -91,21 +215,22 @@ def _default_appdata() -> dict:
             "check_value": 4,
             "check_unit": "hours",
         },
+        "retention": {
+            "enabled": False,
+            "dry_run": True,
+            "daily": 14,
+            "weekly": 8,
+            "monthly": 12,
+        },
         "tz_choice": DEFAULT_TZ,
     }
 
 
 def _normalize_appdata(data: dict) -> dict:
     data.setdefault("master_logged_in", False)
-    data.setdefault("last_cookie_check", None)
+    data["last_cookie_check"] = to_epoch(data.get("last_cookie_check"))
+    # Consoles are normalized by ConsoleRecord.from_dict when they are loaded.
     data.setdefault("consoles", [])
-    data.setdefault("logs", [])
-    for console in data["consoles"]:
-        if not isinstance(console, dict):
-            continue
-        console.setdefault("last_backup_status", "Unknown")
-        console.setdefault("last_backup_time", None)
-        console.setdefault("exclude_from_schedule", False)
     smtp = data.setdefault("smtp", {})
     smtp.setdefault("enabled", False)
     smtp.setdefault("host", "")
@@ -119,6 +244,7 @@ def _normalize_appdata(data: dict) -> dict:
     smtp.setdefault("notify_connectivity_failed", True)
     smtp.setdefault("notify_backup_failed", True)
     smtp.setdefault("notify_backup_success", False)
+    smtp.setdefault("digest", True)
     schedule = data.setdefault("schedule", {})
     for key, default_val in [
         ("backup_enabled", True),
@@ -129,6 +255,15 @@ def _normalize_appdata(data: dict) -> dict:
         ("check_unit", "hours"),
     ]:
         schedule.setdefault(key, default_val)
+    retention = data.setdefault("retention", {})
+    for key, default_val in [
+        ("enabled", False),
+        ("dry_run", True),
+        ("daily", 14),
+        ("weekly", 8),
+        ("monthly", 12),
+    ]:
+        retention.setdefault(key, default_val)
     tz_choice = data.get("tz_choice", DEFAULT_TZ)
     if tz_choice not in AVAILABLE_TIMEZONES:
         tz_choice = DEFAULT_TZ
@@ -136,14 +271,41 @@ def _normalize_appdata(data: dict) -> dict:
     return data
 
 
+def _render_appdata() -> str:
+    with _appdata_lock:
+        return json.dumps({**appdata, "consoles": console_registry.to_list()}, indent=2)
+
+
+_appdata_writer = _DebouncedWriter(APPDATA_JSON, _render_appdata, SAVE_DEBOUNCE_SECONDS)
+
+
 def save_appdata() -> None:
-    with APPDATA_JSON.open("w", encoding="utf-8") as handle:
-        json.dump(appdata, handle, indent=2)
+    _appdata_writer.request()
+    notify("appdata")
 
 
-def add_app_log(message: str) -> None:
-    now_utc_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    entry = {"timestamp": now_utc_str, "message": message}
-    appdata["logs"].append(entry)
-    appdata["logs"] = appdata["logs"][-300:]
-    save_appdata()
+def flush_appdata() -> None:
+    _appdata_writer.flush()
+
+
+atexit.register(flush_appdata)
+
+
+def get_app_logs(limit: int = MAX_APP_LOGS) -> list[dict]:
+    return list(reversed(log_store.query(limit=limit)))
+
+
+def add_app_log(message: str, *, level: str = "info", console_id: int | None = None) -> int:
+    ts = now_epoch()
+    seq = log_store.append(message, level=level, console_id=console_id, ts=ts)
+    notify(
+        "log",
+        {
+            "seq": seq,
+            "ts": ts,
+            "level": level,
+            "console_id": console_id,
+            "message": message,
+        },
+    )
+    return seq
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    # Shared by worker, scheduler and request threads; callers serialize writes.
+    conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
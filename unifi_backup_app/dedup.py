@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import threading
+
+from .catalog import file_sha256
+from .settings import BACKUP_OBJECTS_DIR
+
+
+class DedupStore:
+    # Content-addressed objects under <root>/<aa>/<digest>. Date folders keep
+    # their usual names but are hardlinks to the object, so identical backups
+    # share one inode and the link count doubles as a reference count.
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def absorb(self, path: Path, digest: str, *, verify: bool = False) -> int:
+        # Returns the number of bytes saved (0 when the content is new). With
+        # verify the file is re-hashed first, for digests that may be stale.
+        if verify and file_sha256(path) != digest:
+            raise ValueError(f"{path.name} no longer matches its recorded digest")
+        obj = self.object_path(digest)
+        with self._lock:
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                obj_stat = obj.stat()
+            except FileNotFoundError:
+                os.link(path, obj)
+                os.chmod(obj, 0o444)
+                return 0
+            path_stat = path.stat()
+            if obj_stat.st_ino == path_stat.st_ino:
+                return 0
+            if obj_stat.st_size != path_stat.st_size:
+                raise ValueError(f"object {digest} has a different size than {path.name}")
+            temp = path.with_name(f".{path.name}.dedup")
+            temp.unlink(missing_ok=True)
+            os.link(obj, temp)
+            os.replace(temp, path)
+            return path_stat.st_size
+
+    def collect_garbage(self) -> tuple[int, int]:
+        # Objects only the store still links to are no longer referenced.
+        removed = freed = 0
+        if not self.root.exists():
+            return removed, freed
+        with self._lock:
+            for bucket in os.scandir(self.root):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    stat = entry.stat()
+                    if stat.st_nlink <= 1:
+                        os.unlink(entry.path)
+                        removed += 1
+                        freed += stat.st_size
+        return removed, freed
+
+    def usage(self) -> dict:
+        objects = stored = 0
+        if self.root.exists():
+            for bucket in os.scandir(self.root):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    objects += 1
+                    stored += entry.stat().st_size
+        return {"objects": objects, "object_bytes": stored}
+
+
+dedup_store = DedupStore(BACKUP_OBJECTS_DIR)
+
+
+def storage_report(entries) -> dict:
+    # entries: catalog rows. Counts every inode once, so hardlinked backups
+    # are only charged for the first copy.
+    inodes = set()
+    logical = on_disk = files = 0
+    for entry in entries:
+        try:
+            stat = entry["path"].stat()
+        except FileNotFoundError:
+            continue
+        files += 1
+        logical += stat.st_size
+        key = (stat.st_dev, stat.st_ino)
+        if key not in inodes:
+            inodes.add(key)
+            on_disk += stat.st_size
+    return {
+        "files": files,
+        "logical_bytes": logical,
+        "stored_bytes": on_disk,
+        "saved_bytes": logical - on_disk,
+        **dedup_store.usage(),
+    }
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import threading
+import time
+
+BACKUP_EXTENSIONS = (".unf", ".tar.gz", ".unifi")
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp")
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_EVENT_HEADER = struct.Struct("iIII")
+_POLL_SECONDS = 0.25
+
+_libc = None
+_libc_lock = threading.Lock()
+
+# Files already handed to a waiter, so two waiters on the same folder never
+# return the same download.
+_claimed: set[Path] = set()
+_claimed_lock = threading.Lock()
+
+
+def is_finished_backup(name: str) -> bool:
+    return name.endswith(BACKUP_EXTENSIONS) and not name.endswith(PARTIAL_SUFFIXES)
+
+
+def _load_libc():
+    global _libc
+    if not sys.platform.startswith("linux"):
+        return None
+    with _libc_lock:
+        if _libc is None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            except OSError:
+                libc = None
+            _libc = libc if libc is not None and hasattr(libc, "inotify_init1") else False
+    return _libc or None
+
+
+def _open_inotify(folder: Path) -> int | None:
+    libc = _load_libc()
+    if libc is None:
+        return None
+    fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        return None
+    wd = libc.inotify_add_watch(fd, os.fsencode(str(folder)), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+    if wd < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class DownloadWatcher:
+    # Arm before triggering the download: only files that appear after arming are
+    # considered, and a file counts as done once it is closed after writing or
+    # renamed into place (Chrome renames its .crdownload partial when finished).
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+        self._fd: int | None = None
+        self._baseline: set[str] = set()
+
+    def __enter__(self) -> "DownloadWatcher":
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._fd = _open_inotify(self.folder)
+        self._baseline = set(os.listdir(self.folder))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def wait(self, timeout: float) -> str | None:
+        deadline = time.monotonic() + timeout
+        found = self._scan()
+        while found is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self._fd is not None:
+                found = self._wait_inotify(remaining)
+            else:
+                time.sleep(min(_POLL_SECONDS, remaining))
+                found = self._scan()
+        return found
+
+    def _wait_inotify(self, remaining: float) -> str | None:
+        readable, _, _ = select.select([self._fd], [], [], remaining)
+        if not readable:
+            return None
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return None
+        offset = 0
+        candidates = []
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b"\0").decode("utf-8", "replace")
+            offset += name_len
+            if mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and is_finished_backup(name):
+                candidates.append(name)
+        for name in candidates:
+            if self._claim(name):
+                return name
+        return None
+
+    def _scan(self) -> str | None:
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            if name in self._baseline or not is_finished_backup(name):
+                continue
+            if self._claim(name):
+                return name
+        return None
+
+    def _claim(self, name: str) -> bool:
+        path = self.folder / name
+        if not path.is_file():
+            return False
+        with _claimed_lock:
+            if path in _claimed:
+                return False
+            _claimed.add(path)
+        return True
+
+
+def release_claim(path: Path) -> None:
+    with _claimed_lock:
+        _claimed.discard(path)
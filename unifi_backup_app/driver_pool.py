@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+import queue
+
+import psutil
+
+from .settings import COOKIES_JSON, DOWNLOAD_DIR, DRIVER_MAX_RSS_MB, DRIVER_MAX_USES
+from .state import log_console
+
+
+class DriverSession:
+    def __init__(self, slot: int, download_dir: Path) -> None:
+        self.slot = slot
+        self.download_dir = download_dir
+        self.driver = None
+        self.uses = 0
+        self.cookies_mtime: float | None = None
+        self.broken = False
+
+    def discard(self) -> None:
+        self.broken = True
+
+
+def _cookies_mtime() -> float | None:
+    try:
+        return COOKIES_JSON.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def driver_process_tree(driver) -> list[psutil.Process]:
+    service_process = getattr(getattr(driver, "service", None), "process", None)
+    if service_process is None:
+        return []
+    try:
+        root = psutil.Process(service_process.pid)
+        return root.children(recursive=True) + [root]
+    except psutil.NoSuchProcess:
+        return []
+
+
+def driver_rss_mb(driver) -> float:
+    total = 0
+    for proc in driver_process_tree(driver):
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+# Warm, cookie-loaded Chrome sessions reused across consoles. Each session owns a
+# private download folder and is health-checked on lease, recycled after too many
+# uses or too much RSS, and rebuilt when it crashes.
+class DriverPool:
+    def __init__(self, size: int, open_driver, close_driver, load_cookies, clear_dir) -> None:
+        self._open_driver = open_driver
+        self._close_driver = close_driver
+        self._load_cookies = load_cookies
+        self._clear_dir = clear_dir
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        for slot in range(1, size + 1):
+            self._idle.put(DriverSession(slot, DOWNLOAD_DIR / f"worker-{slot}"))
+
+    @contextmanager
+    def lease(self):
+        session = self._idle.get()
+        try:
+            self._prepare(session)
+            yield session
+            session.uses += 1
+        except Exception:
+            session.broken = True
+            raise
+        finally:
+            if session.driver is not None and (session.broken or self._needs_recycle(session)):
+                self._shutdown(session)
+            self._idle.put(session)
+
+    def close_all(self) -> None:
+        idle_sessions = []
+        while True:
+            try:
+                idle_sessions.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for session in idle_sessions:
+            if session.driver is not None:
+                self._shutdown(session)
+            self._idle.put(session)
+
+    def _prepare(self, session: DriverSession) -> None:
+        session.download_dir.mkdir(parents=True, exist_ok=True)
+        self._clear_dir(session.download_dir)
+
+        if session.driver is not None and not self._is_healthy(session):
+            log_console(f"[DriverPool] Session {session.slot} unhealthy => rebuilding.")
+            self._shutdown(session)
+
+        if session.driver is None:
+            session.driver = self._open_driver(download_dir=session.download_dir)
+            session.uses = 0
+            session.cookies_mtime = None
+            session.broken = False
+            log_console(f"[DriverPool] Session {session.slot} started.")
+
+        cookies_mtime = _cookies_mtime()
+        if cookies_mtime != session.cookies_mtime:
+            if cookies_mtime is None:
+                session.driver.delete_all_cookies()
+            else:
+                self._load_cookies(session.driver)
+            session.cookies_mtime = cookies_mtime
+
+    def _is_healthy(self, session: DriverSession) -> bool:
+        try:
+            session.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, session: DriverSession) -> bool:
+        if DRIVER_MAX_USES and session.uses >= DRIVER_MAX_USES:
+            log_console(f"[DriverPool] Session {session.slot} reached {session.uses} uses => recycling.")
+            return True
+        if DRIVER_MAX_RSS_MB:
+            rss_mb = driver_rss_mb(session.driver)
+            if rss_mb > DRIVER_MAX_RSS_MB:
+                log_console(
+                    f"[DriverPool] Session {session.slot} uses {rss_mb:.0f} MB RSS => recycling."
+                )
+                return True
+        return False
+
+    def _shutdown(self, session: DriverSession) -> None:
+        driver = session.driver
+        session.driver = None
+        session.cookies_mtime = None
+        session.broken = False
+        try:
+            self._close_driver(driver)
+        except Exception as exc:
+            log_console(f"[DriverPool] Session {session.slot} close failed => {exc}")
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from collections import deque
+import json
+import threading
+import time
+
+_hooks: list = []
+
+
+def add_hook(callback) -> None:
+    _hooks.append(callback)
+
+
+def notify(kind: str, payload=None) -> None:
+    # Lets data/state report mutations without importing the status layer.
+    for callback in list(_hooks):
+        try:
+            callback(kind, payload)
+        except Exception as exc:
+            print(f"[Events] hook for '{kind}' failed: {exc}")
+
+
+def encode_frame(event_id: str, event_type: str, payload) -> bytes:
+    return (
+        f"id: {event_id}\nevent: {event_type}\n"
+        f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+    ).encode("utf-8")
+
+
+class EventBus:
+    # Versioned SSE frames kept in a bounded ring so clients can resume with
+    # Last-Event-ID. Each frame is encoded once, at publish time, and the same
+    # bytes are written to every subscriber.
+    def __init__(self, history: int = 2000) -> None:
+        self._cond = threading.Condition()
+        self._frames: deque = deque(maxlen=history)
+        self._version = 0
+        # Event ids carry the process start so ids from a previous run never match.
+        self._boot = str(int(time.time()))
+        self._closed = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        # Wakes every waiting stream so it can end before the server stops.
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def publish(self, event_type: str, payload) -> int:
+        with self._cond:
+            self._version += 1
+            frame = encode_frame(self.event_id(self._version), event_type, payload)
+            self._frames.append((self._version, frame))
+            self._cond.notify_all()
+            return self._version
+
+    def event_id(self, version: int) -> str:
+        return f"{self._boot}-{version}"
+
+    def parse_event_id(self, value: str | None) -> int | None:
+        boot, _, version = (value or "").partition("-")
+        if boot != self._boot or not version.isdigit():
+            return None
+        return int(version)
+
+    def frames_since(self, last_id: int) -> list[tuple[int, bytes]] | None:
+        # None means the client is too far behind and needs a fresh snapshot.
+        with self._cond:
+            if last_id > self._version:
+                return None
+            if last_id == self._version:
+                return []
+            if not self._frames or self._frames[0][0] > last_id + 1:
+                return None
+            pending = []
+            for item in reversed(self._frames):
+                if item[0] <= last_id:
+                    break
+                pending.append(item)
+            pending.reverse()
+            return pending
+
+    def wait_for(self, last_id: int, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._closed or self._version > last_id, timeout
+            )
+
+
+bus = EventBus()
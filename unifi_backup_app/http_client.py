@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .settings import (
+    BACKUP_CONCURRENCY,
+    COOKIES_JSON,
+    SESSION_CHECK_TTL_SECONDS,
+    SESSION_CHECK_URL,
+)
+
+_CHUNK_SIZE = 1024 * 1024
+_DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0 Safari/537.36"
+)
+
+_session: requests.Session | None = None
+_session_cookies_mtime: float | None = None
+_session_lock = threading.Lock()
+
+_session_check_cache: dict = {"cookies_mtime": None, "checked_at": 0.0, "valid": None}
+_session_check_lock = threading.Lock()
+
+
+class DownloadSizeMismatch(Exception):
+    pass
+
+
+def _cookies_mtime() -> float | None:
+    try:
+        return COOKIES_JSON.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def _seed_cookies(session: requests.Session) -> None:
+    session.cookies.clear()
+    if not COOKIES_JSON.exists():
+        return
+    with COOKIES_JSON.open("r", encoding="utf-8") as handle:
+        cookies = json.load(handle)
+    for cookie in cookies:
+        try:
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+        except (KeyError, TypeError):
+            continue
+
+
+def get_http_session() -> requests.Session:
+    # One pooled session shared by every worker; its cookie jar follows cookies.json.
+    global _session, _session_cookies_mtime
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, BACKUP_CONCURRENCY * 2))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = _DEFAULT_USER_AGENT
+            _session = session
+            _session_cookies_mtime = None
+        cookies_mtime = _cookies_mtime()
+        if cookies_mtime != _session_cookies_mtime:
+            _seed_cookies(_session)
+            _session_cookies_mtime = cookies_mtime
+        return _session
+
+
+def _cookie_header() -> str:
+    # Sent explicitly so host-only unifi.ui.com cookies also reach the SSO endpoint.
+    if not COOKIES_JSON.exists():
+        return ""
+    with COOKIES_JSON.open("r", encoding="utf-8") as handle:
+        cookies = json.load(handle)
+    pairs = []
+    for cookie in cookies:
+        try:
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+        except (KeyError, TypeError):
+            continue
+    return "; ".join(pairs)
+
+
+def _classify_session_response(resp: requests.Response) -> bool | None:
+    if resp.status_code in (401, 403):
+        return False
+    if resp.is_redirect:
+        location = resp.headers.get("Location", "").lower()
+        if "/login" in location or "/mfa" in location or "account.ui.com" in location:
+            return False
+        return None
+    if resp.status_code == 200:
+        content_type = resp.headers.get("Content-Type", "")
+        return True if "json" in content_type else None
+    return None
+
+
+def invalidate_session_check() -> None:
+    # A browser found the session dead; the cookies file is unchanged, so the
+    # cached answer would otherwise stay True until the TTL runs out.
+    with _session_check_lock:
+        _session_check_cache.update({"cookies_mtime": None, "checked_at": 0.0, "valid": None})
+
+
+def validate_session_http(use_cache: bool = True) -> bool | None:
+    # True/False when the SSO endpoint answers clearly, None when a browser check is needed.
+    cookies_mtime = _cookies_mtime()
+    if cookies_mtime is None:
+        return False
+    now = time.monotonic()
+    with _session_check_lock:
+        cached = _session_check_cache
+        if (
+            use_cache
+            and cached["valid"] is not None
+            and cached["cookies_mtime"] == cookies_mtime
+            and now - cached["checked_at"] < SESSION_CHECK_TTL_SECONDS
+        ):
+            return cached["valid"]
+
+    try:
+        resp = get_http_session().get(
+            SESSION_CHECK_URL,
+            headers={
+                "Accept": "application/json",
+                "Cookie": _cookie_header(),
+                "User-Agent": _DEFAULT_USER_AGENT,
+            },
+            allow_redirects=False,
+            timeout=(5, 10),
+        )
+    except (requests.RequestException, OSError, ValueError):
+        return None
+    valid = _classify_session_response(resp)
+    resp.close()
+
+    if valid is not None:
+        with _session_check_lock:
+            _session_check_cache.update(
+                {"cookies_mtime": cookies_mtime, "checked_at": now, "valid": valid}
+            )
+    return valid
+
+
+def _expected_total(resp: requests.Response, offset: int) -> int | None:
+    if resp.status_code == 206:
+        content_range = resp.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        if total.isdigit():
+            return int(total)
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if resp.status_code == 206 else 0)
+    return None
+
+
+def _rehash_partial(part_path: Path, length: int):
+    # Only needed when a write failed mid-chunk or the server restarted the
+    # transfer; normally the digest is updated as bytes are written.
+    digest = hashlib.sha256()
+    if length:
+        with part_path.open("rb") as handle:
+            remaining = length
+            while remaining:
+                chunk = handle.read(min(_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+    return digest, length
+
+
+def stream_download(
+    url: str,
+    dest: Path,
+    *,
+    cookies: dict | None = None,
+    headers: dict | None = None,
+    max_bytes_per_second: int = 0,
+    attempts: int = 3,
+) -> tuple[int, str]:
+    # Returns the size and SHA-256 of the file, hashed while it is written.
+    session = get_http_session()
+    part_path = dest.with_name(dest.name + ".part")
+    expected: int | None = None
+    last_exc: Exception | None = None
+    digest = hashlib.sha256()
+    hashed = 0
+    # Resume only within this call: a leftover partial may belong to another backup.
+    part_path.unlink(missing_ok=True)
+
+    for attempt in range(1, attempts + 1):
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        request_headers = {"Accept-Encoding": "identity", **(headers or {})}
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+        try:
+            with session.get(
+                url,
+                headers=request_headers,
+                cookies=cookies,
+                stream=True,
+                timeout=(10, 60),
+            ) as resp:
+                if resp.status_code == 416 and expected is not None and offset == expected:
+                    break
+                resp.raise_for_status()
+                if offset and resp.status_code != 206:
+                    # Server ignored the range request; start over.
+                    offset = 0
+                expected = _expected_total(resp, offset)
+                if hashed != offset:
+                    digest, hashed = _rehash_partial(part_path, offset)
+                started = time.monotonic()
+                written = 0
+                with part_path.open("ab" if offset else "wb") as handle:
+                    for chunk in resp.iter_content(_CHUNK_SIZE):
+                        handle.write(chunk)
+                        digest.update(chunk)
+                        hashed += len(chunk)
+                        written += len(chunk)
+                        if max_bytes_per_second:
+                            ahead = written / max_bytes_per_second - (time.monotonic() - started)
+                            if ahead > 0:
+                                time.sleep(ahead)
+            size = part_path.stat().st_size
+            if expected is None or size == expected:
+                break
+            if size > expected:
+                part_path.unlink()
+                raise DownloadSizeMismatch(f"received {size} bytes, expected {expected}")
+            last_exc = DownloadSizeMismatch(f"received {size} of {expected} bytes")
+        except requests.RequestException as exc:
+            last_exc = exc
+        if attempt < attempts:
+            time.sleep(2 ** attempt)
+    else:
+        part_path.unlink(missing_ok=True)
+        raise last_exc or DownloadSizeMismatch("download did not complete")
+
+    size = part_path.stat().st_size
+    if expected is not None and size != expected:
+        raise DownloadSizeMismatch(f"received {size} bytes, expected {expected}")
+    if hashed != size:
+        digest, hashed = _rehash_partial(part_path, size)
+    os.replace(part_path, dest)
+    return size, digest.hexdigest()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from .db import connect
+from .settings import LOG_MAX_ENTRIES, LOG_RETENTION_DAYS, LOGS_DB
+
+LEVELS = ("info", "warning", "error")
+_PRUNE_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    level TEXT NOT NULL DEFAULT 'info',
+    console_id INTEGER,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs (ts);
+CREATE INDEX IF NOT EXISTS idx_logs_console ON logs (console_id, seq);
+CREATE INDEX IF NOT EXISTS idx_logs_level ON logs (level, seq);
+"""
+
+
+def _row_to_entry(row) -> dict:
+    return {
+        "seq": row["seq"],
+        "ts": row["ts"],
+        "level": row["level"],
+        "console_id": row["console_id"],
+        "message": row["message"],
+    }
+
+
+class LogStore:
+    def __init__(self, path) -> None:
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._appends_since_prune = 0
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def append(
+        self,
+        message: str,
+        *,
+        level: str = "info",
+        console_id: int | None = None,
+        ts: int | None = None,
+    ) -> int:
+        if level not in LEVELS:
+            level = "info"
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO logs (ts, level, console_id, message) VALUES (?, ?, ?, ?)",
+                (int(ts if ts is not None else time.time()), level, console_id, message),
+            )
+            seq = cursor.lastrowid
+            self._appends_since_prune += 1
+            should_prune = self._appends_since_prune >= _PRUNE_EVERY
+        if should_prune:
+            self.prune()
+        return seq
+
+    def append_many(self, entries: list[tuple[int, str, int | None, str]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO logs (ts, level, console_id, message) VALUES (?, ?, ?, ?)",
+                    entries,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def query(
+        self,
+        *,
+        after_seq: int | None = None,
+        before_seq: int | None = None,
+        console_id: int | None = None,
+        level: str | None = None,
+        since_ts: int | None = None,
+        until_ts: int | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        # Newest first when paging backwards (before_seq), oldest first when
+        # following new entries (after_seq).
+        clauses = []
+        params: list = []
+        if after_seq is not None:
+            clauses.append("seq > ?")
+            params.append(after_seq)
+        if before_seq is not None:
+            clauses.append("seq < ?")
+            params.append(before_seq)
+        if console_id is not None:
+            clauses.append("console_id = ?")
+            params.append(console_id)
+        if level is not None:
+            clauses.append("level = ?")
+            params.append(level)
+        if since_ts is not None:
+            clauses.append("ts >= ?")
+            params.append(since_ts)
+        if until_ts is not None:
+            clauses.append("ts < ?")
+            params.append(until_ts)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if after_seq is not None else "DESC"
+        params.append(max(1, int(limit)))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, ts, level, console_id, message FROM logs {where} "
+                f"ORDER BY seq {order} LIMIT ?",
+                params,
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def latest_seq(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seq) AS seq FROM logs").fetchone()
+        return int(row["seq"] or 0)
+
+    def iter_all(self, batch_size: int = 1000):
+        after_seq = 0
+        while True:
+            batch = self.query(after_seq=after_seq, limit=batch_size)
+            if not batch:
+                return
+            yield from batch
+            after_seq = batch[-1]["seq"]
+
+    def prune(self) -> int:
+        removed = 0
+        with self._lock:
+            self._appends_since_prune = 0
+            if LOG_RETENTION_DAYS:
+                cutoff = int(time.time()) - LOG_RETENTION_DAYS * 86400
+                removed += self._conn.execute("DELETE FROM logs WHERE ts < ?", (cutoff,)).rowcount
+            if LOG_MAX_ENTRIES:
+                removed += self._conn.execute(
+                    "DELETE FROM logs WHERE seq <= (SELECT MAX(seq) FROM logs) - ?",
+                    (LOG_MAX_ENTRIES,),
+                ).rowcount
+        return removed
+
+
+log_store = LogStore(LOGS_DB)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+from .catalog import backup_catalog
+from .consoles import ConsoleRecord
+from .data import timezone_for
+from .dedup import dedup_store, storage_report
+from .retention import apply_retention, plan_retention
+from .settings import APPDATA_JSON, DEFAULT_TZ
+
+
+def _load_appdata() -> dict:
+    # Read-only view of appdata.json; maintenance commands must not rewrite
+    # it underneath a running app.
+    if not APPDATA_JSON.exists():
+        return {}
+    with APPDATA_JSON.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _load_consoles(data: dict | None = None) -> list[ConsoleRecord]:
+    if data is None:
+        data = _load_appdata()
+    return [
+        ConsoleRecord.from_dict(item)
+        for item in data.get("consoles", [])
+        if isinstance(item, dict) and "id" in item
+    ]
+
+
+def _reconcile(args) -> None:
+    result = backup_catalog.reconcile(_load_consoles())
+    print(
+        f"Catalog reconciled: {result['added']} added, {result['updated']} updated, "
+        f"{result['removed']} removed."
+    )
+
+
+def _mib(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def _dedup(args) -> None:
+    # Moves backups taken before BACKUP_DEDUP was enabled into the store.
+    # Catalog digests can be stale, so every file is re-hashed before it is
+    # linked; a file that fails is reported and left as it is.
+    saved = absorbed = skipped = 0
+    for entry in backup_catalog.iter_entries():
+        if not entry["sha256"] or not entry["path"].is_file():
+            continue
+        try:
+            saved += dedup_store.absorb(entry["path"], entry["sha256"], verify=True)
+        except (OSError, ValueError) as exc:
+            print(f"Skipped {entry['date_folder']}/{entry['filename']}: {exc}")
+            skipped += 1
+            continue
+        absorbed += 1
+    removed, freed = dedup_store.collect_garbage()
+    print(f"Deduplicated {absorbed} backups, {_mib(saved)} reclaimed.")
+    if skipped:
+        print(f"Skipped {skipped} backups; run 'reconcile' to refresh their digests.")
+    if removed:
+        print(f"Removed {removed} unreferenced objects, {_mib(freed)} freed.")
+
+
+def _storage(args) -> None:
+    report = storage_report(backup_catalog.iter_entries())
+    potential = backup_catalog.storage_stats()
+    print(f"Backups            : {report['files']}")
+    print(f"Logical size       : {_mib(report['logical_bytes'])}")
+    print(f"On disk            : {_mib(report['stored_bytes'])}")
+    print(f"Saved by dedup     : {_mib(report['saved_bytes'])}")
+    print(f"Store objects      : {report['objects']} ({_mib(report['object_bytes'])})")
+    print(
+        f"Unique contents    : {potential['unique_files']} "
+        f"({_mib(potential['unique_bytes'])} if fully deduplicated)"
+    )
+
+
+def _retention(args) -> None:
+    data = _load_appdata()
+    policy = dict(data.get("retention") or {"daily": 14, "weekly": 8, "monthly": 12})
+    for tier in ("daily", "weekly", "monthly"):
+        if getattr(args, tier) is not None:
+            policy[tier] = getattr(args, tier)
+    consoles = _load_consoles(data)
+    plan = plan_retention(consoles, policy, timezone_for(data.get("tz_choice", DEFAULT_TZ)))
+    for item in plan["consoles"]:
+        print(
+            f"{item['console_name'] or item['console_id']:<30} keep {item['keep']:>4}, "
+            f"delete {item['delete']:>4} ({_mib(item['delete_bytes'])})"
+        )
+    if not args.apply:
+        print(f"Dry run: {len(plan['delete'])} backups would be deleted. Use --apply to delete them.")
+        return
+    # recent_backups in appdata.json is left to the app; stale entries there
+    # only point at files that no longer download.
+    result = apply_retention(plan, [])
+    print(
+        f"Deleted {result['deleted']} backups and {result['folders_removed']} empty folders, "
+        f"{_mib(result['freed_bytes'])} freed."
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backup store maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reconcile", help="Rebuild the backup catalog from disk.").set_defaults(
+        handler=_reconcile
+    )
+    commands.add_parser(
+        "dedup", help="Move existing backups into the content-addressed store."
+    ).set_defaults(handler=_dedup)
+    commands.add_parser("storage", help="Report backup disk usage and dedup savings.").set_defaults(
+        handler=_storage
+    )
+    retention = commands.add_parser(
+        "retention", help="Show (or with --apply, delete) backups outside the retention policy."
+    )
+    retention.add_argument("--apply", action="store_true", help="Delete instead of reporting.")
+    for tier in ("daily", "weekly", "monthly"):
+        retention.add_argument(f"--{tier}", type=int, help=f"Override the {tier} count.")
+    retention.set_defaults(handler=_retention)
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,25 @@ from __future__ import annotations
 from datetime import datetime, timezone
 import smtplib
 from email.message import EmailMessage
+import os
+import random
+import sqlite3
+import threading
+import time
 
-from .data import appdata, get_user_timezone, get_user_timezone_label
+from .data import add_app_log, appdata, get_user_timezone, get_user_timezone_label
+from .outbox import notification_outbox
+from .settings import (
+    NOTIFY_RETRY_ATTEMPTS,
+    NOTIFY_RETRY_BASE_SECONDS,
+    NOTIFY_RETRY_MAX_SECONDS,
+    SMTP_KEEPALIVE_SECONDS,
+)
+from .state import current_job_item, log_console
+
+_SENDER_IDLE_SECONDS = 60
+
+_SUBJECT_PREFIX = "UniFi Backup: "
 
 
 def _smtp_config() -> dict:
@@ -22,6 +39,81 @@ def _format_local_time() -> str:
     return f"{now_local.strftime('%Y-%m-%d %H:%M:%S')} {tz_label}"
 
 
+def _open_smtp(config: tuple) -> smtplib.SMTP:
+    host, port, username, password, use_ssl = config
+    server = smtplib.SMTP_SSL(host, port, timeout=20) if use_ssl else smtplib.SMTP(host, port, timeout=20)
+    try:
+        if username:
+            server.login(username, password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+class _SmtpConnection:
+    # One logged-in session shared by every send. It is kept open for
+    # SMTP_KEEPALIVE_SECONDS after the last message, so a burst of mails costs
+    # one handshake; a changed configuration opens a new session.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._server: smtplib.SMTP | None = None
+        self._config: tuple | None = None
+        self._idle_timer: threading.Timer | None = None
+
+    def send(self, config: tuple, msg: EmailMessage) -> None:
+        with self._lock:
+            self._cancel_idle_timer()
+            try:
+                reused = self._server is not None and self._config == config
+                if not reused:
+                    self._connect(config)
+                try:
+                    self._server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # The relay dropped the idle session; reconnect once.
+                    self._connect(config)
+                    self._server.send_message(msg)
+            except Exception:
+                self._close()
+                raise
+            if SMTP_KEEPALIVE_SECONDS:
+                self._idle_timer = threading.Timer(SMTP_KEEPALIVE_SECONDS, self.close)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+            else:
+                self._close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._cancel_idle_timer()
+            self._close()
+
+    def _connect(self, config: tuple) -> None:
+        self._close()
+        self._server = _open_smtp(config)
+        self._config = config
+
+    def _close(self) -> None:
+        server, self._server, self._config = self._server, None, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _cancel_idle_timer(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+
+_connection = _SmtpConnection()
+
+
 def send_notification(subject: str, body: str) -> None:
     smtp = _smtp_config()
     if not smtp.get("enabled"):
@@ -45,16 +137,200 @@ def send_notification(subject: str, body: str) -> None:
     msg["To"] = ", ".join(recipients)
     msg.set_content(body)
 
-    if use_ssl:
-        with smtplib.SMTP_SSL(host, port, timeout=20) as server:
-            if username:
-                server.login(username, password)
-            server.send_message(msg)
-    else:
-        with smtplib.SMTP(host, port, timeout=20) as server:
-            if username:
-                server.login(username, password)
-            server.send_message(msg)
+    _connection.send((host, port, username, password, use_ssl), msg)
+
+
+def close_smtp_connection() -> None:
+    _connection.close()
+
+
+# Notifications raised by the console tasks of a scheduled pass are held in
+# the outbox's digest table until the pass's job finishes. Job ids restart at
+# job-1 with the process, so the rows are keyed by run and job id; rows of an
+# earlier run belong to a pass that never finished.
+_RUN_KEY = f"{int(time.time())}-{os.getpid()}"
+
+
+def _digest_key(job_id: str) -> str:
+    return f"{_RUN_KEY}/{job_id}"
+
+
+def _enqueue(subject: str, body: str, dedup_key: str | None = None) -> None:
+    # Backups only write to the outbox; the sender thread talks to the SMTP
+    # server, so a slow or unreachable relay never holds up a backup.
+    try:
+        notification_outbox.add(subject, body, dedup_key=dedup_key)
+    except sqlite3.Error as exc:
+        add_app_log(f"Notifications => could not queue '{subject}' => {exc}", level="warning")
+        return
+    _sender_wake.set()
+
+
+def _dispatch(
+    subject: str,
+    body: str,
+    *,
+    kind: str = "failed",
+    dedup_key: str | None = None,
+    critical: bool = False,
+) -> None:
+    # Critical notifications need action before the next pass and always go
+    # out immediately.
+    if not _smtp_config().get("enabled"):
+        return
+    job_id = console_id = None
+    if not critical and _smtp_config().get("digest", True):
+        job_id, console_id = current_job_item()
+    if job_id is None:
+        _enqueue(subject, body, dedup_key)
+        return
+    try:
+        notification_outbox.add_digest_entry(_digest_key(job_id), console_id or 0, subject, body, kind)
+    except sqlite3.Error as exc:
+        add_app_log(f"Notifications => could not hold '{subject}' for the summary => {exc}", level="warning")
+        _enqueue(subject, body, dedup_key)
+
+
+def record_digest_outcome(job_id: str, console_id: int, outcome: str, attempts: int = 0) -> None:
+    # outcome: "succeeded", "failed" or "cancelled", as for finish_job_item.
+    try:
+        notification_outbox.set_digest_outcome(_digest_key(job_id), console_id, outcome, attempts)
+    except sqlite3.Error as exc:
+        log_console(f"[Notifications] could not record digest outcome: {exc}")
+
+
+def _digest_section(entry: dict) -> str:
+    title = entry["subject"].removeprefix(_SUBJECT_PREFIX)
+    attempts = entry["attempts"] or entry["events"]
+    if entry["outcome"] is None:
+        title += " (unfinished)"
+    elif entry["outcome"] == "cancelled":
+        title += f" (cancelled after {attempts} attempt{'s' if attempts != 1 else ''})"
+    elif attempts > 1:
+        title += f" ({attempts} attempts)"
+    return f"== {title}\n{entry['body'].rstrip()}"
+
+
+def _digest_sections(entries: list[dict]) -> list[str]:
+    # Failures first; they are what the summary is read for.
+    return [_digest_section(entry) for entry in sorted(entries, key=lambda entry: entry["kind"] == "success")]
+
+
+def flush_digest(job: dict) -> None:
+    outcome = f"{job['succeeded']} succeeded, {job['failed']} failed"
+    if job["cancelled"]:
+        outcome += f", {job['cancelled']} cancelled"
+
+    def render(entries: list[dict]) -> tuple[str, str]:
+        sections = [f"Scheduled backup finished at {_format_local_time()} ({outcome}).", *_digest_sections(entries)]
+        return f"{_SUBJECT_PREFIX}Scheduled backup summary ({outcome})", "\n\n".join(sections)
+
+    _finish_digest(_digest_key(job["id"]), render)
+
+
+def _render_interrupted(entries: list[dict]) -> tuple[str, str]:
+    started = datetime.fromtimestamp(min(entry["created"] for entry in entries), get_user_timezone())
+    sections = [
+        f"A scheduled backup started around {started.strftime('%Y-%m-%d %H:%M:%S')} "
+        f"{get_user_timezone_label()} was interrupted before it finished "
+        "(the app stopped). Notifications raised until then:",
+        *_digest_sections(entries),
+    ]
+    return f"{_SUBJECT_PREFIX}Scheduled backup interrupted", "\n\n".join(sections)
+
+
+def _finish_digest(job_key: str, render) -> None:
+    try:
+        if notification_outbox.finish_digest(job_key, render):
+            _sender_wake.set()
+    except sqlite3.Error as exc:
+        add_app_log(f"Notifications => could not queue the backup summary => {exc}", level="warning")
+
+
+def flush_open_digests(*, current_run: bool) -> None:
+    # At startup (current_run=False) this sends what passes of an earlier run
+    # left behind; at shutdown, what the passes still running had collected.
+    try:
+        keys = notification_outbox.digest_keys()
+    except sqlite3.Error as exc:
+        log_console(f"[Notifications] could not read open digests: {exc}")
+        return
+    for job_key in keys:
+        if job_key.startswith(f"{_RUN_KEY}/") == current_run:
+            _finish_digest(job_key, _render_interrupted)
+
+
+def _retry_delay(attempt: int) -> float:
+    # Same equal-jitter backoff as console retries.
+    delay = min(NOTIFY_RETRY_MAX_SECONDS, NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def deliver_due_notifications() -> int:
+    # Sends every outbox message that is due; returns how many went out.
+    sent = 0
+    while True:
+        batch = notification_outbox.due()
+        if not batch:
+            return sent
+        for message in batch:
+            attempt = message["attempts"] + 1
+            try:
+                send_notification(message["subject"], message["body"])
+            except Exception as exc:
+                # Not only SMTP errors: a bad port or a header the message
+                # cannot encode must still count as an attempt, or the row
+                # would be retried forever and hold up the rest of the batch.
+                if attempt >= NOTIFY_RETRY_ATTEMPTS:
+                    notification_outbox.mark_failed(message["id"], str(exc))
+                    add_app_log(
+                        f"Notifications => '{message['subject']}' dropped after {attempt} attempts => {exc}",
+                        level="error",
+                    )
+                else:
+                    notification_outbox.mark_retry(message["id"], str(exc), time.time() + _retry_delay(attempt))
+                    log_console(f"[Notifications] '{message['subject']}' => attempt {attempt} failed => {exc}")
+                continue
+            notification_outbox.mark_sent(message["id"])
+            sent += 1
+
+
+_sender_wake = threading.Event()
+_sender_stop = threading.Event()
+_sender_thread: threading.Thread | None = None
+
+
+def _sender_loop() -> None:
+    while not _sender_stop.is_set():
+        _sender_wake.clear()
+        try:
+            deliver_due_notifications()
+            next_attempt = notification_outbox.next_attempt()
+        except Exception as exc:
+            log_console(f"[Notifications] sender error: {exc}")
+            next_attempt = None
+        timeout = _SENDER_IDLE_SECONDS
+        if next_attempt is not None:
+            timeout = min(timeout, max(0.0, next_attempt - time.time()))
+        _sender_wake.wait(timeout)
+
+
+def start_notification_sender() -> None:
+    # Messages left in the outbox by a previous run are picked up here.
+    global _sender_thread
+    if _sender_thread and _sender_thread.is_alive():
+        return
+    flush_open_digests(current_run=False)
+    _sender_stop.clear()
+    _sender_thread = threading.Thread(target=_sender_loop, name="notifications", daemon=True)
+    _sender_thread.start()
+
+
+def stop_notification_sender() -> None:
+    # Summaries of unfinished passes stay in the outbox for the next start.
+    flush_open_digests(current_run=True)
+    _sender_stop.set()
+    _sender_wake.set()
 
 
 def send_test_email() -> tuple[bool, str]:
@@ -93,7 +369,7 @@ def notify_cookies_expired(console_name: str, url: str) -> None:
         f"Detected: {now}\n"
         "Action: Upload fresh cookies or re-login to renew the session."
     )
-    send_notification(subject, body)
+    _dispatch(subject, body, dedup_key=f"cookies_expired:{console_name}", critical=True)
 
 
 def notify_connectivity_failed(console_name: str, url: str, error: str) -> None:
@@ -107,7 +383,7 @@ def notify_connectivity_failed(console_name: str, url: str, error: str) -> None:
         f"Error: {error}\n"
         f"Time: {now}\n"
     )
-    send_notification(subject, body)
+    _dispatch(subject, body, dedup_key=f"connectivity_failed:{console_name}:{error}")
 
 
 def notify_backup_failed(console_name: str, url: str, error: str) -> None:
@@ -121,7 +397,7 @@ def notify_backup_failed(console_name: str, url: str, error: str) -> None:
         f"Error: {error}\n"
         f"Time: {now}\n"
     )
-    send_notification(subject, body)
+    _dispatch(subject, body, dedup_key=f"backup_failed:{console_name}:{error}")
 
 
 def notify_backup_success(console_name: str, url: str, filename: str) -> None:
@@ -135,4 +411,4 @@ def notify_backup_success(console_name: str, url: str, filename: str) -> None:
         f"File: {filename}\n"
         f"Time: {now}\n"
     )
-    send_notification(subject, body)
+    _dispatch(subject, body, kind="success")
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from .db import connect
+from .settings import NOTIFY_OUTBOX_DB
+
+_FAILED_KEEP_SECONDS = 30 * 24 * 3600
+
+# A dedup key is unique among pending messages only: the same failure raised
+# again while its first email is still queued is dropped, but once that email
+# has gone out a new occurrence is queued again.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created INTEGER NOT NULL,
+    dedup_key TEXT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup ON outbox (dedup_key)
+    WHERE status = 'pending' AND dedup_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+
+-- Notifications held for a scheduled pass's summary: one row per console
+-- (0 when the task had none) with its latest notification, until the pass
+-- finishes and the rows are replaced by the summary message.
+CREATE TABLE IF NOT EXISTS digest (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_key TEXT NOT NULL,
+    console_id INTEGER NOT NULL,
+    created INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    events INTEGER NOT NULL DEFAULT 1,
+    outcome TEXT,
+    attempts INTEGER,
+    UNIQUE (job_key, console_id)
+);
+"""
+
+
+class NotificationOutbox:
+    def __init__(self, path) -> None:
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status = 'failed' AND created < ?",
+                (int(time.time()) - _FAILED_KEEP_SECONDS,),
+            )
+
+    def add(self, subject: str, body: str, *, dedup_key: str | None = None) -> bool:
+        # Returns False when a pending message already has the dedup key.
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (created, dedup_key, subject, body, next_attempt) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (int(now), dedup_key, subject, body, now),
+            )
+        return cursor.rowcount > 0
+
+    def due(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, subject, body, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt, id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def next_attempt(self) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt) AS at FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row["at"]
+
+    def mark_sent(self, message_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+
+    def mark_retry(self, message_id: int, error: str, next_attempt: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt = ? "
+                "WHERE id = ?",
+                (error, next_attempt, message_id),
+            )
+
+    def mark_failed(self, message_id: int, error: str) -> None:
+        # Kept (for a while) so undelivered mail can be inspected.
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, status = 'failed' "
+                "WHERE id = ?",
+                (error, message_id),
+            )
+
+    def add_digest_entry(self, job_key: str, console_id: int, subject: str, body: str, kind: str) -> None:
+        # A retried console only keeps its latest notification.
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO digest (job_key, console_id, created, subject, body, kind) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (job_key, console_id) DO UPDATE SET "
+                "subject = excluded.subject, body = excluded.body, kind = excluded.kind, "
+                "events = events + 1",
+                (job_key, console_id, int(time.time()), subject, body, kind),
+            )
+
+    def set_digest_outcome(self, job_key: str, console_id: int, outcome: str, attempts: int = 0) -> None:
+        with self._lock:
+            if outcome == "succeeded":
+                # Failures a retry recovered from; a success is only listed
+                # when it was itself notified.
+                self._conn.execute(
+                    "DELETE FROM digest WHERE job_key = ? AND console_id = ? AND kind != 'success'",
+                    (job_key, console_id),
+                )
+            self._conn.execute(
+                "UPDATE digest SET outcome = ?, attempts = CASE WHEN ? > 0 THEN ? ELSE events END "
+                "WHERE job_key = ? AND console_id = ?",
+                (outcome, attempts, attempts, job_key, console_id),
+            )
+
+    def digest_keys(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT job_key FROM digest").fetchall()
+        return [row["job_key"] for row in rows]
+
+    def finish_digest(self, job_key: str, render) -> bool:
+        # render(entries) -> (subject, body). The entries are swapped for the
+        # summary in one transaction, so a crash leaves one or the other.
+        with self._lock:
+            entries = [
+                dict(row)
+                for row in self._conn.execute(
+                    "SELECT console_id, created, subject, body, kind, events, outcome, attempts "
+                    "FROM digest WHERE job_key = ? ORDER BY id",
+                    (job_key,),
+                ).fetchall()
+            ]
+            if not entries:
+                return False
+            subject, body = render(entries)
+            now = time.time()
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO outbox (created, subject, body, next_attempt) VALUES (?, ?, ?, ?)",
+                    (int(now), subject, body, now),
+                )
+                self._conn.execute("DELETE FROM digest WHERE job_key = ?", (job_key,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+
+notification_outbox = NotificationOutbox(NOTIFY_OUTBOX_DB)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from datetime import datetime, tzinfo
+import os
+
+from .catalog import backup_catalog
+from .consoles import ConsoleRecord
+from .dedup import dedup_store
+from .settings import BACKUP_ROOT
+
+RETENTION_TIERS = ("daily", "weekly", "monthly")
+
+
+def normalize_policy(policy: dict | None, fallback: dict | None = None) -> dict:
+    # Missing tiers fall back to the global policy, so a console override may
+    # only set the tiers it cares about.
+    fallback = fallback or {}
+    policy = policy or {}
+    result = {}
+    for tier in RETENTION_TIERS:
+        try:
+            value = int(policy.get(tier, fallback.get(tier, 0)))
+        except (TypeError, ValueError):
+            value = int(fallback.get(tier, 0))
+        result[tier] = max(0, value)
+    return result
+
+
+def _bucket_keys(mtime: float, tz: tzinfo) -> dict:
+    local = datetime.fromtimestamp(mtime, tz)
+    iso = local.isocalendar()
+    return {
+        "daily": local.date(),
+        "weekly": (iso[0], iso[1]),
+        "monthly": (local.year, local.month),
+    }
+
+
+def select_kept(entries: list[dict], policy: dict, tz: tzinfo) -> set[int]:
+    # entries: newest first. Each tier keeps the newest backup of its N most
+    # recent days/weeks/months; a backup kept by any tier survives.
+    kept: set[int] = set()
+    if not entries:
+        return kept
+    kept.add(entries[0]["id"])
+    seen: dict[str, set] = {tier: set() for tier in RETENTION_TIERS}
+    for entry in entries:
+        keys = _bucket_keys(entry["mtime"], tz)
+        for tier in RETENTION_TIERS:
+            bucket = keys[tier]
+            if bucket in seen[tier] or len(seen[tier]) >= policy[tier]:
+                continue
+            seen[tier].add(bucket)
+            kept.add(entry["id"])
+    return kept
+
+
+def plan_retention(consoles, policy: dict, tz: tzinfo) -> dict:
+    # Works from the catalog only; consoles that were removed from the app
+    # still have their backups pruned under the global policy. Backups the
+    # catalog could not attribute to a console are never touched.
+    policy = normalize_policy(policy)
+    by_id = {console.id: console for console in consoles}
+    delete: list[dict] = []
+    summary: list[dict] = []
+    for console_id in sorted(backup_catalog.console_ids()):
+        console: ConsoleRecord | None = by_id.get(console_id)
+        console_policy = normalize_policy(console.retention if console else None, policy)
+        entries = backup_catalog.entries_for_console(console_id)
+        kept = select_kept(entries, console_policy, tz)
+        protected = (console.last_backup or {}).get("path") if console else None
+        doomed = [
+            entry
+            for entry in entries
+            if entry["id"] not in kept and f"{entry['date_folder']}/{entry['filename']}" != protected
+        ]
+        delete.extend(doomed)
+        summary.append(
+            {
+                "console_id": console_id,
+                "console_name": (console.name if console else "") or entries[0]["console_name"],
+                "policy": console_policy,
+                "total": len(entries),
+                "keep": len(entries) - len(doomed),
+                "delete": len(doomed),
+                "delete_bytes": sum(entry["size"] for entry in doomed),
+            }
+        )
+    return {"policy": policy, "consoles": summary, "delete": delete}
+
+
+def apply_retention(plan: dict, consoles) -> dict:
+    deleted = freed = 0
+    folders = set()
+    removed_paths = set()
+    for entry in plan["delete"]:
+        path = entry["path"]
+        try:
+            stat = path.stat()
+            path.unlink()
+        except FileNotFoundError:
+            stat = None
+        except OSError:
+            continue
+        backup_catalog.remove(entry["date_folder"], entry["filename"])
+        folders.add(entry["date_folder"])
+        removed_paths.add(f"{entry['date_folder']}/{entry['filename']}")
+        deleted += 1
+        if stat is not None and stat.st_nlink <= 1:
+            freed += stat.st_size
+
+    folders_removed = 0
+    for folder in folders:
+        try:
+            os.rmdir(BACKUP_ROOT / folder)
+            folders_removed += 1
+        except OSError:
+            pass  # not empty (other consoles, partial downloads) or already gone
+
+    for console in consoles:
+        if any(r.get("path") in removed_paths for r in console.recent_backups):
+            console.recent_backups = [r for r in console.recent_backups if r.get("path") not in removed_paths]
+
+    # Deduplicated backups only free space once the last link to their
+    # object is gone.
+    objects_removed, objects_freed = dedup_store.collect_garbage()
+    return {
+        "deleted": deleted,
+        "folders_removed": folders_removed,
+        "objects_removed": objects_removed,
+        "freed_bytes": freed + objects_freed,
+    }
+
+
+def plan_to_json(plan: dict) -> dict:
+    return {
+        "policy": plan["policy"],
+        "consoles": plan["consoles"],
+        "delete": [
+            {
+                "console_id": entry["console_id"],
+                "path": f"{entry['date_folder']}/{entry['filename']}",
+                "size": entry["size"],
+                "mtime": entry["mtime"],
+            }
+            for entry in plan["delete"]
+        ],
+    }
@@ -1,52 +1,79 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
+from urllib.parse import quote
 import io
 import json
 import os
-import zipfile
+import threading
 
 from flask import (
     Response,
+    abort,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
     send_file,
-    send_from_directory,
     url_for,
 )
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
 
+from .archive import stream_zip
+from .catalog import backup_catalog, entry_matches_file
+from .console_import import ImportFormatError, apply_import, plan_import
+from .consoles import ConsoleRecord, console_registry
 from .data import (
     appdata,
     get_user_timezone,
     get_user_timezone_label,
-    localize_utc_str_to_user_tz,
+    format_local,
     save_appdata,
 )
+from .dedup import storage_report
+from .events import bus
+from .http_client import invalidate_session_check
+from .log_store import LEVELS, log_store
 from .notifications import send_test_email
-from .scheduling import init_schedule_jobs
-from .scheduler import scheduler
-from .settings import AVAILABLE_TIMEZONES, BACKUP_ROOT, DEFAULT_TZ
+from .retention import RETENTION_TIERS, normalize_policy, plan_retention, plan_to_json
+from .scheduling import enqueue_backup_pass, init_schedule_jobs
+from .settings import (
+    AVAILABLE_TIMEZONES,
+    BACKUP_ROOT,
+    DEFAULT_TZ,
+    SSE_MAX_CONNECTIONS,
+    X_ACCEL_REDIRECT_PREFIX,
+)
 from .state import (
-    current_task_status,
-    task_queue,
     enqueue_task,
-    enqueue_task_unbounded,
+    task_key,
     SCHEDULED_BACKUP_TASK_PREFIX,
-    queue_has_task_prefix,
+    TASK_KIND_BACKUP,
+    TASK_KIND_PASS,
     current_task_has_prefix,
-    get_queue_items,
-    get_queue_total_items,
 )
+from .status import clock_frame, snapshot_frame
 from .tasks import (
     attempt_console_backup,
+    cancel_console_backup,
     remove_old_cookie,
+    reconcile_backup_catalog_logic,
     reset_processes_logic,
+    retention_logic,
     store_cookies_json,
     test_cookie_access_logic,
 )
 
+_STREAM_HEARTBEAT_SECONDS = 10
+_STREAM_MAX_REPLAY_FRAMES = 500
+_STREAM_RETRY_AFTER_SECONDS = 30
+_IMPORT_PREVIEW_NAMES = 20
+
+# Every open stream holds a server thread, so the number of streams is capped.
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_CONNECTIONS) if SSE_MAX_CONNECTIONS else None
+
 
 def register_routes(app) -> None:
     @app.route("/")
@@ -54,132 +81,64 @@ def register_routes(app) -> None:
         return render_template(
             "dashboard.html",
             appdata=appdata,
+            consoles=console_registry,
             available_tzs=AVAILABLE_TIMEZONES,
             tz_label=get_user_timezone_label(),
         )
 
     @app.route("/status_stream")
     def status_stream():
+        if _stream_slots is not None and not _stream_slots.acquire(blocking=False):
+            return Response(
+                "Too many open dashboard streams.",
+                status=503,
+                headers={"Retry-After": str(_STREAM_RETRY_AFTER_SECONDS)},
+            )
+        last_event_id = bus.parse_event_id(
+            request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        )
+
+        def catch_up(cursor: int) -> tuple[int, bytes]:
+            # Everything pending goes out as one write. A client that fell too
+            # far behind (slow link, suspended tab) gets the shared snapshot
+            # instead of a long replay, so its backlog never grows unbounded.
+            pending = bus.frames_since(cursor)
+            if pending is None or len(pending) > _STREAM_MAX_REPLAY_FRAMES:
+                return snapshot_frame()
+            if not pending:
+                return cursor, b""
+            return pending[-1][0], b"".join(frame for _, frame in pending)
+
         def event_stream():
-            while True:
-                data = {
-                    "current_task": current_task_status.copy(),
-                    "queue_size": task_queue.qsize(),
-                    "queue_total_items": get_queue_total_items(),
-                    "master_logged_in": appdata.get("master_logged_in", False),
-                }
-                last_cookie_check = appdata.get("last_cookie_check")
-                data["last_cookie_check_local"] = (
-                    localize_utc_str_to_user_tz(last_cookie_check)
-                    if last_cookie_check
-                    else ""
-                )
-                if data["current_task"].get("start_time"):
-                    data["current_task"]["start_time_local"] = localize_utc_str_to_user_tz(
-                        data["current_task"]["start_time"]
-                    )
-                    try:
-                        dt_utc = datetime.strptime(
-                            data["current_task"]["start_time"], "%Y-%m-%d %H:%M:%S"
-                        ).replace(tzinfo=timezone.utc)
-                        elapsed = datetime.now(timezone.utc) - dt_utc
-                        data["current_task"]["elapsed_seconds"] = max(
-                            0, int(elapsed.total_seconds())
-                        )
-                    except ValueError:
-                        data["current_task"]["elapsed_seconds"] = None
-
-                logs_reversed = reversed(appdata["logs"])
-                data_logs = []
-                for entry in logs_reversed:
-                    local_ts = localize_utc_str_to_user_tz(entry["timestamp"])
-                    data_logs.append(
-                        {"timestamp": local_ts, "message": entry["message"]}
-                    )
-                data["logs"] = data_logs
-
-                data_consoles = []
-                for console in appdata["consoles"]:
-                    local_time = ""
-                    if console.get("last_backup_time"):
-                        local_time = localize_utc_str_to_user_tz(console["last_backup_time"])
-                    status_raw = console.get("last_backup_status", "")
-                    if status_raw.startswith("Success") or "Succeeded after retry" in status_raw:
-                        status_display = "Success"
-                    elif "Failed after 3" in status_raw:
-                        status_display = "Failed after 3 retries"
-                    elif status_raw:
-                        status_display = "Failed"
-                    else:
-                        status_display = "Failed"
-                    data_consoles.append(
-                        {
-                            "id": console["id"],
-                            "name": console["name"],
-                            "backup_url": console.get("backup_url", ""),
-                            "status": status_display,
-                            "time": local_time,
-                            "excluded": console.get("exclude_from_schedule", False),
-                        }
-                    )
-                data["consoles"] = data_consoles
-                data["total_consoles"] = len(data_consoles)
-                queue_items = get_queue_items()
-                data["queue_items"] = queue_items
-
-                running_total = int(data["current_task"].get("total_items") or 0)
-                running_done = int(data["current_task"].get("completed_items") or 0)
-                running_remaining = max(0, running_total - running_done) if data["current_task"].get("running") else 0
-                data["queue_remaining_items"] = running_remaining + int(data.get("queue_total_items", 0))
-
-                current_task_name = data["current_task"].get("task_name") or ""
-                scheduled_running = current_task_name.startswith(
-                    SCHEDULED_BACKUP_TASK_PREFIX
-                )
-                scheduled_positions = [
-                    idx + 1
-                    for idx, item in enumerate(queue_items)
-                    if item.startswith(SCHEDULED_BACKUP_TASK_PREFIX)
-                ]
-                if scheduled_running:
-                    data["scheduled_queue_position"] = 1
-                    data["scheduled_queue_size"] = 1 + len(scheduled_positions)
-                elif scheduled_positions:
-                    data["scheduled_queue_position"] = scheduled_positions[0]
-                    data["scheduled_queue_size"] = len(scheduled_positions)
-                else:
-                    data["scheduled_queue_position"] = 0
-                    data["scheduled_queue_size"] = 0
-
-                backup_job = scheduler.get_job("BackupJob")
-                next_backup_str = "N/A"
-                next_backup_seconds = 0
-                if backup_job and backup_job.next_run_time:
-                    now_ = datetime.now(backup_job.next_run_time.tzinfo)
-                    delta = backup_job.next_run_time - now_
-                    sec_ = int(delta.total_seconds())
-                    if sec_ < 0:
-                        sec_ = 0
-                    next_backup_seconds = sec_
-                    next_backup_str = _format_timedelta(delta)
-
-                data["next_backup_time_str"] = next_backup_str
-                data["next_backup_time_seconds"] = next_backup_seconds
-                data["current_time_local"] = localize_utc_str_to_user_tz(
-                    datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                )
-
-                yield "event: message\n" + "data: " + json.dumps(data) + "\n\n"
-                import time
-
-                time.sleep(1)
-
-        return Response(event_stream(), mimetype="text/event-stream")
+            # One snapshot on connect (or a replay after a reconnect), then only
+            # the deltas published on the shared bus.
+            if last_event_id is None:
+                cursor, chunk = snapshot_frame()
+            else:
+                cursor, chunk = catch_up(last_event_id)
+            yield b"retry: 3000\n" + clock_frame() + chunk
+            while not bus.closed:
+                if not bus.wait_for(cursor, _STREAM_HEARTBEAT_SECONDS):
+                    yield b": keep-alive\n\n"
+                    continue
+                cursor, chunk = catch_up(cursor)
+                if chunk:
+                    yield chunk
+
+        response = Response(
+            event_stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        if _stream_slots is not None:
+            response.call_on_close(_stream_slots.release)
+        return response
 
     @app.route("/manual_relogin", methods=["POST"])
     def manual_relogin():
         remove_old_cookie()
         appdata["master_logged_in"] = False
+        invalidate_session_check()
         save_appdata()
         flash("Cookies cleared. Please upload new cookies below.", "info")
         return redirect(url_for("dashboard", _anchor="manual-cookie-upload"))
@@ -213,71 +172,40 @@ def register_routes(app) -> None:
             flash("Please select a JSON file to import.", "danger")
             return redirect(url_for("dashboard"))
 
+        replace_existing = request.form.get("replace_existing") == "1"
+        dry_run = request.form.get("dry_run") == "1"
         try:
-            payload = json.load(consoles_file)
-        except json.JSONDecodeError:
-            flash("Invalid JSON file. Please upload a valid export.", "danger")
-            return redirect(url_for("dashboard"))
-
-        if isinstance(payload, dict):
-            consoles = payload.get("consoles", [])
-            master_logged_in = payload.get("master_logged_in")
-        elif isinstance(payload, list):
-            consoles = payload
-            master_logged_in = None
-        else:
-            flash("JSON must be a list of consoles or an object with a consoles key.", "danger")
-            return redirect(url_for("dashboard"))
-
-        if not isinstance(consoles, list):
-            flash("Consoles must be a list of objects.", "danger")
-            return redirect(url_for("dashboard"))
-
-        sanitized = []
-        for console in consoles:
-            if not isinstance(console, dict):
-                continue
-            name = str(console.get("name", "")).strip()
-            backup_url = str(console.get("backup_url", "")).strip()
-            if not name or not backup_url:
-                continue
-            sanitized.append(
-                {
-                    "id": int(console.get("id", 0)) or 0,
-                    "name": name,
-                    "backup_url": backup_url,
-                    "last_backup_status": console.get("last_backup_status", "Unknown"),
-                    "last_backup_time": console.get("last_backup_time"),
-                    "exclude_from_schedule": bool(
-                        console.get("exclude_from_schedule", False)
-                    ),
-                }
+            plan = plan_import(
+                consoles_file.stream, appdata["retention"], replace_existing=replace_existing
             )
+        except ImportFormatError as exc:
+            flash(f"Invalid JSON file: {exc}", "danger")
+            return redirect(url_for("dashboard"))
 
-        if not sanitized:
+        if not (plan.add or plan.update or plan.unchanged):
             flash("No valid consoles found in the file.", "danger")
             return redirect(url_for("dashboard"))
 
-        replace_existing = request.form.get("replace_existing") == "1"
-        if replace_existing:
-            appdata["consoles"] = sanitized
-        else:
-            existing_by_name = {c["name"]: c for c in appdata.get("consoles", [])}
-            for console in sanitized:
-                existing_by_name[console["name"]] = console
-            appdata["consoles"] = list(existing_by_name.values())
-
-        max_id = max((c["id"] for c in appdata["consoles"]), default=0)
-        for console in appdata["consoles"]:
-            if not console["id"]:
-                max_id += 1
-                console["id"] = max_id
+        if dry_run:
+            flash(f"Import preview: {plan.summary()}.", "info")
+            for label, names in (
+                ("Add", [console["name"] for console in plan.add]),
+                ("Update", [record.name for record, _ in plan.update]),
+                ("Remove", [record.name for record in plan.remove]),
+            ):
+                if not names:
+                    continue
+                shown = ", ".join(names[:_IMPORT_PREVIEW_NAMES])
+                hidden = len(names) - _IMPORT_PREVIEW_NAMES
+                flash(f"{label}: {shown}{f' and {hidden} more' if hidden > 0 else ''}.", "info")
+            return redirect(url_for("dashboard"))
 
-        if master_logged_in is not None:
-            appdata["master_logged_in"] = bool(master_logged_in)
+        apply_import(plan)
+        if plan.master_logged_in is not None:
+            appdata["master_logged_in"] = plan.master_logged_in
 
         save_appdata()
-        flash(f"Imported {len(sanitized)} consoles successfully.", "success")
+        flash(f"Imported consoles: {plan.summary()}.", "success")
         return redirect(url_for("dashboard"))
 
     @app.route("/update_smtp", methods=["POST"])
@@ -298,6 +226,7 @@ def register_routes(app) -> None:
         smtp["notify_connectivity_failed"] = "notify_connectivity_failed" in request.form
         smtp["notify_backup_failed"] = "notify_backup_failed" in request.form
         smtp["notify_backup_success"] = "notify_backup_success" in request.form
+        smtp["digest"] = "smtp_digest" in request.form
 
         appdata["smtp"] = smtp
         save_appdata()
@@ -312,14 +241,11 @@ def register_routes(app) -> None:
 
     @app.route("/start_schedule_now", methods=["POST"])
     def start_schedule_now():
-        already_running_or_queued = current_task_has_prefix(
-            SCHEDULED_BACKUP_TASK_PREFIX
-        ) or queue_has_task_prefix(SCHEDULED_BACKUP_TASK_PREFIX)
-
-        total_items = len([c for c in appdata["consoles"] if not c.get("exclude_from_schedule")])
-        enqueue_task_unbounded("ScheduledBackup => Pass1 => allConsoles", _start_backup, total_items=total_items)
+        running = current_task_has_prefix(SCHEDULED_BACKUP_TASK_PREFIX)
 
-        if already_running_or_queued:
+        if not enqueue_backup_pass():
+            flash("A scheduled backup is already queued. This request was merged into it.", "info")
+        elif running:
             flash(
                 "A scheduled/override backup task is already running. This request was queued and will run next.",
                 "warning",
@@ -330,16 +256,26 @@ def register_routes(app) -> None:
 
     @app.route("/test_cookies", methods=["POST"])
     def test_cookies():
-        enqueue_task("CookieTest", test_cookie_access_logic)
+        enqueue_task("CookieTest", test_cookie_access_logic, key=task_key("CookieTest"))
         flash("Cookie test queued. Check logs for the result.", "info")
         return redirect(url_for("dashboard"))
 
     @app.route("/reset_processes", methods=["POST"])
     def reset_processes():
-        enqueue_task("ResetProcesses", reset_processes_logic)
+        enqueue_task("ResetProcesses", reset_processes_logic, key=task_key("ResetProcesses"))
         flash("Process reset queued. Check logs for cleanup status.", "info")
         return redirect(url_for("dashboard"))
 
+    @app.route("/reconcile_backups", methods=["POST"])
+    def reconcile_backups():
+        enqueue_task(
+            "ReconcileBackupCatalog",
+            reconcile_backup_catalog_logic,
+            key=task_key("ReconcileBackupCatalog"),
+        )
+        flash("Backup catalog rebuild queued. Check logs for the result.", "info")
+        return redirect(url_for("dashboard"))
+
     @app.route("/add_console", methods=["POST"])
     def add_console():
         name = request.form.get("name", "").strip()
@@ -348,29 +284,14 @@ def register_routes(app) -> None:
             flash("Name and Backup URL are required", "danger")
             return redirect(url_for("dashboard"))
 
-        new_id = max((c["id"] for c in appdata["consoles"]), default=0) + 1
-        console_obj = {
-            "id": new_id,
-            "name": name,
-            "backup_url": curl,
-            "last_backup_status": "Unknown",
-            "last_backup_time": None,
-            "exclude_from_schedule": False,
-        }
-        appdata["consoles"].append(console_obj)
+        console_registry.add(ConsoleRecord(id=0, name=name, backup_url=curl))
         save_appdata()
         flash(f"Console '{name}' added.", "success")
         return redirect(url_for("dashboard"))
 
     @app.route("/remove_console/<int:cid>", methods=["POST"])
     def remove_console(cid):
-        found = False
-        for console in appdata["consoles"]:
-            if console["id"] == cid:
-                appdata["consoles"].remove(console)
-                found = True
-                break
-        if found:
+        if console_registry.remove(cid) is not None:
             save_appdata()
             flash("Console removed.", "success")
         else:
@@ -379,14 +300,14 @@ def register_routes(app) -> None:
 
     @app.route("/toggle_console_schedule/<int:cid>", methods=["POST"])
     def toggle_console_schedule(cid):
-        console = next((x for x in appdata["consoles"] if x["id"] == cid), None)
+        console = console_registry.get(cid)
         if not console:
             flash("Console not found.", "danger")
             return redirect(url_for("dashboard"))
-        console["exclude_from_schedule"] = not console.get("exclude_from_schedule", False)
+        console.exclude_from_schedule = not console.exclude_from_schedule
         save_appdata()
-        state = "excluded from" if console["exclude_from_schedule"] else "included in"
-        flash(f"Console '{console['name']}' {state} scheduled backups.", "success")
+        state = "excluded from" if console.exclude_from_schedule else "included in"
+        flash(f"Console '{console.name}' {state} scheduled backups.", "success")
         return redirect(url_for("dashboard"))
 
     @app.route("/manual_backup/<int:cid>", methods=["POST"])
@@ -395,13 +316,31 @@ def register_routes(app) -> None:
             flash("Not logged in. Please do manual login first.", "danger")
             return redirect(url_for("dashboard"))
 
-        console = next((x for x in appdata["consoles"] if x["id"] == cid), None)
+        console = console_registry.get(cid)
         if not console:
             flash("Console not found.", "danger")
             return redirect(url_for("dashboard"))
 
-        enqueue_task(f"ManualBackup-{console['name']}", attempt_console_backup, [console])
-        flash(f"Backup for '{console['name']}' queued...", "info")
+        queued = enqueue_task(
+            f"ManualBackup-{console.name}",
+            attempt_console_backup,
+            [console],
+            key=task_key(TASK_KIND_BACKUP, cid),
+            absorbed_by=None if console.exclude_from_schedule else task_key(TASK_KIND_PASS),
+            exclusive=False,
+        )
+        if queued:
+            flash(f"Backup for '{console.name}' queued...", "info")
+        else:
+            flash(f"A backup of '{console.name}' is already queued.", "info")
+        return redirect(url_for("dashboard"))
+
+    @app.route("/cancel_backup/<int:cid>", methods=["POST"])
+    def cancel_backup(cid):
+        if cancel_console_backup(cid):
+            flash("Queued backup cancelled.", "info")
+        else:
+            flash("No queued backup for this console (a running one cannot be cancelled).", "warning")
         return redirect(url_for("dashboard"))
 
     @app.route("/update_schedule", methods=["POST"])
@@ -419,6 +358,16 @@ def register_routes(app) -> None:
         schedule["backup_value"] = max(1, schedule["backup_value"])
         schedule["check_value"] = max(1, schedule["check_value"])
 
+        retention = appdata["retention"]
+        retention["enabled"] = "retention_enabled" in request.form
+        retention["dry_run"] = "retention_dry_run" in request.form
+        retention.update(
+            normalize_policy(
+                {tier: request.form.get(f"retention_{tier}") for tier in RETENTION_TIERS},
+                retention,
+            )
+        )
+
         tz_choice = request.form.get("tz_choice", DEFAULT_TZ)
         if tz_choice not in AVAILABLE_TIMEZONES:
             tz_choice = DEFAULT_TZ
@@ -426,34 +375,27 @@ def register_routes(app) -> None:
 
         save_appdata()
         init_schedule_jobs()
-        flash("Schedules & Timezone updated.", "success")
+        flash("Schedules, retention & timezone updated.", "success")
         return redirect(url_for("dashboard"))
 
     @app.route("/download_latest_backup/<int:cid>")
     def download_latest_backup(cid):
-        console = next((x for x in appdata["consoles"] if x["id"] == cid), None)
+        console = console_registry.get(cid)
         if not console:
             flash("Console not found.", "danger")
             return redirect(url_for("dashboard"))
 
-        if not console.get("last_backup_time"):
-            flash("No backup found for that console.", "danger")
-            return redirect(url_for("dashboard"))
-
-        day_str_utc = console["last_backup_time"].split(" ")[0]
-        folder_path = BACKUP_ROOT / day_str_utc
-        if not folder_path.exists():
-            flash("No matching backup folder found.", "danger")
-            return redirect(url_for("dashboard"))
+        last_backup = console.last_backup
+        if last_backup and (BACKUP_ROOT / last_backup["path"]).is_file():
+            date_folder, _, filename = last_backup["path"].partition("/")
+            return _send_backup(date_folder, filename, sha256=last_backup.get("sha256"))
 
-        files = [f for f in os.listdir(folder_path) if f.startswith(console["name"] + "_")]
-        if not files:
-            flash("No matching backup file found for that console's last backup time.", "danger")
+        # Consoles backed up before paths were recorded: ask the catalog.
+        latest = backup_catalog.latest_for_console(cid)
+        if not latest or not latest["path"].is_file():
+            flash("No backup file found for this console.", "danger")
             return redirect(url_for("dashboard"))
-
-        files.sort(key=lambda x: os.path.getmtime(folder_path / x), reverse=True)
-        latest_file = files[0]
-        return send_from_directory(str(folder_path), latest_file, as_attachment=True)
+        return _send_backup(latest["date_folder"], latest["filename"], sha256=latest["sha256"])
 
     @app.route("/download_today_backups", methods=["GET"])
     def download_today_backups():
@@ -461,35 +403,46 @@ def register_routes(app) -> None:
         today_local_str = now_local.strftime("%Y-%m-%d")
         tz_label = get_user_timezone_label()
         today_str_utc = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        folder_path = BACKUP_ROOT / today_str_utc
-        if not folder_path.exists():
+        entries = backup_catalog.for_dates(today_str_utc, today_str_utc)
+        if not entries:
             flash(f"No backups found for today ({today_local_str} {tz_label}).", "danger")
             return redirect(url_for("dashboard"))
 
-        file_list = os.listdir(folder_path)
-        if not file_list:
-            flash(f"No backups found for today ({today_local_str} {tz_label}).", "danger")
-            return redirect(url_for("dashboard"))
+        zip_filename = f"Backups_{today_local_str}_{tz_label}.zip"
+        return _zip_response(entries, zip_filename, by_date=False)
 
-        mem_zip = io.BytesIO()
-        with zipfile.ZipFile(mem_zip, mode="w") as zf:
-            for filename in file_list:
-                full_path = folder_path / filename
-                if full_path.is_file():
-                    zf.write(full_path, arcname=filename)
+    @app.route("/download_backups_zip", methods=["GET"])
+    def download_backups_zip():
+        today_str_utc = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        start = request.args.get("start", "").strip() or today_str_utc
+        end = request.args.get("end", "").strip() or start
+        try:
+            datetime.strptime(start, "%Y-%m-%d")
+            datetime.strptime(end, "%Y-%m-%d")
+        except ValueError:
+            flash("Dates must use the YYYY-MM-DD format.", "danger")
+            return redirect(url_for("dashboard"))
+        if end < start:
+            start, end = end, start
+        console_ids = [
+            int(value) for value in request.args.getlist("console_id") if value.strip().isdigit()
+        ]
+
+        entries = backup_catalog.for_dates(start, end, console_ids or None)
+        if not entries:
+            flash(f"No backups found between {start} and {end}.", "danger")
+            return redirect(url_for("dashboard"))
 
-        mem_zip.seek(0)
-        zip_filename = f"Backups_{today_local_str}_{tz_label}.zip"
-        return send_file(
-            mem_zip,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype="application/zip",
-        )
+        suffix = start if start == end else f"{start}_to_{end}"
+        if len(console_ids) == 1:
+            console = console_registry.get(console_ids[0])
+            if console:
+                suffix = f"{secure_filename(console.name) or 'console'}_{suffix}"
+        return _zip_response(entries, f"Backups_{suffix}.zip", by_date=start != end)
 
     @app.route("/console_history/<int:cid>")
     def console_history(cid):
-        console = next((x for x in appdata["consoles"] if x["id"] == cid), None)
+        console = console_registry.get(cid)
         if not console:
             return render_template(
                 "history.html",
@@ -501,40 +454,24 @@ def register_routes(app) -> None:
                 total_pages=1,
             )
 
-        console_name = console["name"]
         user_tz = get_user_timezone()
-        page = max(int(request.args.get("page", "1") or "1"), 1)
+        page = max(_int_arg("page") or 1, 1)
         page_size = 100
 
-        files_list = []
-        for folder_name in os.listdir(BACKUP_ROOT):
-            folder_path = BACKUP_ROOT / folder_name
-            if not folder_path.is_dir():
-                continue
-            for fname in os.listdir(folder_path):
-                if fname.startswith(console_name + "_"):
-                    fpath = folder_path / fname
-                    if fpath.is_file():
-                        mtime = os.path.getmtime(fpath)
-                        dt_utc = datetime.fromtimestamp(mtime, timezone.utc)
-                        dt_local = dt_utc.astimezone(user_tz)
-                        files_list.append(
-                            {
-                                "date_folder": folder_name,
-                                "date_display": dt_local.strftime("%Y-%m-%d"),
-                                "filename": fname,
-                                "datetime_display": dt_local.strftime("%Y-%m-%d %H:%M:%S"),
-                                "sort_ts": dt_utc.timestamp(),
-                            }
-                        )
-
-        files_list.sort(key=lambda x: x["sort_ts"], reverse=True)
-        total_items = len(files_list)
+        total_items = backup_catalog.count_for_console(cid)
         total_pages = max(1, (total_items + page_size - 1) // page_size)
         page = min(page, total_pages)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        page_items = files_list[start_idx:end_idx]
+        page_items = []
+        for entry in backup_catalog.history(cid, limit=page_size, offset=(page - 1) * page_size):
+            dt_local = datetime.fromtimestamp(entry["mtime"], timezone.utc).astimezone(user_tz)
+            page_items.append(
+                {
+                    "date_folder": entry["date_folder"],
+                    "date_display": dt_local.strftime("%Y-%m-%d"),
+                    "filename": entry["filename"],
+                    "datetime_display": dt_local.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+            )
 
         return render_template(
             "history.html",
@@ -549,30 +486,75 @@ def register_routes(app) -> None:
     @app.route("/download_logs")
     def download_logs():
         tz_label = get_user_timezone_label()
-        output = io.StringIO()
-        for entry in appdata.get("logs", []):
-            local_ts = localize_utc_str_to_user_tz(entry["timestamp"])
-            output.write(f"[{local_ts}] - {entry['message']}\n")
-        mem = io.BytesIO(output.getvalue().encode("utf-8"))
-        mem.seek(0)
+
+        def generate():
+            for entry in log_store.iter_all():
+                local_ts = format_local(entry["ts"])
+                yield f"[{local_ts}] - {entry['message']}\n"
+
         filename = f"logs_{datetime.now(timezone.utc).strftime('%Y-%m-%d_%H%M%S')}_{tz_label}.txt"
-        return send_file(
-            mem,
-            as_attachment=True,
-            download_name=filename,
+        return Response(
+            generate(),
             mimetype="text/plain",
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+
+    @app.route("/api/logs")
+    def api_logs():
+        after_seq = _int_arg("after")
+        before_seq = _int_arg("before")
+        level = request.args.get("level") or None
+        if level not in (None, *LEVELS):
+            return jsonify({"error": f"level must be one of {', '.join(LEVELS)}"}), 400
+        limit = min(max(_int_arg("limit") or 100, 1), 1000)
+        entries = log_store.query(
+            after_seq=after_seq,
+            before_seq=before_seq,
+            console_id=_int_arg("console_id"),
+            level=level,
+            limit=limit,
         )
+        for entry in entries:
+            entry["timestamp"] = format_local(entry["ts"])
+        next_before = None
+        if after_seq is None and len(entries) == limit:
+            next_before = entries[-1]["seq"]
+        return jsonify(
+            {
+                "entries": entries,
+                "latest_seq": log_store.latest_seq(),
+                "next_before": next_before,
+            }
+        )
+
+    @app.route("/api/storage")
+    def api_storage():
+        return jsonify(storage_report(backup_catalog.iter_entries()))
+
+    @app.route("/api/retention/preview")
+    def api_retention_preview():
+        plan = plan_retention(console_registry, appdata["retention"], get_user_timezone())
+        return jsonify(plan_to_json(plan))
+
+    @app.route("/run_retention", methods=["POST"])
+    def run_retention():
+        dry_run = request.form.get("dry_run") == "1"
+        enqueue_task("Retention", retention_logic, [dry_run], key=task_key("Retention", dry_run))
+        label = "Retention dry run" if dry_run else "Retention"
+        flash(f"{label} queued. Check logs for the result.", "info")
+        return redirect(url_for("dashboard"))
 
     @app.route("/export_consoles")
     def export_consoles():
         consoles_payload = {
             "consoles": [
                 {
-                    "name": console.get("name", ""),
-                    "backup_url": console.get("backup_url", ""),
-                    "exclude_from_schedule": console.get("exclude_from_schedule", False),
+                    "name": console.name,
+                    "backup_url": console.backup_url,
+                    "exclude_from_schedule": console.exclude_from_schedule,
+                    **({"retention": console.retention} if console.retention else {}),
                 }
-                for console in appdata.get("consoles", [])
+                for console in console_registry
             ]
         }
         mem = io.BytesIO(json.dumps(consoles_payload, indent=2).encode("utf-8"))
@@ -586,28 +568,63 @@ def register_routes(app) -> None:
 
     @app.route("/download_backup/<date_folder>/<path:filename>")
     def download_specific_backup(date_folder, filename):
-        folder_path = BACKUP_ROOT / date_folder
-        return send_from_directory(str(folder_path), filename, as_attachment=True)
-
-    def _format_timedelta(td):
-        total_seconds = int(td.total_seconds())
-        if total_seconds < 0:
-            return "N/A"
-        hours, remainder = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        days, hours = divmod(hours, 24)
-        parts = []
-        if days == 1:
-            parts.append("1 day")
-        elif days > 1:
-            parts.append(f"{days} days")
-        parts.append(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-        return ", ".join(parts)
-
-    def _start_backup():
-        from .tasks import scheduled_backup_job_logic
-
-        scheduled_backup_job_logic()
+        return _send_backup(date_folder, filename)
+
+    def _send_backup(date_folder: str, filename: str, *, sha256: str | None = None) -> Response:
+        # Range requests, If-Range and If-Modified-Since come from send_file;
+        # the ETag is the content hash, so pull scripts can skip files they
+        # already have with If-None-Match and resume interrupted transfers.
+        path = safe_join(str(BACKUP_ROOT), date_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        stat = os.stat(path)
+        if sha256 is None:
+            entry = backup_catalog.get(date_folder, filename)
+            if entry and entry_matches_file(entry, stat):
+                sha256 = entry["sha256"]
+
+        if X_ACCEL_REDIRECT_PREFIX:
+            # nginx serves the bytes (and ranges) from an internal location.
+            response = Response(mimetype="application/octet-stream")
+            response.headers["X-Accel-Redirect"] = (
+                f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(date_folder)}/{quote(filename)}"
+            )
+            response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+            response.last_modified = stat.st_mtime
+            if sha256:
+                response.set_etag(sha256)
+            return response.make_conditional(request)
+
+        return send_file(
+            path,
+            as_attachment=True,
+            download_name=filename,
+            conditional=True,
+            etag=sha256 or True,
+            last_modified=stat.st_mtime,
+        )
+
+    def _zip_response(entries: list[dict], zip_filename: str, *, by_date: bool) -> Response:
+        # Multi-day archives keep the date folders so equal file names don't clash.
+        members = [
+            (
+                entry["path"],
+                f"{entry['date_folder']}/{entry['filename']}" if by_date else entry["filename"],
+            )
+            for entry in entries
+        ]
+        return Response(
+            stream_zip(members),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'},
+        )
+
+    def _int_arg(name: str) -> int | None:
+        value = request.args.get(name, "").strip()
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
 
 
 __all__ = ["register_routes"]
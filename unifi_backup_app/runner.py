@@ -1,13 +1,113 @@
 from __future__ import annotations
 
+import argparse
+import signal
+
 from . import create_app
-from .state import log_console
+from .data import flush_appdata
+from .events import bus
+from .notifications import close_smtp_connection, stop_notification_sender
+from .scheduler import scheduler
+from .settings import (
+    SERVER_HOST,
+    SERVER_MODE,
+    SERVER_PORT,
+    SERVER_THREADS,
+    SHUTDOWN_DRAIN_SECONDS,
+)
+from .state import log_console, task_queue
+from .status import stop_status_publisher
+from .tasks import cleanup_leftover_chrome
+from .worker import drain_queue
+
+try:
+    from waitress.server import create_server as _create_waitress_server
+except ImportError:  # optional dependency
+    _create_waitress_server = None
+
+
+def _handle_sigterm(signum, frame) -> None:
+    # End open status streams right away, then unwind the server like Ctrl+C.
+    bus.close()
+    raise KeyboardInterrupt
+
+
+def _graceful_shutdown() -> None:
+    log_console("[Runner] Shutting down: pausing scheduler and draining the task queue.")
+    bus.close()
+    try:
+        scheduler.pause()
+    except Exception as exc:
+        log_console(f"[Runner] Could not pause scheduler: {exc}")
+    if not drain_queue(SHUTDOWN_DRAIN_SECONDS):
+        log_console(
+            f"[Runner] Drain timed out after {SHUTDOWN_DRAIN_SECONDS}s; "
+            f"{task_queue.unfinished_tasks} task(s) left unfinished."
+        )
+    try:
+        scheduler.shutdown(wait=False)
+    except Exception as exc:
+        log_console(f"[Runner] Could not stop scheduler: {exc}")
+    stop_status_publisher()
+    cleanup_leftover_chrome()
+    stop_notification_sender()
+    close_smtp_connection()
+    flush_appdata()
+    log_console("[Runner] Shutdown complete.")
+
+
+def _serve_production(app, host: str, port: int) -> None:
+    if _create_waitress_server is not None:
+        # send_bytes=1 flushes every SSE frame instead of buffering it. Every
+        # open stream holds a connection, so waitress's default limit of 100
+        # would stall clients before SSE_MAX_CONNECTIONS could answer 503.
+        server = _create_waitress_server(
+            app,
+            host=host,
+            port=port,
+            threads=SERVER_THREADS,
+            connection_limit=SERVER_THREADS + 100,
+            send_bytes=1,
+            ident="unifi-backup",
+        )
+        log_console(f"[Runner] Serving with waitress on {host}:{port} ({SERVER_THREADS} threads).")
+        try:
+            server.run()
+        finally:
+            server.close()
+        return
+
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    log_console(f"[Runner] waitress not installed; serving with threaded werkzeug on {host}:{port}.")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
 
 
 def run() -> None:
+    parser = argparse.ArgumentParser(description="UniFi Automated Consoles Backup")
+    parser.add_argument("--mode", choices=("production", "dev"), default=SERVER_MODE)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
     app = create_app()
     log_console("Starting Flask with real file download logic, reversing logs, etc.")
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    if args.mode == "dev":
+        # The reloader would start a second worker and scheduler in the child process.
+        app.run(debug=True, use_reloader=False, threaded=True, host=args.host, port=args.port)
+        return
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    try:
+        _serve_production(app, args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _graceful_shutdown()
 
 
 if __name__ == "__main__":
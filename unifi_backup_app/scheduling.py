@@ -2,21 +2,43 @@ from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta
 
+from .consoles import console_registry
 from .data import appdata, add_app_log
 from .scheduler import scheduler
 from .state import (
     log_console,
     enqueue_task,
     enqueue_task_unbounded,
+    task_key,
     SCHEDULED_BACKUP_TASK_PREFIX,
+    TASK_KIND_BACKUP,
+    TASK_KIND_PASS,
+)
+from .tasks import (
+    check_cookies_via_http,
+    retention_logic,
+    scheduled_backup_job_logic,
+    test_cookie_access_logic,
 )
-from .tasks import scheduled_backup_job_logic, test_cookie_access_logic
 
 _last_backup_enqueue_at: datetime | None = None
 
 
-def _eligible_consoles_count() -> int:
-    return len([c for c in appdata.get("consoles", []) if not c.get("exclude_from_schedule")])
+def _eligible_console_ids() -> list[int]:
+    return [console.id for console in console_registry.eligible()]
+
+
+def enqueue_backup_pass() -> bool:
+    # One pass at a time waits in the queue; it replaces queued manual
+    # backups of the consoles it will cover anyway.
+    console_ids = _eligible_console_ids()
+    return enqueue_task_unbounded(
+        "ScheduledBackup => Pass1 => allConsoles",
+        scheduled_backup_job_logic,
+        total_items=len(console_ids),
+        key=task_key(TASK_KIND_PASS),
+        absorbs=[task_key(TASK_KIND_BACKUP, cid) for cid in console_ids],
+    )
 
 
 def _backup_interval_delta() -> timedelta:
@@ -32,22 +54,29 @@ def _backup_interval_delta() -> timedelta:
 
 def scheduled_connectivity_check_job() -> None:
     log_console("APScheduler => scheduled_connectivity_check_job triggered")
-    enqueue_task("CookieTest", test_cookie_access_logic)
-    add_app_log("Connectivity check queued.")
+    # A conclusive HTTP answer needs no browser, so it does not wait in the task queue.
+    if check_cookies_via_http():
+        return
+    if enqueue_task("CookieTest", test_cookie_access_logic, key=task_key("CookieTest")):
+        add_app_log("Connectivity check queued.")
 
 
 def scheduled_backup_job() -> None:
     global _last_backup_enqueue_at
     log_console("APScheduler => scheduled_backup_job triggered")
 
-    total_items = _eligible_consoles_count()
-    enqueue_task_unbounded(
-        "ScheduledBackup => Pass1 => allConsoles",
-        scheduled_backup_job_logic,
-        total_items=total_items,
-    )
+    queued = enqueue_backup_pass()
     _last_backup_enqueue_at = datetime.now(timezone.utc)
-    add_app_log("Scheduled backup queued.")
+    if queued:
+        add_app_log("Scheduled backup queued.")
+    else:
+        add_app_log("Scheduled backup already queued, request merged.")
+
+
+def scheduled_retention_job() -> None:
+    log_console("APScheduler => scheduled_retention_job triggered")
+    # Queued behind any running backup so a pass never races the pruning.
+    enqueue_task("Retention", retention_logic, key=task_key("Retention"))
 
 
 def backup_schedule_watchdog_job() -> None:
@@ -57,7 +86,7 @@ def backup_schedule_watchdog_job() -> None:
 
     backup_job = scheduler.get_job("BackupJob")
     if not backup_job:
-        add_app_log("Backup watchdog: BackupJob missing, rebuilding schedule.")
+        add_app_log("Backup watchdog: BackupJob missing, rebuilding schedule.", level="warning")
         init_schedule_jobs()
         return
 
@@ -67,12 +96,12 @@ def backup_schedule_watchdog_job() -> None:
 
     interval = _backup_interval_delta()
     if datetime.now(timezone.utc) - _last_backup_enqueue_at > (interval + timedelta(minutes=1)):
-        add_app_log("Backup watchdog: interval exceeded, forcing scheduled backup queue.")
+        add_app_log("Backup watchdog: interval exceeded, forcing scheduled backup queue.", level="warning")
         scheduled_backup_job()
 
 
 def init_schedule_jobs() -> None:
-    for job_id in ["BackupJob", "ConnectivityCheckJob", "BackupWatchdogJob"]:
+    for job_id in ["BackupJob", "ConnectivityCheckJob", "BackupWatchdogJob", "RetentionJob"]:
         if scheduler.get_job(job_id):
             scheduler.remove_job(job_id)
 
@@ -118,6 +147,18 @@ def init_schedule_jobs() -> None:
             kwargs["days"] = c_val
         scheduler.add_job(**kwargs)
 
+    if appdata["retention"]["enabled"]:
+        scheduler.add_job(
+            id="RetentionJob",
+            func=scheduled_retention_job,
+            trigger="interval",
+            days=1,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=3600,
+            replace_existing=True,
+        )
+
     scheduler.add_job(
         id="BackupWatchdogJob",
         func=backup_schedule_watchdog_job,
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
+import time
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager, ChromeType
 
-from .settings import CHROME_HEADLESS, CHROME_BINARY, CHROMEDRIVER_PATH, DOWNLOAD_DIR
+from .settings import (
+    BACKUP_DIRECT_DOWNLOAD,
+    CHROME_HEADLESS,
+    CHROME_BINARY,
+    CHROMEDRIVER_PATH,
+    DOWNLOAD_DIR,
+)
 
 
-def get_selenium_driver() -> webdriver.Chrome:
+def get_selenium_driver(download_dir: Path | None = None) -> webdriver.Chrome:
     chrome_options = Options()
     chrome_options.page_load_strategy = "eager"
     chrome_options.add_argument("--disable-gpu")
@@ -31,11 +39,14 @@ def get_selenium_driver() -> webdriver.Chrome:
         chrome_options.binary_location = CHROME_BINARY
 
     prefs = {
-        "download.default_directory": str(DOWNLOAD_DIR),
+        "download.default_directory": str(download_dir or DOWNLOAD_DIR),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
     }
     chrome_options.add_experimental_option("prefs", prefs)
+    if BACKUP_DIRECT_DOWNLOAD:
+        # Needed to read the authenticated download URL back from DevTools events.
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
     service = None
     if CHROMEDRIVER_PATH:
@@ -50,3 +61,54 @@ def get_selenium_driver() -> webdriver.Chrome:
     driver.set_page_load_timeout(120)
     driver.set_script_timeout(120)
     return driver
+
+
+def drain_performance_log(driver) -> None:
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def _download_request_from_log(driver) -> dict | None:
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method in ("Page.downloadWillBegin", "Browser.downloadWillBegin"):
+            return {
+                "url": params.get("url", ""),
+                "guid": params.get("guid"),
+                "filename": params.get("suggestedFilename") or "",
+            }
+        if method == "Network.responseReceived":
+            response = params.get("response", {})
+            headers = {k.lower(): v for k, v in (response.get("headers") or {}).items()}
+            if "attachment" in headers.get("content-disposition", "").lower():
+                return {"url": response.get("url", ""), "guid": None, "filename": ""}
+    return None
+
+
+def capture_download_request(driver, timeout: float) -> dict | None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            found = _download_request_from_log(driver)
+        except Exception:
+            return None
+        if found:
+            return found
+        time.sleep(0.25)
+    return None
+
+
+def cancel_browser_download(driver, guid: str | None) -> None:
+    if not guid:
+        return
+    try:
+        driver.execute_cdp_cmd("Browser.cancelDownload", {"guid": guid})
+    except Exception:
+        pass
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
+
+
 def _get_env_bool(name: str, default: bool = False) -> bool:
     value = os.environ.get(name)
     if value is None:
@@ -9,19 +11,38 @@ def _get_env_bool(name: str, default: bool = False) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+def _get_env_int(name: str, default: int, minimum: int | None = None) -> int:
+    value = os.environ.get(name)
+    try:
+        result = int(value) if value is not None and value.strip() else default
+    except ValueError:
+        result = default
+    if minimum is not None:
+        result = max(minimum, result)
+    return result
+
+
 APP_DATA_DIR = Path(
     os.environ.get("APP_DATA_DIR", Path.cwd() / "unifi_app")
 ).resolve()
 APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 APPDATA_JSON = APP_DATA_DIR / "appdata.json"
+APPLOGS_JSON = APP_DATA_DIR / "logs.json"
+LOGS_DB = APP_DATA_DIR / "logs.db"
+BACKUP_CATALOG_DB = APP_DATA_DIR / "backups.db"
+NOTIFY_OUTBOX_DB = APP_DATA_DIR / "outbox.db"
 COOKIES_JSON = APP_DATA_DIR / "cookies.json"
 BACKUP_ROOT = APP_DATA_DIR / "backups"
 DOWNLOAD_DIR = APP_DATA_DIR / "chrome_downloads"
 
+BACKUP_OBJECTS_DIR = BACKUP_ROOT / ".objects"
+
 BACKUP_ROOT.mkdir(parents=True, exist_ok=True)
 DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+SAVE_DEBOUNCE_SECONDS = float(os.environ.get("SAVE_DEBOUNCE_SECONDS", "1.0") or 0)
+
 SECRET_KEY = os.environ.get("SECRET_KEY", "REPLACE_WITH_A_STRONG_SECRET_KEY")
 DEFAULT_TZ = os.environ.get("DEFAULT_TZ", "UTC")
 
@@ -46,3 +67,44 @@ AVAILABLE_TIMEZONES = _build_timezones()
 CHROME_HEADLESS = _get_env_bool("CHROME_HEADLESS", False)
 CHROME_BINARY = os.environ.get("CHROME_BINARY")
 CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH")
+
+BACKUP_CONCURRENCY = _get_env_int("BACKUP_CONCURRENCY", 1, minimum=1)
+BACKUP_RETRY_ATTEMPTS = _get_env_int("BACKUP_RETRY_ATTEMPTS", 3, minimum=1)
+BACKUP_RETRY_BASE_SECONDS = _get_env_int("BACKUP_RETRY_BASE_SECONDS", 15, minimum=0)
+BACKUP_RETRY_MAX_SECONDS = _get_env_int("BACKUP_RETRY_MAX_SECONDS", 300, minimum=0)
+DRIVER_MAX_USES = _get_env_int("DRIVER_MAX_USES", 25, minimum=0)
+DRIVER_MAX_RSS_MB = _get_env_int("DRIVER_MAX_RSS_MB", 1536, minimum=0)
+
+WAIT_PAGE_SETTLE_SECONDS = _get_env_int("WAIT_PAGE_SETTLE_SECONDS", 20, minimum=1)
+WAIT_BUTTON_SECONDS = _get_env_int("WAIT_BUTTON_SECONDS", 45, minimum=1)
+WAIT_BACKUP_CREATE_SECONDS = _get_env_int("WAIT_BACKUP_CREATE_SECONDS", 30, minimum=1)
+DOWNLOAD_TIMEOUT_SECONDS = _get_env_int("DOWNLOAD_TIMEOUT_SECONDS", 60, minimum=1)
+
+BACKUP_DIRECT_DOWNLOAD = _get_env_bool("BACKUP_DIRECT_DOWNLOAD", False)
+DIRECT_DOWNLOAD_MAX_KBPS = _get_env_int("DIRECT_DOWNLOAD_MAX_KBPS", 0, minimum=0)
+DIRECT_DOWNLOAD_CAPTURE_SECONDS = _get_env_int("DIRECT_DOWNLOAD_CAPTURE_SECONDS", 15, minimum=1)
+
+SESSION_CHECK_URL = os.environ.get("SESSION_CHECK_URL", "https://sso.ui.com/api/sso/v1/user/self")
+SESSION_CHECK_TTL_SECONDS = _get_env_int("SESSION_CHECK_TTL_SECONDS", 300, minimum=0)
+
+SMTP_KEEPALIVE_SECONDS = _get_env_int("SMTP_KEEPALIVE_SECONDS", 60, minimum=0)
+NOTIFY_RETRY_ATTEMPTS = _get_env_int("NOTIFY_RETRY_ATTEMPTS", 8, minimum=1)
+NOTIFY_RETRY_BASE_SECONDS = _get_env_int("NOTIFY_RETRY_BASE_SECONDS", 30, minimum=0)
+NOTIFY_RETRY_MAX_SECONDS = _get_env_int("NOTIFY_RETRY_MAX_SECONDS", 3600, minimum=0)
+
+BACKUP_DEDUP = _get_env_bool("BACKUP_DEDUP", False)
+
+USE_X_SENDFILE = _get_env_bool("USE_X_SENDFILE", False)
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX", "").strip()
+
+BACKUP_RECENT_HISTORY = _get_env_int("BACKUP_RECENT_HISTORY", 10, minimum=0)
+
+LOG_RETENTION_DAYS = _get_env_int("LOG_RETENTION_DAYS", 90, minimum=0)
+LOG_MAX_ENTRIES = _get_env_int("LOG_MAX_ENTRIES", 100000, minimum=0)
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "production").strip().lower()
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = _get_env_int("SERVER_PORT", 5000, minimum=1)
+SSE_MAX_CONNECTIONS = _get_env_int("SSE_MAX_CONNECTIONS", 50, minimum=0)
+SERVER_THREADS = _get_env_int("SERVER_THREADS", SSE_MAX_CONNECTIONS + 8, minimum=4)
+SHUTDOWN_DRAIN_SECONDS = _get_env_int("SHUTDOWN_DRAIN_SECONDS", 120, minimum=0)
@@ -2,8 +2,13 @@ from __future__ import annotations
 
 from collections import deque
 from datetime import datetime, timezone
+import heapq
 import itertools
 import queue
+import threading
+import time
+
+from .events import notify
 
 console_log_buffer = deque(maxlen=2000)
 
@@ -13,52 +18,155 @@ _HIGH_PRIORITY = 0
 _sequence_counter = itertools.count()
 task_queue: queue.PriorityQueue = queue.PriorityQueue()
 
-current_task_status = {
-    "running": False,
-    "task_name": "",
-    "step": "",
-    "start_time": None,
-    "total_items": 0,
-    "completed_items": 0,
-}
+# Keyed index of queued work, (kind, target) -> task_meta, so a repeated
+# request can be merged into the one already waiting. The target is the
+# console id for backups.
+TASK_KIND_PASS = "pass"
+TASK_KIND_BACKUP = "backup"
+_pending: dict[tuple, dict] = {}
+_pending_lock = threading.Lock()
+
+# Tasks currently executing, by task id; several workers may run at once.
+# Each worker thread remembers its own task so progress calls made from task
+# code land on the right entry.
+running_tasks: dict[int, dict] = {}
+# Parent jobs (e.g. a scheduled pass) whose progress is the sum of their
+# child tasks; they outlive the task that created them.
+jobs: dict[str, dict] = {}
+_status_lock = threading.Lock()
+_task_local = threading.local()
+_job_counter = itertools.count(1)
+
+
+def _utc_now_str() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
 def log_console(message: str) -> None:
-    timestamp_utc = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    timestamp_utc = _utc_now_str()
     line = f"[{timestamp_utc}] {message}"
     print(line)
     console_log_buffer.append(line)
 
 
 def is_task_running() -> bool:
-    return current_task_status["running"]
+    with _status_lock:
+        return bool(running_tasks or jobs)
 
 
 def start_task(task_meta: dict) -> None:
-    now_utc_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-    current_task_status["running"] = True
-    current_task_status["task_name"] = task_meta.get("task_name", "")
-    current_task_status["step"] = task_meta.get("task_name", "")
-    current_task_status["start_time"] = now_utc_str
-    total_items = int(task_meta.get("total_items", 1) or 1)
-    current_task_status["total_items"] = max(1, total_items)
-    current_task_status["completed_items"] = 0
+    kind, target = task_meta.get("key") or (None, None)
+    entry = {
+        "id": task_meta["id"],
+        "task_name": task_meta.get("task_name", ""),
+        "step": task_meta.get("task_name", ""),
+        "start_time": int(time.time()),
+        "total_items": max(1, int(task_meta.get("total_items", 1) or 1)),
+        "completed_items": 0,
+        "job_id": task_meta.get("job_id"),
+        "console_id": target if kind == TASK_KIND_BACKUP else None,
+    }
+    with _status_lock:
+        running_tasks[entry["id"]] = entry
+    _task_local.task_id = entry["id"]
+    notify("task")
+
+
+def _current_entry() -> dict | None:
+    return running_tasks.get(getattr(_task_local, "task_id", None))
+
+
+def current_task_name() -> str:
+    with _status_lock:
+        entry = _current_entry()
+        return entry["task_name"] if entry else ""
+
+
+def current_job_item() -> tuple[str | None, int | None]:
+    # (job id, console id) of the calling thread's task.
+    with _status_lock:
+        entry = _current_entry()
+        return (entry["job_id"], entry["console_id"]) if entry else (None, None)
 
 
 def update_current_task_progress(completed_items: int, step_msg: str | None = None) -> None:
-    total_items = int(current_task_status.get("total_items", 1) or 1)
-    current_task_status["completed_items"] = max(0, min(int(completed_items), total_items))
-    if step_msg:
-        current_task_status["step"] = step_msg
+    with _status_lock:
+        entry = _current_entry()
+        if entry is None:
+            return
+        entry["completed_items"] = max(0, min(int(completed_items), entry["total_items"]))
+        if step_msg:
+            entry["step"] = step_msg
+    notify("task")
+
+
+def set_current_task_step(step_msg: str) -> None:
+    with _status_lock:
+        entry = _current_entry()
+        if entry is None:
+            return
+        entry["step"] = step_msg
+    notify("task")
 
 
 def end_task() -> None:
-    current_task_status["running"] = False
-    current_task_status["task_name"] = ""
-    current_task_status["step"] = ""
-    current_task_status["start_time"] = None
-    current_task_status["total_items"] = 0
-    current_task_status["completed_items"] = 0
+    task_id = getattr(_task_local, "task_id", None)
+    _task_local.task_id = None
+    with _status_lock:
+        running_tasks.pop(task_id, None)
+    notify("task")
+
+
+def start_job(name: str, total_items: int) -> str:
+    job_id = f"job-{next(_job_counter)}"
+    with _status_lock:
+        jobs[job_id] = {
+            "id": job_id,
+            "name": name,
+            "start_time": int(time.time()),
+            "total_items": max(0, int(total_items)),
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "retrying": [],
+        }
+    notify("task")
+    return job_id
+
+
+def set_job_retrying(job_id: str, console_name: str, waiting: bool) -> None:
+    with _status_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        if waiting and console_name not in job["retrying"]:
+            job["retrying"].append(console_name)
+        elif not waiting and console_name in job["retrying"]:
+            job["retrying"].remove(console_name)
+    notify("task")
+
+
+def finish_job_item(job_id: str, outcome: str) -> dict | None:
+    # outcome: "succeeded", "failed" or "cancelled". Returns the job, removed
+    # from the running set, once its last child has finished.
+    finished = None
+    with _status_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        job[outcome] += 1
+        if job["succeeded"] + job["failed"] + job["cancelled"] >= job["total_items"]:
+            finished = jobs.pop(job_id)
+    notify("task")
+    return finished
+
+
+def get_task_status() -> tuple[list[dict], list[dict]]:
+    with _status_lock:
+        return (
+            [dict(entry) for entry in running_tasks.values()],
+            [dict(job, retrying=list(job["retrying"])) for job in jobs.values()],
+        )
 
 
 def _queue_snapshot() -> list[dict]:
@@ -68,30 +176,46 @@ def _queue_snapshot() -> list[dict]:
         return [item[2] for item in ordered]
 
 
-def queue_has_task_prefix(prefix: str) -> bool:
-    return any(item["task_name"].startswith(prefix) for item in _queue_snapshot())
+def task_key(kind: str, target=None) -> tuple:
+    return (kind, target)
 
 
-def current_task_has_prefix(prefix: str) -> bool:
-    task_name = current_task_status.get("task_name") or ""
-    step = current_task_status.get("step") or ""
-    return task_name.startswith(prefix) or step.startswith(prefix)
+def claim_task(task_meta: dict) -> None:
+    # Called by the worker once it has taken a task off the queue; new
+    # requests for the same key then queue up again instead of merging.
+    key = task_meta.get("key")
+    if key is None:
+        return
+    with _pending_lock:
+        if _pending.get(key) is task_meta:
+            del _pending[key]
 
 
-def purge_queued_tasks_with_prefix(prefix: str) -> int:
-    removed = 0
+def _remove_queued(predicate) -> int:
     with task_queue.mutex:
         items = list(task_queue.queue)
-        task_queue.queue.clear()
-        for item in items:
-            task_meta = item[2]
-            if task_meta["task_name"].startswith(prefix):
-                removed += 1
-                continue
-            task_queue.queue.append(item)
+        kept = [item for item in items if not predicate(item[2])]
+        removed = len(items) - len(kept)
+        if not removed:
+            return 0
+        heapq.heapify(kept)
+        task_queue.queue[:] = kept
+        # Removed items will never see task_done(), so settle them here or
+        # join()/drain_queue() would wait for them forever.
+        task_queue.unfinished_tasks -= removed
+        if not task_queue.unfinished_tasks:
+            task_queue.all_tasks_done.notify_all()
     return removed
 
 
+def current_task_has_prefix(prefix: str) -> bool:
+    with _status_lock:
+        return any(job["name"].startswith(prefix) for job in jobs.values()) or any(
+            (entry["task_name"] or "").startswith(prefix) or (entry["step"] or "").startswith(prefix)
+            for entry in running_tasks.values()
+        )
+
+
 def _enqueue_task(
     task_name: str,
     func,
@@ -100,24 +224,70 @@ def _enqueue_task(
     *,
     priority: int = _DEFAULT_PRIORITY,
     total_items: int = 1,
+    key: tuple | None = None,
+    absorbed_by: tuple | None = None,
+    absorbs: list[tuple] | None = None,
+    exclusive: bool = True,
+    job_id: str | None = None,
 ) -> bool:
+    # Returns False when the request was merged into work already queued:
+    # the same key, or a queued task (e.g. a full pass) that covers it.
+    # Queued tasks listed in `absorbs` are dropped in favour of this one.
+    # Exclusive tasks run alone; shared ones (console backups) run side by
+    # side on the worker threads.
+    sequence = next(_sequence_counter)
     task_meta = {
+        "id": sequence,
         "task_name": task_name,
         "func": func,
         "args": args or [],
         "kwargs": kwargs or {},
         "total_items": max(1, int(total_items or 1)),
+        "key": key,
+        "exclusive": exclusive,
+        "job_id": job_id,
     }
-    task_queue.put((priority, next(_sequence_counter), task_meta))
+    with _pending_lock:
+        if absorbed_by is not None and absorbed_by in _pending:
+            return False
+        if absorbs:
+            # Only standalone requests; a job's children are its own to settle.
+            absorbed = {
+                id(_pending.pop(k)) for k in absorbs if k in _pending and not _pending[k].get("job_id")
+            }
+            if absorbed:
+                _remove_queued(lambda queued: id(queued) in absorbed)
+        if key is not None and key in _pending:
+            return False
+        if key is not None:
+            _pending[key] = task_meta
+        task_queue.put((priority, sequence, task_meta))
+    notify("queue")
     return True
 
 
+def cancel_queued_task(key: tuple) -> dict | None:
+    # Drops a task that has not started yet; returns it so the caller can
+    # settle any job it belonged to.
+    with _pending_lock:
+        task_meta = _pending.pop(key, None)
+        if task_meta is None:
+            return None
+        _remove_queued(lambda queued: queued is task_meta)
+    notify("queue")
+    return task_meta
+
+
 def enqueue_task(
     task_name: str,
     func,
     args: list | None = None,
     kwargs: dict | None = None,
     total_items: int = 1,
+    *,
+    key: tuple | None = None,
+    absorbed_by: tuple | None = None,
+    exclusive: bool = True,
 ) -> bool:
     return _enqueue_task(
         task_name,
@@ -125,6 +295,9 @@ def enqueue_task(
         args=args,
         kwargs=kwargs,
         total_items=total_items,
+        key=key,
+        absorbed_by=absorbed_by,
+        exclusive=exclusive,
     )
 
 
@@ -136,6 +309,10 @@ def enqueue_task_unbounded(
     *,
     priority: int | None = None,
     total_items: int = 1,
+    key: tuple | None = None,
+    absorbs: list[tuple] | None = None,
+    exclusive: bool = True,
+    job_id: str | None = None,
 ) -> bool:
     selected_priority = _HIGH_PRIORITY if task_name.startswith(SCHEDULED_BACKUP_TASK_PREFIX) else _DEFAULT_PRIORITY
     if priority is not None:
@@ -147,12 +324,27 @@ def enqueue_task_unbounded(
         kwargs=kwargs,
         priority=selected_priority,
         total_items=total_items,
+        key=key,
+        absorbs=absorbs,
+        exclusive=exclusive,
+        job_id=job_id,
     )
 
 
-def get_queue_items() -> list[str]:
-    return [item["task_name"] for item in _queue_snapshot()]
-
-
-def get_queue_total_items() -> int:
-    return sum(int(item.get("total_items", 1) or 1) for item in _queue_snapshot())
+def get_queue_summary() -> tuple[list[dict], int]:
+    # Child tasks are already counted by their job, so only standalone tasks
+    # add to the queued item total.
+    snapshot = _queue_snapshot()
+    entries = []
+    for item in snapshot:
+        kind, target = item.get("key") or (None, None)
+        entries.append(
+            {
+                "name": item["task_name"],
+                "console_id": target if kind == TASK_KIND_BACKUP else None,
+            }
+        )
+    return (
+        entries,
+        sum(int(item.get("total_items", 1) or 1) for item in snapshot if not item.get("job_id")),
+    )
@@ -1,5 +1,20 @@
 let evtSource = null;
 
+const MAX_LOGS = 300;
+
+// Client-side copy of the dashboard state. The stream sends one snapshot and
+// then only the parts that changed; time-based fields are rendered locally.
+const state = {
+  task: {},
+  queue: {},
+  session: {},
+  schedule: {},
+  clock: {},
+  consoles: new Map(),
+  logs: [],
+  clockSkew: 0,
+};
+
 function autoRemoveFlashMessages() {
   setTimeout(() => {
     const flashEls = document.querySelectorAll(".flash-message");
@@ -7,40 +22,152 @@ function autoRemoveFlashMessages() {
   }, 15000);
 }
 
+function onEvent(type, handler) {
+  evtSource.addEventListener(type, (e) => {
+    if (!e.data) return;
+    handler(JSON.parse(e.data));
+  });
+}
+
 function initSSE() {
   evtSource = new EventSource("/status_stream");
-  evtSource.onmessage = function (e) {
-    if (!e.data) return;
-    const data = JSON.parse(e.data);
-    updateUI(data);
+  evtSource.onerror = () => {
+    // The browser retries dropped streams itself but gives up on an error
+    // response (e.g. the server's stream limit); try again later.
+    if (evtSource.readyState === EventSource.CLOSED) {
+      setTimeout(initSSE, 30000);
+    }
   };
+
+  onEvent("time", (serverEpoch) => {
+    state.clockSkew = serverEpoch - Date.now() / 1000;
+  });
+
+  onEvent("snapshot", (data) => {
+    state.task = data.task || {};
+    state.queue = data.queue || {};
+    state.session = data.session || {};
+    state.schedule = data.schedule || {};
+    state.clock = data.clock || {};
+    state.consoles = new Map((data.consoles || []).map((c) => [c.id, c]));
+    state.logs = data.logs || [];
+    renderTask();
+    renderSession();
+    renderConsoles();
+    renderLogs();
+    renderClock();
+  });
+
+  onEvent("task", (task) => {
+    state.task = task;
+    renderTask();
+  });
+
+  onEvent("queue", (queue) => {
+    state.queue = queue;
+    renderTask();
+  });
+
+  onEvent("session", (session) => {
+    state.session = session;
+    renderSession();
+  });
+
+  onEvent("schedule", (schedule) => {
+    state.schedule = schedule;
+    renderClock();
+  });
+
+  onEvent("clock", (clock) => {
+    state.clock = clock;
+    renderClock();
+  });
+
+  onEvent("consoles", (change) => {
+    (change.remove || []).forEach((id) => state.consoles.delete(id));
+    (change.upsert || []).forEach((c) => state.consoles.set(c.id, c));
+    renderConsoles();
+  });
+
+  onEvent("log", (entry) => {
+    // A replay after reconnecting may repeat entries already in the snapshot.
+    if (state.logs.length && state.logs[0].seq >= entry.seq) return;
+    state.logs.unshift(entry);
+    if (state.logs.length > MAX_LOGS) state.logs.length = MAX_LOGS;
+    prependLog(entry);
+  });
+
+  onEvent("reset", () => {
+    // Localized strings changed server-side (e.g. time zone); start over.
+    evtSource.close();
+    initSSE();
+  });
 }
 
-function updateUI(data) {
-  const running = data.current_task.running;
-  const step = data.current_task.step;
-  const taskName = data.current_task.task_name || step || "";
-  const startTime = data.current_task.start_time_local || "";
-  const elapsedSeconds = data.current_task.elapsed_seconds;
-  const queueSize = data.queue_size;
-  const queueItems = data.queue_items || [];
-  const queueTotalItems = data.queue_total_items || 0;
-  const queueRemainingItems = data.queue_remaining_items || 0;
-  const scheduledQueuePosition = data.scheduled_queue_position || 0;
-  const scheduledQueueSize = data.scheduled_queue_size || 0;
+function formatDuration(totalSeconds) {
+  if (totalSeconds < 0) return "N/A";
+  const days = Math.floor(totalSeconds / 86400);
+  const hours = Math.floor((totalSeconds % 86400) / 3600);
+  const minutes = Math.floor((totalSeconds % 3600) / 60);
+  const seconds = totalSeconds % 60;
+  const pad = (n) => String(n).padStart(2, "0");
+  const parts = [];
+  if (days === 1) {
+    parts.push("1 day");
+  } else if (days > 1) {
+    parts.push(`${days} days`);
+  }
+  parts.push(`${pad(hours)}:${pad(minutes)}:${pad(seconds)}`);
+  return parts.join(", ");
+}
+
+function serverNow() {
+  return Date.now() / 1000 + state.clockSkew;
+}
+
+function formatLocalTime(epochSeconds) {
+  // Shift by the user's time zone offset, then format the shifted value as UTC.
+  const shifted = new Date((epochSeconds + (state.clock.tz_offset_seconds || 0)) * 1000);
+  return shifted.toISOString().slice(0, 19).replace("T", " ");
+}
+
+function renderTask() {
+  const task = state.task;
+  const queue = state.queue;
+  const running = task.running;
+  const jobs = task.jobs || [];
+  const tasks = task.tasks || [];
+  const queueSize = queue.queue_size || 0;
+  const queueItems = queue.queue_items || [];
+  const queueTotalItems = queue.queue_total_items || 0;
+  const queueRemainingItems = queue.queue_remaining_items || 0;
+  const scheduledQueuePosition = queue.scheduled_queue_position || 0;
+  const scheduledQueueSize = queue.scheduled_queue_size || 0;
 
   const taskStatus = document.getElementById("task-status");
   const taskDetail = document.getElementById("task-detail");
   const taskSubdetail = document.getElementById("task-subdetail");
-  const taskTiming = document.getElementById("task-timing");
   const queueDetail = document.getElementById("queue-detail");
   const queueList = document.getElementById("queue-list");
 
   if (running) {
     taskStatus.textContent = "Running";
     taskStatus.className = "badge success";
-    taskDetail.textContent = taskName || "Task running";
-    taskSubdetail.textContent = step && step !== taskName ? step : "Working...";
+    // Jobs summarize their console tasks; standalone tasks show their own name.
+    const headlines = jobs.map((job) => {
+      let line = `${job.name}: ${job.completed_items}/${job.total_items} console(s)`;
+      if (job.failed) line += `, ${job.failed} failed`;
+      return line;
+    });
+    tasks.filter((t) => !t.job_id).forEach((t) => headlines.push(t.task_name));
+    taskDetail.textContent = headlines.join(" | ") || "Task running";
+    const steps = tasks.filter((t) => t.step && t.step !== t.task_name).map((t) => t.step);
+    jobs.forEach((job) => {
+      if (job.retrying && job.retrying.length) {
+        steps.push(`Waiting to retry: ${job.retrying.join(", ")}`);
+      }
+    });
+    taskSubdetail.textContent = steps.length ? steps.join(" | ") : "Working...";
   } else if (queueSize > 0) {
     taskStatus.textContent = "Queued";
     taskStatus.className = "badge warning";
@@ -54,6 +181,7 @@ function updateUI(data) {
   }
 
   if (running) {
+    const startTime = (jobs[0] || tasks[0] || {}).start_time_local || "";
     queueDetail.textContent = `Started: ${startTime || "Unknown"} | Remaining items: ${queueRemainingItems}`;
   } else {
     queueDetail.textContent = `Queued tasks: ${queueSize} | Queued items: ${queueTotalItems}`;
@@ -63,16 +191,21 @@ function updateUI(data) {
     const base = queueDetail.textContent;
     queueDetail.textContent = `${base} | Scheduled queue: position ${scheduledQueuePosition}/${scheduledQueueSize}`;
   }
-  if (running && elapsedSeconds !== null && elapsedSeconds !== undefined) {
-    taskTiming.textContent = `Elapsed: ${elapsedSeconds}s`;
-  } else {
-    taskTiming.textContent = "";
-  }
+  renderElapsed();
+
   queueList.innerHTML = "";
   if (queueItems.length > 0) {
     queueItems.forEach((item) => {
       const li = document.createElement("li");
-      li.textContent = item;
+      li.textContent = item.name;
+      if (item.console_id !== null && item.console_id !== undefined) {
+        const form = document.createElement("form");
+        form.method = "POST";
+        form.action = `/cancel_backup/${item.console_id}`;
+        form.className = "inline-form";
+        form.innerHTML = '<button type="submit" class="secondary">Cancel</button>';
+        li.appendChild(form);
+      }
       queueList.appendChild(li);
     });
   } else if (!running) {
@@ -81,36 +214,37 @@ function updateUI(data) {
     li.textContent = "Queue is empty.";
     queueList.appendChild(li);
   }
+}
 
-  const nextStr = data.next_backup_time_str || "N/A";
-  document.getElementById("next-backup").textContent = nextStr;
-  const currentTime = data.current_time_local || "";
-  const currentTimeEl = document.getElementById("current-time");
-  if (currentTimeEl) {
-    currentTimeEl.textContent = currentTime ? `Current time: ${currentTime}` : "";
+function renderElapsed() {
+  const taskTiming = document.getElementById("task-timing");
+  const starts = [...(state.task.jobs || []), ...(state.task.tasks || [])]
+    .map((entry) => entry.start_epoch)
+    .filter((epoch) => epoch !== null && epoch !== undefined);
+  if (state.task.running && starts.length) {
+    const elapsedSeconds = Math.max(0, Math.floor(serverNow() - Math.min(...starts)));
+    taskTiming.textContent = `Elapsed: ${elapsedSeconds}s`;
+  } else {
+    taskTiming.textContent = "";
   }
+}
 
-  const logsUl = document.getElementById("logs-ul");
-  logsUl.innerHTML = "";
-  const logsList = data.logs || [];
-  if (logsList.length === 0) {
-    const li = document.createElement("li");
-    li.className = "empty-state";
-    li.textContent = "No logs yet. Activity will appear here once tasks run.";
-    logsUl.appendChild(li);
-  } else {
-    logsList.forEach((entry) => {
-      const li = document.createElement("li");
-      li.textContent = `[${entry.timestamp}] - ${entry.message}`;
-      logsUl.appendChild(li);
-    });
+function renderClock() {
+  const now = serverNow();
+  const nextEpoch = state.schedule.next_backup_epoch;
+  document.getElementById("next-backup").textContent =
+    nextEpoch ? formatDuration(Math.max(0, Math.floor(nextEpoch - now))) : "N/A";
+  const currentTimeEl = document.getElementById("current-time");
+  if (currentTimeEl) {
+    currentTimeEl.textContent = `Current time: ${formatLocalTime(Math.floor(now))}`;
   }
+}
 
-  const loginStatus = data.master_logged_in;
+function renderSession() {
   const loginDot = document.getElementById("login-status-dot");
   const loginText = document.getElementById("login-status-text");
   const loginCheckTime = document.getElementById("cookie-check-time");
-  if (loginStatus) {
+  if (state.session.master_logged_in) {
     loginDot.className = "status-dot green";
     loginText.textContent = "Cookies are valid.";
   } else {
@@ -118,91 +252,125 @@ function updateUI(data) {
     loginText.textContent = "Not logged in. Please do a manual server-side login.";
   }
   if (loginCheckTime) {
-    const lastCheck = data.last_cookie_check_local || "";
+    const lastCheck = state.session.last_cookie_check_local || "";
     loginCheckTime.textContent = lastCheck ? `Last checked: ${lastCheck}` : "";
   }
+}
+
+function logItem(entry) {
+  const li = document.createElement("li");
+  li.textContent = `[${entry.timestamp}] - ${entry.message}`;
+  if (entry.level && entry.level !== "info") {
+    li.className = `log-${entry.level}`;
+  }
+  return li;
+}
 
-  const consoles = data.consoles || [];
+function renderLogs() {
+  const logsUl = document.getElementById("logs-ul");
+  logsUl.innerHTML = "";
+  if (state.logs.length === 0) {
+    const li = document.createElement("li");
+    li.className = "empty-state";
+    li.textContent = "No logs yet. Activity will appear here once tasks run.";
+    logsUl.appendChild(li);
+    return;
+  }
+  state.logs.forEach((entry) => logsUl.appendChild(logItem(entry)));
+}
+
+function prependLog(entry) {
+  const logsUl = document.getElementById("logs-ul");
+  const emptyState = logsUl.querySelector(".empty-state");
+  if (emptyState) emptyState.remove();
+  logsUl.insertBefore(logItem(entry), logsUl.firstChild);
+  while (logsUl.children.length > MAX_LOGS) {
+    logsUl.removeChild(logsUl.lastChild);
+  }
+}
+
+function consoleRow(c) {
+  const row = document.createElement("tr");
+
+  const tdName = document.createElement("td");
+  tdName.textContent = c.name;
+  row.appendChild(tdName);
+
+  const tdUrl = document.createElement("td");
+  tdUrl.className = "console-url";
+  tdUrl.textContent = c.backup_url || "";
+  row.appendChild(tdUrl);
+
+  const tdStatus = document.createElement("td");
+  tdStatus.className = "console-status";
+  tdStatus.textContent = c.status || "None";
+  row.appendChild(tdStatus);
+
+  const tdTime = document.createElement("td");
+  tdTime.textContent = c.time || "Never";
+  row.appendChild(tdTime);
+
+  const tdSchedule = document.createElement("td");
+  tdSchedule.className = `console-schedule ${c.excluded ? "is-excluded" : "is-included"}`;
+  tdSchedule.innerHTML = `
+    <form method="POST" action="/toggle_console_schedule/${c.id}">
+      <button type="submit" class="schedule-toggle-button">
+        ${c.excluded ? "Excluded" : "Included"}
+      </button>
+    </form>
+  `;
+  row.appendChild(tdSchedule);
+
+  const tdActions = document.createElement("td");
+  tdActions.innerHTML = `
+    <div class="table-actions">
+      <form method="POST" action="/manual_backup/${c.id}">
+        <button type="submit">Backup Now</button>
+      </form>
+      <form method="POST" action="/remove_console/${c.id}">
+        <button type="submit" class="secondary">Remove</button>
+      </form>
+      <form method="GET" action="/download_latest_backup/${c.id}">
+        <button type="submit" class="secondary">Download Latest</button>
+      </form>
+      <form method="GET" action="/console_history/${c.id}">
+        <button type="submit" class="secondary">View History</button>
+      </form>
+    </div>
+  `;
+  row.appendChild(tdActions);
+  return row;
+}
+
+function renderConsoles() {
+  const consoles = Array.from(state.consoles.values());
   const totalConsolesEl = document.getElementById("total-consoles");
   if (totalConsolesEl) {
-    const totalConsoles = data.total_consoles ?? consoles.length;
-    totalConsolesEl.textContent = `Total consoles: ${totalConsoles}`;
+    totalConsolesEl.textContent = `Total consoles: ${consoles.length}`;
   }
-  const consolesKey = JSON.stringify(consoles);
-  if (window.lastConsolesKey !== consolesKey) {
-    window.lastConsolesKey = consolesKey;
-    const consolesTbody = document.getElementById("consoles-tbody");
-    consolesTbody.innerHTML = "";
-    if (consoles.length === 0) {
-      const row = document.createElement("tr");
-      const td = document.createElement("td");
-      td.colSpan = 6;
-      td.className = "empty-state";
-      td.textContent = "No consoles yet. Add one below or import a JSON list.";
-      row.appendChild(td);
-      consolesTbody.appendChild(row);
-    } else {
-      consoles.forEach((c) => {
-        const row = document.createElement("tr");
-
-      const tdName = document.createElement("td");
-      tdName.textContent = c.name;
-      row.appendChild(tdName);
-
-      const tdUrl = document.createElement("td");
-      tdUrl.className = "console-url";
-      tdUrl.textContent = c.backup_url || "";
-      row.appendChild(tdUrl);
-
-      const tdStatus = document.createElement("td");
-      tdStatus.className = "console-status";
-      tdStatus.textContent = c.status || "None";
-      row.appendChild(tdStatus);
-
-      const tdTime = document.createElement("td");
-      tdTime.textContent = c.time || "Never";
-      row.appendChild(tdTime);
-
-      const tdSchedule = document.createElement("td");
-      tdSchedule.className = `console-schedule ${c.excluded ? "is-excluded" : "is-included"}`;
-      tdSchedule.innerHTML = `
-        <form method="POST" action="/toggle_console_schedule/${c.id}">
-          <button type="submit" class="schedule-toggle-button">
-            ${c.excluded ? "Excluded" : "Included"}
-          </button>
-        </form>
-      `;
-      row.appendChild(tdSchedule);
-
-      const tdActions = document.createElement("td");
-      tdActions.innerHTML = `
-        <div class="table-actions">
-          <form method="POST" action="/manual_backup/${c.id}">
-            <button type="submit">Backup Now</button>
-          </form>
-          <form method="POST" action="/remove_console/${c.id}">
-            <button type="submit" class="secondary">Remove</button>
-          </form>
-          <form method="GET" action="/download_latest_backup/${c.id}">
-            <button type="submit" class="secondary">Download Latest</button>
-          </form>
-          <form method="GET" action="/console_history/${c.id}">
-            <button type="submit" class="secondary">View History</button>
-          </form>
-        </div>
-      `;
-      row.appendChild(tdActions);
-
-        consolesTbody.appendChild(row);
-      });
-    }
+  const consolesTbody = document.getElementById("consoles-tbody");
+  consolesTbody.innerHTML = "";
+  if (consoles.length === 0) {
+    const row = document.createElement("tr");
+    const td = document.createElement("td");
+    td.colSpan = 6;
+    td.className = "empty-state";
+    td.textContent = "No consoles yet. Add one below or import a JSON list.";
+    row.appendChild(td);
+    consolesTbody.appendChild(row);
+    return;
   }
+  consoles.forEach((c) => consolesTbody.appendChild(consoleRow(c)));
 }
 
 
 window.addEventListener("load", () => {
   initSSE();
   autoRemoveFlashMessages();
+  setInterval(() => {
+    renderElapsed();
+    renderClock();
+  }, 1000);
   const backToTop = document.getElementById("back-to-top");
   if (backToTop) {
     backToTop.addEventListener("click", () => {
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import threading
+import time
+
+from .consoles import ConsoleRecord, ConsoleStatus, console_registry
+from .data import (
+    appdata,
+    format_local,
+    get_app_logs,
+    get_user_timezone,
+    get_user_timezone_label,
+)
+from .events import add_hook, bus, encode_frame
+from .scheduler import scheduler
+from .state import (
+    SCHEDULED_BACKUP_TASK_PREFIX,
+    get_queue_summary,
+    get_task_status,
+    log_console,
+    task_queue,
+)
+
+_SCHEDULE_POLL_SECONDS = 5
+
+_lock = threading.RLock()
+_published: dict = {}
+_console_rows: dict[int, dict] = {}
+_tz_choice: str | None = None
+_publisher_thread: threading.Thread | None = None
+_snapshot_cache: tuple[int, bytes] | None = None
+
+
+def console_row(console: ConsoleRecord) -> dict:
+    if console.status in (ConsoleStatus.SUCCESS, ConsoleStatus.FAILED_RETRIES):
+        status_display = console.status_text
+    else:
+        status_display = "Failed"
+    return {
+        "id": console.id,
+        "name": console.name,
+        "backup_url": console.backup_url,
+        "status": status_display,
+        "time": format_local(console.last_backup_time),
+        "excluded": console.exclude_from_schedule,
+    }
+
+
+def log_row(entry: dict) -> dict:
+    return {
+        "seq": entry["seq"],
+        "timestamp": format_local(entry["ts"]),
+        "level": entry.get("level", "info"),
+        "message": entry["message"],
+    }
+
+
+def _with_start(entry: dict) -> dict:
+    start_time = entry.get("start_time")
+    if start_time:
+        entry["start_time_local"] = format_local(start_time)
+        entry["start_epoch"] = start_time
+    return entry
+
+
+def _task_payload() -> dict:
+    tasks, jobs = get_task_status()
+    for job in jobs:
+        job["completed_items"] = job["succeeded"] + job["failed"] + job["cancelled"]
+    return {
+        "running": bool(tasks or jobs),
+        "tasks": [_with_start(entry) for entry in tasks],
+        "jobs": [_with_start(job) for job in jobs],
+    }
+
+
+def _queue_payload(task: dict) -> dict:
+    queue_items, queue_total_items = get_queue_summary()
+    # A job's children are counted through the job; standalone tasks count
+    # for themselves.
+    running_remaining = sum(
+        max(0, job["total_items"] - job["completed_items"]) for job in task["jobs"]
+    ) + sum(
+        max(0, entry["total_items"] - entry["completed_items"])
+        for entry in task["tasks"]
+        if not entry.get("job_id")
+    )
+
+    scheduled_running = any(
+        job["name"].startswith(SCHEDULED_BACKUP_TASK_PREFIX) for job in task["jobs"]
+    ) or any(
+        entry["task_name"].startswith(SCHEDULED_BACKUP_TASK_PREFIX) for entry in task["tasks"]
+    )
+    scheduled_positions = [
+        idx + 1
+        for idx, item in enumerate(queue_items)
+        if item["name"].startswith(SCHEDULED_BACKUP_TASK_PREFIX)
+    ]
+    if scheduled_running:
+        position, size = 1, 1 + len(scheduled_positions)
+    elif scheduled_positions:
+        position, size = scheduled_positions[0], len(scheduled_positions)
+    else:
+        position, size = 0, 0
+
+    return {
+        "queue_size": task_queue.qsize(),
+        "queue_items": queue_items,
+        "queue_total_items": queue_total_items,
+        "queue_remaining_items": running_remaining + queue_total_items,
+        "scheduled_queue_position": position,
+        "scheduled_queue_size": size,
+    }
+
+
+def _session_payload() -> dict:
+    return {
+        "master_logged_in": appdata.get("master_logged_in", False),
+        "last_cookie_check_local": format_local(appdata.get("last_cookie_check")),
+    }
+
+
+def _schedule_payload() -> dict:
+    backup_job = scheduler.get_job("BackupJob")
+    next_run = backup_job.next_run_time if backup_job else None
+    return {"next_backup_epoch": int(next_run.timestamp()) if next_run else None}
+
+
+def _clock_payload() -> dict:
+    now_utc = datetime.now(timezone.utc)
+    offset = now_utc.astimezone(get_user_timezone()).utcoffset()
+    return {
+        "tz_label": get_user_timezone_label(),
+        "tz_offset_seconds": int(offset.total_seconds()) if offset else 0,
+    }
+
+
+def _publish_if_changed(event_type: str, payload: dict) -> None:
+    if _published.get(event_type) == payload:
+        return
+    _published[event_type] = payload
+    bus.publish(event_type, payload)
+
+
+def _publish_console_changes() -> None:
+    # Only consoles the registry saw change since the last call are rendered.
+    changed, removed_ids = console_registry.drain_changes()
+    upserts = []
+    for console in changed:
+        row = console_row(console)
+        if _console_rows.get(row["id"]) != row:
+            _console_rows[row["id"]] = row
+            upserts.append(row)
+    for cid in removed_ids:
+        _console_rows.pop(cid, None)
+    removed = removed_ids
+    if upserts or removed:
+        bus.publish(
+            "consoles",
+            {"upsert": upserts, "remove": removed, "total": len(console_registry)},
+        )
+
+
+def _on_change(kind: str, payload) -> None:
+    global _tz_choice
+    with _lock:
+        if kind == "log":
+            bus.publish("log", log_row(payload))
+        elif kind in ("task", "queue"):
+            task = _task_payload()
+            _publish_if_changed("task", task)
+            _publish_if_changed("queue", _queue_payload(task))
+        elif kind == "appdata":
+            if _tz_choice is not None and appdata.get("tz_choice") != _tz_choice:
+                # Every localized string changed; make clients start over.
+                _tz_choice = appdata.get("tz_choice")
+                _reset_published()
+                bus.publish("reset", {})
+                return
+            _tz_choice = appdata.get("tz_choice")
+            _publish_console_changes()
+            _publish_if_changed("session", _session_payload())
+
+
+def _reset_published() -> None:
+    global _snapshot_cache
+    _snapshot_cache = None
+    _published.clear()
+    _console_rows.clear()
+
+
+def build_snapshot() -> tuple[int, dict]:
+    # Returns the bus version the snapshot is current for; frames after it may
+    # repeat some of its content, which clients apply idempotently.
+    with _lock:
+        version = bus.version
+        task = _task_payload()
+        snapshot = {
+            "task": task,
+            "queue": _queue_payload(task),
+            "session": _session_payload(),
+            "schedule": _schedule_payload(),
+            "clock": _clock_payload(),
+            "consoles": [console_row(console) for console in console_registry],
+            "logs": [log_row(entry) for entry in reversed(get_app_logs())],
+        }
+    return version, snapshot
+
+
+def snapshot_frame() -> tuple[int, bytes]:
+    # Built at most once per bus version and shared by every client that
+    # connects (or falls behind) while nothing has changed.
+    global _snapshot_cache
+    with _lock:
+        cached = _snapshot_cache
+        if cached is not None and cached[0] == bus.version:
+            return cached
+        version, snapshot = build_snapshot()
+        _snapshot_cache = (version, encode_frame(bus.event_id(version), "snapshot", snapshot))
+        return _snapshot_cache
+
+
+def clock_frame() -> bytes:
+    # Per-connection and id-less, so the shared snapshot can stay cached while
+    # clients still get the server time to correct for their own clock skew.
+    return f"event: time\ndata: {int(time.time())}\n\n".encode("utf-8")
+
+
+def _publisher_loop(stop_event: threading.Event) -> None:
+    # The countdown and clock are rendered client-side; only republish when the
+    # next run time or the time zone offset actually changes.
+    while not stop_event.wait(_SCHEDULE_POLL_SECONDS):
+        try:
+            with _lock:
+                _publish_if_changed("schedule", _schedule_payload())
+                _publish_if_changed("clock", _clock_payload())
+        except Exception as exc:
+            log_console(f"[Status] publisher error: {exc}")
+
+
+_stop_event = threading.Event()
+
+
+def start_status_publisher() -> None:
+    global _publisher_thread, _tz_choice
+    if _publisher_thread and _publisher_thread.is_alive():
+        return
+    with _lock:
+        _tz_choice = appdata.get("tz_choice")
+        console_registry.drain_changes()
+        for console in console_registry:
+            _console_rows[console.id] = console_row(console)
+        _published["session"] = _session_payload()
+    add_hook(_on_change)
+    _publisher_thread = threading.Thread(
+        target=_publisher_loop, args=(_stop_event,), daemon=True
+    )
+    _publisher_thread.start()
+
+
+def stop_status_publisher() -> None:
+    _stop_event.set()
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-import os
+from pathlib import Path
+import random
+import shutil
+import threading
 import time
 
 import psutil
@@ -10,38 +13,109 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from .data import add_app_log, appdata, save_appdata
+from .catalog import backup_catalog, move_and_hash
+from .consoles import ConsoleRecord, console_registry
+from .data import add_app_log, appdata, get_user_timezone, now_epoch, save_appdata
+from .dedup import dedup_store
+from .downloads import DownloadWatcher, is_finished_backup, release_claim
+from .driver_pool import DriverPool, driver_process_tree
 from .notifications import (
+    flush_digest,
+    record_digest_outcome,
     notify_backup_failed,
     notify_backup_success,
     notify_connectivity_failed,
     notify_cookies_expired,
 )
-from .selenium_client import get_selenium_driver
-from .settings import BACKUP_ROOT, COOKIES_JSON, DOWNLOAD_DIR
+from .http_client import invalidate_session_check, stream_download, validate_session_http
+from .retention import apply_retention, plan_retention
+from .selenium_client import (
+    cancel_browser_download,
+    capture_download_request,
+    drain_performance_log,
+    get_selenium_driver,
+)
+from .settings import (
+    BACKUP_CONCURRENCY,
+    BACKUP_DEDUP,
+    BACKUP_DIRECT_DOWNLOAD,
+    BACKUP_RECENT_HISTORY,
+    BACKUP_RETRY_ATTEMPTS,
+    BACKUP_RETRY_BASE_SECONDS,
+    BACKUP_RETRY_MAX_SECONDS,
+    BACKUP_ROOT,
+    COOKIES_JSON,
+    DIRECT_DOWNLOAD_CAPTURE_SECONDS,
+    DIRECT_DOWNLOAD_MAX_KBPS,
+    DOWNLOAD_TIMEOUT_SECONDS,
+    WAIT_BACKUP_CREATE_SECONDS,
+    WAIT_BUTTON_SECONDS,
+    WAIT_PAGE_SETTLE_SECONDS,
+)
 from .state import (
     log_console,
+    cancel_queued_task,
+    current_task_name,
+    enqueue_task_unbounded,
+    finish_job_item,
     is_task_running,
+    set_job_retrying,
+    start_job,
+    task_key,
     task_queue,
-    current_task_status,
+    set_current_task_step,
     update_current_task_progress,
+    TASK_KIND_BACKUP,
 )
+from .waits import (
+    StepTimer,
+    wait_for_backup_created,
+    wait_for_backup_row,
+    wait_for_document_ready,
+    wait_for_url_settled,
+)
+
 
+_active_drivers = 0
+_active_drivers_lock = threading.Lock()
 
-def _open_driver_with_retries(max_attempts: int = 3, wait_seconds: int = 3):
+
+def _clear_download_dir(folder: Path) -> None:
+    for entry in folder.iterdir():
+        try:
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+        except OSError:
+            continue
+
+
+def _open_driver_with_retries(
+    max_attempts: int = 3,
+    wait_seconds: int = 3,
+    download_dir: Path | None = None,
+):
+    global _active_drivers
     last_exc: Exception | None = None
     for attempt in range(1, max_attempts + 1):
         try:
-            return get_selenium_driver()
+            driver = get_selenium_driver(download_dir)
+            with _active_drivers_lock:
+                _active_drivers += 1
+            return driver
         except Exception as exc:
             last_exc = exc
             add_app_log(
-                f"Selenium startup failed (attempt {attempt}/{max_attempts}) => {exc}"
+                f"Selenium startup failed (attempt {attempt}/{max_attempts}) => {exc}",
+                level="warning",
             )
             log_console(
                 f"Selenium startup failed (attempt {attempt}/{max_attempts}) => {exc}"
             )
-            kill_leftover_chrome_processes()
+            # Only sweep every Chrome process when no other backup session is alive.
+            if _active_drivers == 0:
+                kill_leftover_chrome_processes()
             if attempt < max_attempts:
                 time.sleep(wait_seconds)
     if last_exc:
@@ -49,6 +123,24 @@ def _open_driver_with_retries(max_attempts: int = 3, wait_seconds: int = 3):
     raise RuntimeError("Selenium startup failed without exception")
 
 
+def _close_driver(driver) -> None:
+    global _active_drivers
+    try:
+        driver.quit()
+    finally:
+        with _active_drivers_lock:
+            _active_drivers = max(0, _active_drivers - 1)
+
+
+def _kill_driver_processes(driver) -> None:
+    for proc in driver_process_tree(driver):
+        try:
+            log_console(f"[Cleanup] Killing session process PID={proc.pid} ({proc.name()}).")
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+
+
 def kill_leftover_chrome_processes() -> None:
     log_console("[Cleanup] Checking leftover Chrome/ChromeDriver processes...")
     for proc in psutil.process_iter(["pid", "name", "cmdline"]):
@@ -69,14 +161,17 @@ def kill_leftover_chrome_processes() -> None:
 def cleanup_leftover_chrome() -> None:
     if is_task_running():
         return
-    if not task_queue.empty():
+    # Counts tasks other workers have taken but not started yet, unlike empty().
+    if task_queue.unfinished_tasks:
         return
+    driver_pool.close_all()
     kill_leftover_chrome_processes()
 
 
 def reset_processes_logic() -> None:
     add_app_log("Manual reset => starting cleanup of chrome/chromedriver processes.")
     log_console("Manual reset => starting cleanup of chrome/chromedriver processes.")
+    driver_pool.close_all()
     kill_leftover_chrome_processes()
     add_app_log("Manual reset => cleanup complete.")
     log_console("Manual reset => cleanup complete.")
@@ -116,7 +211,7 @@ def load_cookies(driver) -> None:
         with COOKIES_JSON.open("r", encoding="utf-8") as handle:
             cookies = json.load(handle)
         driver.get("https://unifi.ui.com/")
-        time.sleep(2)
+        wait_for_document_ready(driver, WAIT_PAGE_SETTLE_SECONDS)
         for cookie in cookies:
             try:
                 driver.add_cookie(
@@ -155,46 +250,65 @@ def manual_login_browser_logic() -> None:
             log_console("Manual login => success => cookies saved.")
         else:
             add_app_log(
-                "Manual login => timed out => user never left /login or /mfa."
+                "Manual login => timed out => user never left /login or /mfa.",
+                level="warning",
             )
             log_console("Manual login => timed out => still on /login or /mfa.")
     finally:
-        driver.quit()
+        _close_driver(driver)
         save_appdata()
 
 
-def attempt_console_backup(console: dict) -> bool:
-    name = console["name"]
-    driver = _open_driver_with_retries()
-    try:
-        driver.get("https://unifi.ui.com/")
-        time.sleep(2)
-        load_cookies(driver)
-        time.sleep(2)
+driver_pool = DriverPool(
+    BACKUP_CONCURRENCY,
+    open_driver=_open_driver_with_retries,
+    close_driver=_close_driver,
+    load_cookies=load_cookies,
+    clear_dir=_clear_download_dir,
+)
 
+
+def attempt_console_backup(console: ConsoleRecord) -> bool:
+    with driver_pool.lease() as session:
+        return _attempt_console_backup_in(console, session)
+
+
+def _attempt_console_backup_in(console: ConsoleRecord, session) -> bool:
+    name = console.name
+    driver = session.driver
+    download_dir = session.download_dir
+    timer = StepTimer()
+    found_file = None
+    try:
         if not appdata.get("master_logged_in", False):
-            console["last_backup_status"] = "Failed"
-            add_app_log(f"Backup => '{name}' => Not logged in => fail.")
+            console.mark_failed()
+            add_app_log(
+                f"Backup => '{name}' => Not logged in => fail.", level="error", console_id=console.id
+            )
             return False
 
-        driver.get(console["backup_url"])
-        time.sleep(5)
+        with timer.step("open_page"):
+            driver.get(console.backup_url)
+            curr_url = wait_for_url_settled(driver, WAIT_PAGE_SETTLE_SECONDS).lower()
 
-        curr_url = driver.current_url.lower()
         if "/login" in curr_url or "/mfa" in curr_url:
-            console["last_backup_status"] = "Failed"
+            console.mark_failed()
             add_app_log(
-                f"Backup => '{name}' => forced login => set master_logged_in=False"
+                f"Backup => '{name}' => forced login => set master_logged_in=False",
+                level="error",
+                console_id=console.id,
             )
             appdata["master_logged_in"] = False
+            invalidate_session_check()
             save_appdata()
-            notify_cookies_expired(name, console["backup_url"])
-            kill_leftover_chrome_processes()
+            notify_cookies_expired(name, console.backup_url)
+            _kill_driver_processes(driver)
+            session.discard()
             return False
 
         def click_button_by_text(
             label: str,
-            timeout: int = 30,
+            timeout: int = WAIT_BUTTON_SECONDS,
             extra_condition: str = "",
         ) -> None:
             text_xpath = f".//span[contains(@class, 'content') and normalize-space()='{label}']"
@@ -212,67 +326,202 @@ def attempt_console_backup(console: dict) -> bool:
             except Exception:
                 ActionChains(driver).move_to_element(button).pause(0.2).click().perform()
 
-        # Step 1: create a fresh backup first.
-        click_button_by_text("Back Up Now", timeout=45)
-        time.sleep(30)
-
-        # Step 2: click the inline download button in the backup row.
-        click_button_by_text("Download", timeout=45)
-        time.sleep(2)
-
-        # Step 3: click the primary confirm modal/button that appears dynamically.
-        click_button_by_text("Download", timeout=45, extra_condition="contains(@class, 'primary')")
-
-        found_file = None
-        for _ in range(60):
-            possible = [
-                f
-                for f in os.listdir(DOWNLOAD_DIR)
-                if (f.endswith(".unf") or f.endswith(".tar.gz") or f.endswith(".unifi"))
-                and not f.endswith(".crdownload")
-            ]
-            if possible:
-                possible.sort(
-                    key=lambda x: os.path.getmtime(DOWNLOAD_DIR / x), reverse=True
+        # Step 1: create a fresh backup first, then wait for the newest backup row to change.
+        with timer.step("create_backup"):
+            before_row = wait_for_backup_row(driver, min(WAIT_PAGE_SETTLE_SECONDS, 10))
+            click_button_by_text("Back Up Now")
+            if not wait_for_backup_created(driver, before_row, WAIT_BACKUP_CREATE_SECONDS):
+                log_console(
+                    f"Backup => '{name}' => backup row unchanged after {WAIT_BACKUP_CREATE_SECONDS}s, continuing."
                 )
-                found_file = possible[0]
-                break
-            time.sleep(1)
-
-        if not found_file:
-            console["last_backup_status"] = "Failed"
-            add_app_log(f"Backup => '{name}' => no .unf/.tar.gz/.unifi => fail.")
-            notify_backup_failed(name, console["backup_url"], "No backup file after 60s")
-            return False
 
         utc_date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         folder_path = BACKUP_ROOT / utc_date_str
         folder_path.mkdir(parents=True, exist_ok=True)
 
-        oldpath = DOWNLOAD_DIR / found_file
-        new_name = f"{name}_{found_file}"
-        newpath = folder_path / new_name
-        oldpath.rename(newpath)
+        # Arm the watcher before any download click so only files this session
+        # starts are picked up.
+        download_request = None
+        with DownloadWatcher(download_dir) as watcher:
+            if BACKUP_DIRECT_DOWNLOAD:
+                drain_performance_log(driver)
+
+            # Step 2: click the inline download button in the backup row.
+            with timer.step("open_download"):
+                click_button_by_text("Download")
+
+            # Step 3: click the primary confirm modal/button that appears dynamically.
+            with timer.step("confirm_download"):
+                click_button_by_text("Download", extra_condition="contains(@class, 'primary')")
+
+            with timer.step("download"):
+                if BACKUP_DIRECT_DOWNLOAD:
+                    download_request = _capture_direct_download(driver)
+                if download_request is None:
+                    found_file = watcher.wait(DOWNLOAD_TIMEOUT_SECONDS)
+
+        if download_request is not None:
+            new_name = f"{name}_{download_request['filename']}"
+            newpath = folder_path / new_name
+            with timer.step("transfer"):
+                _, digest = stream_download(
+                    download_request["url"],
+                    newpath,
+                    cookies={c["name"]: c["value"] for c in driver.get_cookies()},
+                    headers={"Referer": console.backup_url},
+                    max_bytes_per_second=DIRECT_DOWNLOAD_MAX_KBPS * 1024,
+                )
+        elif not found_file:
+            console.mark_failed()
+            add_app_log(
+                f"Backup => '{name}' => no .unf/.tar.gz/.unifi => fail.",
+                level="error",
+                console_id=console.id,
+            )
+            notify_backup_failed(
+                name, console.backup_url, f"No backup file after {DOWNLOAD_TIMEOUT_SECONDS}s"
+            )
+            return False
+        else:
+            oldpath = download_dir / found_file
+            new_name = f"{name}_{found_file}"
+            newpath = folder_path / new_name
+            with timer.step("move"):
+                digest = move_and_hash(oldpath, newpath)
+
+        # Both paths hash the file exactly once; dedup, last_backup and the
+        # catalog all reuse that digest.
+        with timer.step("catalog"):
+            backup_mtime = newpath.stat().st_mtime
+            if BACKUP_DEDUP:
+                _dedup_backup(console, newpath, digest)
+            _remember_backup(console, newpath, digest)
+            try:
+                backup_catalog.record(
+                    newpath,
+                    console_id=console.id,
+                    console_name=name,
+                    sha256=digest,
+                    mtime=backup_mtime,
+                )
+            except Exception as exc:
+                # The file is safely in place; a reconcile will pick it up.
+                add_app_log(
+                    f"Backup => '{name}' => catalog update failed => {exc}",
+                    level="warning",
+                    console_id=console.id,
+                )
 
-        console["last_backup_status"] = "Success"
-        console["last_backup_time"] = datetime.now(timezone.utc).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-        add_app_log(f"Backup => '{name}' => success => {new_name}")
-        notify_backup_success(name, console["backup_url"], new_name)
+        console.mark_success(now_epoch())
+        add_app_log(f"Backup => '{name}' => success => {new_name}", console_id=console.id)
+        notify_backup_success(name, console.backup_url, new_name)
         return True
 
     except Exception as exc:
-        console["last_backup_status"] = "Failed"
-        add_app_log(f"Backup => '{name}' => exception => {exc}")
-        notify_backup_failed(name, console["backup_url"], str(exc))
-        kill_leftover_chrome_processes()
+        console.mark_failed()
+        add_app_log(
+            f"Backup => '{name}' => exception => {exc}", level="error", console_id=console.id
+        )
+        notify_backup_failed(name, console.backup_url, str(exc))
+        _kill_driver_processes(driver)
+        session.discard()
         return False
     finally:
-        driver.quit()
+        if found_file:
+            release_claim(download_dir / found_file)
+        if timer.steps:
+            log_console(f"Backup => '{name}' => step timings: {timer.summary()}")
         save_appdata()
 
 
+def _dedup_backup(console: ConsoleRecord, path: Path, digest: str) -> None:
+    try:
+        saved = dedup_store.absorb(path, digest)
+    except (OSError, ValueError) as exc:
+        # e.g. the filesystem has no hardlinks; keep the plain copy.
+        add_app_log(
+            f"Backup => '{console.name}' => dedup skipped => {exc}",
+            level="warning",
+            console_id=console.id,
+        )
+        return
+    if saved:
+        add_app_log(
+            f"Backup => '{console.name}' => identical to an earlier backup, "
+            f"stored once ({saved / (1024 * 1024):.1f} MB saved).",
+            console_id=console.id,
+        )
+
+
+def _remember_backup(console: ConsoleRecord, path: Path, digest: str) -> None:
+    # The exact file of the last success, so downloads never have to search.
+    record = {
+        "path": f"{path.parent.name}/{path.name}",
+        "size": path.stat().st_size,
+        "sha256": digest,
+        "time": now_epoch(),
+    }
+    console.last_backup = record
+    if BACKUP_RECENT_HISTORY:
+        console.recent_backups = [record, *console.recent_backups][:BACKUP_RECENT_HISTORY]
+
+
+def _capture_direct_download(driver) -> dict | None:
+    request = capture_download_request(driver, DIRECT_DOWNLOAD_CAPTURE_SECONDS)
+    if not request or not request["url"].startswith(("https://", "http://")):
+        # Blob/data URLs only exist inside the page; let Chrome finish the download.
+        log_console("Direct download => no HTTP download URL captured, using browser download.")
+        return None
+    cancel_browser_download(driver, request["guid"])
+    filename = Path(request["filename"] or request["url"].split("?")[0].rsplit("/", 1)[-1]).name
+    if not is_finished_backup(filename):
+        filename = f"{filename or 'backup'}.unf"
+    request["filename"] = filename
+    return request
+
+
+def reconcile_backup_catalog_logic() -> None:
+    update_current_task_progress(0, "Reconciling backup catalog with disk")
+    result = backup_catalog.reconcile(console_registry)
+    add_app_log(
+        f"Backup catalog => reconciled => {result['added']} added, "
+        f"{result['updated']} updated, {result['removed']} removed."
+    )
+    update_current_task_progress(1)
+
+
+def retention_logic(dry_run: bool | None = None) -> None:
+    retention = appdata["retention"]
+    if dry_run is None:
+        dry_run = bool(retention.get("dry_run", True))
+    update_current_task_progress(0, "Planning backup retention")
+    plan = plan_retention(console_registry, retention, get_user_timezone())
+    doomed_bytes = sum(entry["size"] for entry in plan["delete"])
+    if dry_run:
+        for item in plan["consoles"]:
+            if item["delete"]:
+                add_app_log(
+                    f"Retention (dry run) => '{item['console_name']}' => would delete "
+                    f"{item['delete']} of {item['total']} backups.",
+                    console_id=item["console_id"],
+                )
+        add_app_log(
+            f"Retention (dry run) => {len(plan['delete'])} backups "
+            f"({doomed_bytes / (1024 * 1024):.1f} MB) would be deleted."
+        )
+        update_current_task_progress(1)
+        return
+    update_current_task_progress(0, f"Deleting {len(plan['delete'])} expired backups")
+    result = apply_retention(plan, console_registry)
+    save_appdata()
+    add_app_log(
+        f"Retention => deleted {result['deleted']} backups, "
+        f"{result['folders_removed']} empty date folders, "
+        f"{result['freed_bytes'] / (1024 * 1024):.1f} MB freed."
+    )
+    update_current_task_progress(1)
+
+
 def scheduled_connectivity_check_logic() -> None:
     log_console("scheduled_connectivity_check_logic => start")
     test_cookie_access_logic()
@@ -280,76 +529,181 @@ def scheduled_connectivity_check_logic() -> None:
 
 def scheduled_backup_job_logic() -> None:
     if not appdata.get("master_logged_in", False):
-        add_app_log("Scheduled backup => canceled => not logged in.")
+        add_app_log("Scheduled backup => canceled => not logged in.", level="warning")
         return
 
-    all_cons = [c for c in appdata["consoles"] if not c.get("exclude_from_schedule")]
+    all_cons = console_registry.eligible()
     if not all_cons:
         add_app_log("Scheduled backup => no consoles eligible (all excluded).")
         return
 
-    add_app_log(f"Scheduled backup => running for {len(all_cons)} console(s).")
     total_items = len(all_cons)
-    current_task_status["total_items"] = total_items
-
-    for idx, console in enumerate(all_cons, start=1):
+    add_app_log(
+        f"Scheduled backup => running for {total_items} console(s) with "
+        f"{min(BACKUP_CONCURRENCY, total_items)} parallel session(s)."
+    )
+    # The pass only fans out: each console becomes its own task under one
+    # job, so consoles can run in parallel, be cancelled, or be retried
+    # without holding up the rest.
+    job_id = start_job(current_task_name(), total_items)
+    for console in all_cons:
+        _enqueue_console_backup(job_id, console, attempt=1)
+    set_current_task_step(f"ScheduledBackup => {total_items} console task(s) queued")
+
+
+def _enqueue_console_backup(job_id: str, console: ConsoleRecord, attempt: int) -> None:
+    key = task_key(TASK_KIND_BACKUP, console.id)
+    queued = enqueue_task_unbounded(
+        f"PassBackup-{console.name}",
+        scheduled_console_backup_logic,
+        [job_id, console.id, attempt],
+        # Same priority as the pass itself, so its consoles go before other work.
+        key=key,
+        absorbs=[key],
+        priority=0,
+        exclusive=False,
+        job_id=job_id,
+    )
+    if not queued:
+        # Another pass already has this console queued.
+        log_console(f"{console.name} => already queued by another pass, skipping.")
+        _finish_job_item(job_id, "cancelled", console.id)
+
+
+def scheduled_console_backup_logic(job_id: str, console_id: int, attempt: int) -> None:
+    console = console_registry.get(console_id)
+    if console is None:
+        _finish_job_item(job_id, "cancelled", console_id)
+        return
+    set_current_task_step(f"{console.name} => attempt {attempt}/{BACKUP_RETRY_ATTEMPTS}")
+    try:
+        success = attempt_console_backup(console)
+    except Exception as exc:
+        # e.g. the pooled Chrome would not start. Counted as a failed attempt
+        # so the console is still retried or finished and the job can end.
+        add_app_log(
+            f"{console.name} => attempt {attempt} crashed => {exc}",
+            level="error",
+            console_id=console.id,
+        )
         success = False
-        for attempt in range(1, 4):
-            update_current_task_progress(
-                idx - 1,
-                f"ScheduledBackup => {console['name']} ({idx}/{total_items}) => attempt {attempt}/3",
-            )
-            success = attempt_console_backup(console)
-            if success:
-                if attempt > 1:
-                    add_app_log(
-                        f"{console['name']} => succeeded after retry (attempt {attempt}/3)."
-                    )
-                break
-            if attempt < 3:
-                current_task_status["step"] = (
-                    f"ScheduledBackup => waiting before retry for {console['name']}"
-                )
-                time.sleep(10)
+    # Without a session every retry would fail the same way.
+    if not success and attempt < BACKUP_RETRY_ATTEMPTS and appdata.get("master_logged_in", False):
+        delay = _retry_delay(attempt)
+        log_console(f"{console.name} => attempt {attempt} failed, retry in {delay:.0f}s")
+        set_job_retrying(job_id, console.name, True)
+        timer = threading.Timer(delay, _retry_console_backup, [job_id, console, attempt + 1])
+        timer.daemon = True
+        with _retry_lock:
+            _retry_timers[console_id] = (timer, job_id)
+        timer.start()
+        return
+    _finish_console_backup(console, success, attempt)
+    _finish_job_item(job_id, "succeeded" if success else "failed", console_id, attempt)
 
-        if not success:
-            console["last_backup_status"] = "Failed after 3 retries"
-            add_app_log(f"{console['name']} => failed after 3 tries.")
 
-        update_current_task_progress(
-            idx,
-            f"ScheduledBackup => completed {idx}/{total_items} console(s)",
-        )
+# Consoles waiting out a retry backoff: console id -> (timer, job id).
+_retry_timers: dict[int, tuple[threading.Timer, str]] = {}
+_retry_lock = threading.Lock()
+
+
+def _retry_console_backup(job_id: str, console: ConsoleRecord, attempt: int) -> None:
+    with _retry_lock:
+        _retry_timers.pop(console.id, None)
+    set_job_retrying(job_id, console.name, False)
+    _enqueue_console_backup(job_id, console, attempt)
+
+
+def cancel_console_backup(console_id: int) -> bool:
+    # Cancels a console's queued backup or pending retry; a running attempt
+    # is left to finish.
+    cancelled = cancel_queued_task(task_key(TASK_KIND_BACKUP, console_id))
+    job_id = cancelled.get("job_id") if cancelled else None
+    with _retry_lock:
+        waiting = _retry_timers.pop(console_id, None)
+    if waiting:
+        timer, job_id = waiting
+        timer.cancel()
+    if not cancelled and not waiting:
+        return False
+    console = console_registry.get(console_id)
+    name = console.name if console else str(console_id)
+    add_app_log(f"{name} => queued backup cancelled.", level="warning", console_id=console_id)
+    if job_id:
+        set_job_retrying(job_id, name, False)
+        _finish_job_item(job_id, "cancelled", console_id)
+    return True
+
+
+def _finish_job_item(
+    job_id: str, outcome: str, console_id: int | None = None, attempts: int = 0
+) -> None:
+    if console_id is not None:
+        record_digest_outcome(job_id, console_id, outcome, attempts)
+    job = finish_job_item(job_id, outcome)
+    if job is None:
+        return
+    summary = f"{job['succeeded']} succeeded, {job['failed']} failed"
+    if job["cancelled"]:
+        summary += f", {job['cancelled']} cancelled"
+    add_app_log(f"Scheduled backup => complete => all consoles processed ({summary}).")
+    save_appdata()
+    flush_digest(job)
+
+
+def _retry_delay(attempt: int) -> float:
+    # Exponential backoff with "equal jitter": half fixed, half random, so
+    # consoles that failed together do not retry in lockstep.
+    delay = min(BACKUP_RETRY_MAX_SECONDS, BACKUP_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
 
-    add_app_log("Scheduled backup => complete => all consoles processed.")
-    current_task_status["step"] = "ScheduledBackup => Done"
+
+def _finish_console_backup(console: ConsoleRecord, success: bool, attempts: int) -> None:
+    if success:
+        if attempts > 1:
+            add_app_log(
+                f"{console.name} => succeeded after retry (attempt {attempts}/{BACKUP_RETRY_ATTEMPTS}).",
+                console_id=console.id,
+            )
+        return
+    console.mark_failed(attempts)
+    add_app_log(
+        f"{console.name} => failed after {attempts} tries.", level="error", console_id=console.id
+    )
+
+
+def _record_cookie_check(valid: bool, detail: str = "") -> None:
+    appdata["last_cookie_check"] = now_epoch()
+    appdata["master_logged_in"] = valid
     save_appdata()
+    if valid:
+        message = "Cookie test => session valid" + (f" ({detail})." if detail else ".")
+    else:
+        message = f"Cookie test => invalid session ({detail})."
+    add_app_log(message, level="info" if valid else "warning")
+    log_console(message)
+
+
+def check_cookies_via_http() -> bool:
+    valid = validate_session_http()
+    if valid is None:
+        return False
+    _record_cookie_check(valid, "HTTP check")
+    return True
 
 
 def test_cookie_access_logic() -> None:
     log_console("Cookie test => start")
-    driver = _open_driver_with_retries()
-    try:
-        driver.get("https://unifi.ui.com/")
-        time.sleep(2)
-        load_cookies(driver)
-        time.sleep(2)
+    if check_cookies_via_http():
+        return
+
+    log_console("Cookie test => HTTP check inconclusive, falling back to browser.")
+    with driver_pool.lease() as session:
+        driver = session.driver
         driver.get("https://unifi.ui.com/")
-        time.sleep(2)
-        curr_url = driver.current_url.lower()
+        curr_url = wait_for_url_settled(driver, WAIT_PAGE_SETTLE_SECONDS).lower()
         invalid_domain = "unifi.ui.com" not in curr_url or "account.ui.com" in curr_url
-        appdata["last_cookie_check"] = datetime.now(timezone.utc).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
         if invalid_domain or "/login" in curr_url or "/mfa" in curr_url:
-            appdata["master_logged_in"] = False
-            save_appdata()
-            add_app_log(f"Cookie test => invalid session (landed on {curr_url}).")
-            log_console(f"Cookie test => invalid session (landed on {curr_url}).")
+            _record_cookie_check(False, f"landed on {curr_url}")
         else:
-            appdata["master_logged_in"] = True
-            save_appdata()
-            add_app_log("Cookie test => session valid.")
-            log_console("Cookie test => session valid.")
-    finally:
-        driver.quit()
+            _record_cookie_check(True)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import time
+
+
+def now_epoch() -> int:
+    return int(time.time())
+
+
+def to_epoch(value) -> int | None:
+    # Timestamps are stored as UTC epoch seconds; older data (and imports)
+    # used "%Y-%m-%d %H:%M:%S" UTC strings.
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        dt_utc = datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return int(dt_utc.replace(tzinfo=timezone.utc).timestamp())
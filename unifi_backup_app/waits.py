@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+_POLL_SECONDS = 0.25
+
+_BACKUP_ROW_SIGNATURE_JS = """
+const buttons = Array.from(document.querySelectorAll("button")).filter((button) => {
+  const label = button.querySelector("span[class*='content']");
+  return label && label.textContent.trim() === "Download" && !button.className.includes("primary");
+});
+if (!buttons.length) {
+  return null;
+}
+const row = buttons[0].closest("tr, li, [role='row']") || buttons[0].parentElement;
+return {text: row ? row.innerText : "", enabled: !buttons[0].disabled};
+"""
+
+
+class StepTimer:
+    def __init__(self) -> None:
+        self.steps: list[tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.monotonic() - started))
+
+    def total(self) -> float:
+        return sum(duration for _, duration in self.steps)
+
+    def summary(self) -> str:
+        parts = [f"{name}={duration:.1f}s" for name, duration in self.steps]
+        parts.append(f"total={self.total():.1f}s")
+        return ", ".join(parts)
+
+
+def wait_for_document_ready(driver, timeout: float) -> bool:
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=_POLL_SECONDS).until(
+            lambda d: d.execute_script("return document.readyState") in ("interactive", "complete")
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_url_settled(driver, timeout: float, stable_for: float = 1.0) -> str:
+    # Client-side redirects (e.g. to /login) land after the document is ready, so
+    # wait until the URL has stopped changing rather than for a fixed delay.
+    wait_for_document_ready(driver, timeout)
+    state = {"url": None, "since": time.monotonic()}
+
+    def settled(d) -> bool:
+        url = d.current_url
+        now = time.monotonic()
+        if url != state["url"]:
+            state["url"] = url
+            state["since"] = now
+            return False
+        return now - state["since"] >= stable_for
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=_POLL_SECONDS).until(settled)
+    except TimeoutException:
+        pass
+    return driver.current_url
+
+
+def backup_row_signature(driver) -> dict | None:
+    try:
+        return driver.execute_script(_BACKUP_ROW_SIGNATURE_JS)
+    except WebDriverException:
+        return None
+
+
+def wait_for_backup_row(driver, timeout: float) -> dict | None:
+    # The backup list renders asynchronously; take the "before" snapshot only once
+    # it is there, otherwise the old row would look like a freshly created one.
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=_POLL_SECONDS).until(backup_row_signature)
+    except TimeoutException:
+        return None
+
+
+def wait_for_backup_created(driver, before: dict | None, timeout: float) -> bool:
+    before_text = before.get("text") if before else None
+
+    def updated(d) -> bool:
+        current = backup_row_signature(d)
+        return bool(current) and current.get("enabled") and current.get("text") != before_text
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=_POLL_SECONDS).until(updated)
+        return True
+    except TimeoutException:
+        return False
@@ -1,21 +1,62 @@
 from __future__ import annotations
 
 import threading
+import time
 
 from .data import add_app_log
-from .state import task_queue, start_task, end_task, log_console
+from .events import notify
+from .settings import BACKUP_CONCURRENCY
+from .state import task_queue, claim_task, start_task, end_task, log_console
 from .tasks import cleanup_leftover_chrome
 
-_worker_thread: threading.Thread | None = None
+_worker_threads: list[threading.Thread] = []
+
+
+class _TaskGate:
+    # Shared tasks (console backups) run side by side; exclusive ones (login,
+    # process resets, maintenance) wait for the others to finish and run
+    # alone. A waiting exclusive task holds back new shared ones so it is not
+    # starved by a long pass.
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+
+    def acquire(self, exclusive: bool) -> None:
+        with self._cond:
+            if exclusive:
+                self._exclusive_waiting += 1
+                self._cond.wait_for(lambda: not self._exclusive and not self._shared)
+                self._exclusive_waiting -= 1
+                self._exclusive = True
+            else:
+                self._cond.wait_for(lambda: not self._exclusive and not self._exclusive_waiting)
+                self._shared += 1
+
+    def release(self, exclusive: bool) -> None:
+        with self._cond:
+            if exclusive:
+                self._exclusive = False
+            else:
+                self._shared -= 1
+            self._cond.notify_all()
+
+
+_gate = _TaskGate()
 
 
 def _worker_loop() -> None:
     while True:
         _, _, task_meta = task_queue.get()
+        claim_task(task_meta)
+        notify("queue")
         task_name = task_meta["task_name"]
         func = task_meta["func"]
         args = task_meta["args"]
         kwargs = task_meta["kwargs"]
+        exclusive = task_meta.get("exclusive", True)
+        _gate.acquire(exclusive)
         start_task(task_meta)
         add_app_log(f"Worker: Starting task '{task_name}'")
         log_console(f"[Worker] Starting task '{task_name}'")
@@ -23,17 +64,32 @@ def _worker_loop() -> None:
         try:
             func(*args, **kwargs)
         except Exception as exc:
-            add_app_log(f"Task '{task_name}' => ERROR: {exc}")
+            add_app_log(f"Task '{task_name}' => ERROR: {exc}", level="error")
             log_console(f"[Worker] Task '{task_name}' => EXCEPTION: {exc}")
 
         end_task()
+        _gate.release(exclusive)
         task_queue.task_done()
         cleanup_leftover_chrome()
 
 
 def start_worker() -> None:
-    global _worker_thread
-    if _worker_thread and _worker_thread.is_alive():
-        return
-    _worker_thread = threading.Thread(target=_worker_loop, daemon=True)
-    _worker_thread.start()
+    # One thread per browser session, so a pass's console tasks can use every
+    # session in the driver pool.
+    _worker_threads[:] = [thread for thread in _worker_threads if thread.is_alive()]
+    for slot in range(len(_worker_threads), BACKUP_CONCURRENCY):
+        thread = threading.Thread(target=_worker_loop, name=f"worker-{slot + 1}", daemon=True)
+        thread.start()
+        _worker_threads.append(thread)
+
+
+def drain_queue(timeout: float) -> bool:
+    # Waits for the running task and everything queued behind it to finish.
+    deadline = time.monotonic() + timeout
+    with task_queue.all_tasks_done:
+        while task_queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            task_queue.all_tasks_done.wait(remaining)
+    return True